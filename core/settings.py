@@ -86,6 +86,41 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# کش باید بین پردازه‌ها مشترک باشد: workerهای وب و دستورهایی مثل detail_cache_stats
+# و warm_sitemaps همین کش را می‌خوانند/پر می‌کنند. در production بهتر است Redis یا
+# Memcached باشد
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+}
+
+# مدت نگه‌داری context صفحه‌ی جزئیات کسب‌وکار (ثانیه)
+BUSINESS_DETAIL_CACHE_TIMEOUT = 300
+# max-age هدر Cache-Control: public صفحه‌ی جزئیات برای کش‌های بالادستی (ثانیه)
+BUSINESS_DETAIL_MAX_AGE = 60
+
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
-AUTH_USER_MODEL = 'accounts.CustomUser'
\ No newline at end of file
+AUTH_USER_MODEL = 'accounts.CustomUser'
+
+# نقشه‌ی سایت: دامنه و پروتکل آدرس‌ها (خالی = هاست درخواست) و تعداد کسب‌وکار در هر بخش
+SITEMAP_DOMAIN = os.environ.get('SITEMAP_DOMAIN', '')
+SITEMAP_PROTOCOL = os.environ.get('SITEMAP_PROTOCOL', 'http')
+SITEMAP_SECTION_SIZE = 5000
+
+# تعداد کسب‌وکار در هر صفحه‌ی لیست
+BUSINESS_LIST_PAGE_SIZE = 12
+
+# انتشار پیام‌های چت به اتصال‌های WebSocket. InProcessBroker فقط وقتی درست است که
+# HTTP و WebSocket را یک پروسه‌ی ASGI سرو کند؛ با چند worker یک backend مشترک بگذارید
+CHAT_BROKER_BACKEND = 'send.realtime.InProcessBroker'
+
+# فایل‌های موقت آپلودهای تکه‌ای چت (بیرون از MEDIA_ROOT تا مستقیم سرو نشوند)
+CHAT_UPLOAD_DIR = BASE_DIR / 'uploads'
+
+# بایگانی پیام‌های چت (دستور archive_messages): محل فایل‌های segment و مدت نگه‌داری در جدول اصلی
+CHAT_ARCHIVE_DIR = BASE_DIR / 'archive'
+CHAT_ARCHIVE_RETENTION_DAYS = 180
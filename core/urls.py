@@ -18,18 +18,10 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.static import serve
-from django.contrib.sitemaps.views import sitemap
-from send.sitemaps import StaticSitemap, BusinessSitemap
+from send import sitemaps
 from .views import not_found_view
 
 
-# تنظیمات sitemap
-sitemaps = {
-    'static': StaticSitemap,
-    'businesses': BusinessSitemap,
-}
-
-
 urlpatterns = [
     # ادمین
     path('admin/', admin.site.urls),
@@ -39,11 +31,9 @@ urlpatterns = [
     path('', include('send.urls')),         # کسب‌وکارها
     path('', include('accounts.urls')),     # احراز هویت
 
-    # sitemap.xml — فقط content_type، تمپلیت خودش میاد
-    path('sitemap.xml', sitemap, {
-        'sitemaps': sitemaps,
-        'content_type': 'text/xml',
-    }, name='django_sitemap'),
+    # sitemap.xml — index بخش‌ها؛ هر بخش جدا رندر و کش می‌شود
+    path('sitemap.xml', sitemaps.index, name='django_sitemap'),
+    path('sitemap-<str:section>.xml', sitemaps.section, name='sitemap_section'),
 ]
 
 
@@ -3,6 +3,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.html import format_html
 from django.urls import reverse
 from .models import Category, Business, BusinessImage, Service, BusinessHours, BusinessRating
+from . import cache, conditional, facets, ratings, search
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -23,6 +24,7 @@ class BusinessAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     prepopulated_fields = {'slug': ('name',)}
     autocomplete_fields = ['owner', 'category']
+    raw_id_fields = ('cover_image',)
     list_per_page = 20
     readonly_fields = ('created_at',)
 
@@ -30,7 +32,12 @@ class BusinessAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('owner', 'category')
 
     def approve_businesses(self, request, queryset):
-        updated = queryset.update(is_approved=True)
+        updated = facets.approve(queryset)
+        # update() سیگنال post_save نمی‌فرستد؛ ایندکس جستجو را دستی هماهنگ می‌کنیم
+        search.index_businesses(queryset)
+        business_ids = list(queryset.values_list('id', flat=True))
+        conditional.touch(business_ids)
+        cache.invalidate_businesses(business_ids)
         self.message_user(request, _(f"{updated} کسب‌وکار با موفقیت تأیید شدند."))
     approve_businesses.short_description = _("تأیید کسب‌وکارهای انتخاب‌شده")
     actions = [approve_businesses]
@@ -88,7 +95,11 @@ class BusinessRatingAdmin(admin.ModelAdmin):
     comment_preview.short_description = _('Comment')
 
     def approve_ratings(self, request, queryset):
+        business_ids = list(queryset.values_list('business_id', flat=True).distinct())
         updated = queryset.update(is_approved=True)
+        ratings.refresh(business_ids)
+        conditional.touch(business_ids)
+        cache.invalidate_businesses(business_ids)
         self.message_user(request, _(f"{updated} نظر با موفقیت تأیید شد."))
     approve_ratings.short_description = _("تأیید نظرات انتخاب‌شده")
     actions = [approve_ratings]
\ No newline at end of file
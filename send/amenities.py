@@ -0,0 +1,78 @@
+"""
+امکانات استاندارد کسب‌وکار (تحویل در محل، پارکینگ و ...) به صورت بیت‌های یک عدد.
+
+Service ها متن آزاد هستند؛ هر Service که نامش با یکی از SERVICE_CHOICES یکی
+باشد بیت مربوطش را در Business.amenities روشن می‌کند. چون فقط ۲^۶ ترکیب ممکن
+است، فیلتر «همه‌ی این امکانات را داشته باشد» به amenities IN (ترکیب‌های شامل)
+تبدیل می‌شود که روی ایندکس ستون اجرا می‌شود.
+"""
+from django.utils.translation import gettext_lazy as _
+
+from .models import Business, Service
+from .normalization import normalize
+
+# (کلید در فرم و querystring، برچسب، آیکون)؛ ترتیب، شماره‌ی بیت است و نباید عوض شود
+SERVICE_CHOICES = [
+    ('تحویل_در_محل', _('تحویل در محل'), 'fa-truck'),
+    ('رزرو_آنلاین', _('رزرو آنلاین'), 'fa-calendar-check'),
+    ('پارکینگ', _('پارکینگ'), 'fa-parking'),
+    ('وای_فای_رایگان', _('وای‌فای رایگان'), 'fa-wifi'),
+    ('فضای_خانوادگی', _('فضای خانوادگی'), 'fa-users'),
+    ('پذیرش_کارت', _('پذیرش کارت'), 'fa-credit-card'),
+]
+BITS = {key: 1 << index for index, (key, _label, _icon) in enumerate(SERVICE_CHOICES)}
+ALL = (1 << len(SERVICE_CHOICES)) - 1
+
+# نام یکسان‌شده‌ی Service → بیت؛ کلید با «_» به جای فاصله همان برچسب فارسی است
+_BY_NAME = {normalize(key.replace('_', ' ')): bit for key, bit in BITS.items()}
+
+
+def choice(key):
+    """(برچسب، آیکون) یک کلید، یا None."""
+    for choice_key, label, icon in SERVICE_CHOICES:
+        if choice_key == key:
+            return label, icon
+    return None
+
+
+def bit_for_name(name):
+    return _BY_NAME.get(normalize((name or '').replace('_', ' ')), 0)
+
+
+def mask_for_names(names):
+    mask = 0
+    for name in names:
+        mask |= bit_for_name(name)
+    return mask
+
+
+def mask_for_keys(keys):
+    mask = 0
+    for key in keys:
+        mask |= BITS.get(key, 0)
+    return mask
+
+
+def supersets(mask):
+    """همه‌ی مقدارهای amenities که تمام بیت‌های mask را دارند."""
+    return [value for value in range(ALL + 1) if value & mask == mask]
+
+
+def filter_queryset(queryset, mask):
+    if not mask:
+        return queryset
+    return queryset.filter(amenities__in=supersets(mask))
+
+
+def sync(business_ids):
+    """
+    amenities را از روی Service های فعلی دوباره حساب می‌کند. با save() ذخیره
+    می‌شود تا شمارنده‌های فیلتر و بقیه‌ی سیگنال‌های Business هم به‌روز شوند.
+    """
+    masks = dict.fromkeys(business_ids, 0)
+    for business_id, name in Service.objects.filter(business_id__in=masks).values_list('business_id', 'name'):
+        masks[business_id] |= bit_for_name(name)
+    for business in Business.objects.filter(pk__in=masks):
+        if business.amenities != masks[business.pk]:
+            business.amenities = masks[business.pk]
+            business.save(update_fields=['amenities'])
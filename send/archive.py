@@ -0,0 +1,205 @@
+"""
+بایگانی پیام‌های قدیمی چت در فایل‌های فشرده‌ی فقط-افزودنی.
+
+هر اجرا یک فایل segment تازه در CHAT_ARCHIVE_DIR می‌سازد. پیام‌های هر گفتگو یک
+عضو gzip جدا (JSON هر پیام در یک خط) در آن فایل هستند و جای آن در یک ردیف
+ArchivedMessages (فایل، offset، طول و بازه‌ی id پیام‌ها) ثبت می‌شود؛ پس خواندن
+تاریخچه‌ی یک گفتگو فقط همان چند کیلوبایت را از دیسک می‌خواند. فایل‌ها هیچ‌وقت
+بازنویسی نمی‌شوند.
+
+پیام بایگانی‌شده از جدول Message پاک می‌شود ولی فایل پیوستش در storage می‌ماند
+(ارجاع blob آن حالا مال بایگانی است) و از ایندکس جستجو حذف می‌شود. خواندن از
+طریق همان مسیر before_id در send.chat انجام می‌شود. با حذف ردیف ArchivedMessages
+(مثلاً حذف گفتگو) آن ارجاع‌ها آزاد می‌شوند و segment بی‌ارجاع هم پاک می‌شود.
+"""
+import gzip
+import json
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import chat_search
+from .models import ArchivedMessages, Message
+
+BATCH_SIZE = 500
+
+_archiving = ContextVar('send_archiving', default=False)
+
+
+def archive_dir():
+    return str(getattr(settings, 'CHAT_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive')))
+
+
+@contextmanager
+def archiving():
+    """حذف Message در این بلوک انتقال به بایگانی است: فایل پیوست آزاد نمی‌شود."""
+    token = _archiving.set(True)
+    try:
+        yield
+    finally:
+        _archiving.reset(token)
+
+
+def is_archiving():
+    return _archiving.get()
+
+
+def _record(message):
+    return {
+        'id': message.pk,
+        'sender_id': message.sender_id,
+        'sender': message.sender.username,
+        'content': message.content,
+        'file': message.file.name or None,
+        'file_type': message.file_type,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def _boundary(cutoff):
+    """کوچک‌ترین id پیامی که هنوز در بازه‌ی نگه‌داری است؛ همه‌ی پیام‌های کمتر بایگانی می‌شوند."""
+    first_recent = Message.objects.filter(created_at__gte=cutoff).order_by('pk').values_list('pk', flat=True).first()
+    if first_recent is None:
+        return (Message.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+    return first_recent
+
+
+def archive_before(cutoff, batch_size=BATCH_SIZE):
+    """
+    پیام‌های قبل از cutoff را بایگانی می‌کند و تعداد پیام‌های منتقل‌شده را برمی‌گرداند.
+    مرز بر اساس id است تا بایگانی هر گفتگو همیشه پیش از پیام‌های داغش باشد و
+    صفحه‌بندی before_id از یکی به دیگری پیوسته بماند.
+    """
+    boundary = _boundary(cutoff)
+    conversation_ids = list(
+        Message.objects.filter(pk__lt=boundary).order_by().values_list('conversation_id', flat=True).distinct()
+    )
+    if not conversation_ids:
+        return 0
+
+    os.makedirs(archive_dir(), exist_ok=True)
+    segment = f"segment-{timezone.now():%Y%m%d%H%M%S}-{boundary}.gz"
+    path = os.path.join(archive_dir(), segment)
+    archived = 0
+    with open(path, 'ab') as output:
+        for start in range(0, len(conversation_ids), batch_size):
+            batch = conversation_ids[start:start + batch_size]
+            messages = Message.objects.filter(conversation_id__in=batch, pk__lt=boundary).select_related('sender')
+            by_conversation = {}
+            for message in messages.order_by('conversation_id', 'pk').iterator(chunk_size=2000):
+                by_conversation.setdefault(message.conversation_id, []).append(message)
+
+            rows, ids = [], []
+            for conversation_id, conversation_messages in by_conversation.items():
+                lines = ''.join(
+                    json.dumps(_record(message), ensure_ascii=False) + '\n' for message in conversation_messages
+                )
+                data = gzip.compress(lines.encode())
+                offset = output.tell()
+                output.write(data)
+                rows.append(ArchivedMessages(
+                    conversation_id=conversation_id,
+                    segment=segment,
+                    offset=offset,
+                    length=len(data),
+                    first_message_id=conversation_messages[0].pk,
+                    last_message_id=conversation_messages[-1].pk,
+                    count=len(conversation_messages),
+                ))
+                ids.extend(message.pk for message in conversation_messages)
+            # داده‌ها قبل از ثبت در دیتابیس روی دیسک باشند؛ اگر وسط کار قطع شود فقط
+            # بایت‌های بی‌ارجاع در انتهای segment می‌مانند
+            output.flush()
+            os.fsync(output.fileno())
+
+            with transaction.atomic(), archiving():
+                ArchivedMessages.objects.bulk_create(rows)
+                # signals.message_deleted با archiving() فایل پیوست را آزاد نمی‌کند
+                Message.objects.filter(pk__in=ids).delete()
+                chat_search.remove_messages(ids)
+            archived += len(ids)
+    if not archived:
+        os.remove(path)
+    return archived
+
+
+def archive_due():
+    """برای زمان‌بند (cron و ...): پیام‌های قدیمی‌تر از CHAT_ARCHIVE_RETENTION_DAYS."""
+    days = getattr(settings, 'CHAT_ARCHIVE_RETENTION_DAYS', 180)
+    return archive_before(timezone.now() - timedelta(days=days))
+
+
+def _read(chunk):
+    with open(os.path.join(archive_dir(), chunk.segment), 'rb') as handle:
+        handle.seek(chunk.offset)
+        data = gzip.decompress(handle.read(chunk.length))
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+def release(chunk):
+    """
+    بعد از حذف یک ردیف ArchivedMessages: ارجاع blob پیوست‌هایش را کم می‌کند و اگر
+    ردیف دیگری به segment اشاره نکند، فایل segment را پاک می‌کند (بعد از commit).
+    """
+    try:
+        names = [record['file'] for record in _read(chunk) if record['file']]
+    except FileNotFoundError:
+        names = []
+    storage = Message._meta.get_field('file').storage
+    segment = chunk.segment
+
+    def _release():
+        for name in names:
+            storage.delete(name)
+        if not ArchivedMessages.objects.filter(segment=segment).exists():
+            try:
+                os.remove(os.path.join(archive_dir(), segment))
+            except FileNotFoundError:
+                pass
+
+    transaction.on_commit(_release)
+
+
+def _message(record, conversation, senders):
+    sender = senders.get(record['sender_id']) or get_user_model()(pk=record['sender_id'], username=record['sender'])
+    message = Message(
+        id=record['id'],
+        conversation=conversation,
+        sender=sender,
+        content=record['content'],
+        file=record['file'],
+        file_type=record['file_type'],
+    )
+    message.created_at = parse_datetime(record['created_at'])
+    return message
+
+
+def latest(conversation, limit, before_id=None):
+    """
+    مثل chat.latest ولی از بایگانی: آخرین limit پیام بایگانی‌شده قبل از before_id
+    (Message های ذخیره‌نشده) به ترتیب زمانی، و اینکه قدیمی‌تر هم هست یا نه.
+    """
+    chunks = ArchivedMessages.objects.filter(conversation=conversation)
+    if before_id is not None:
+        chunks = chunks.filter(first_message_id__lt=before_id)
+    if limit <= 0:
+        return [], chunks.exists()
+    records, has_more = [], False
+    for chunk in chunks.order_by('-last_message_id').iterator():
+        if len(records) > limit:
+            has_more = True
+            break
+        chunk_records = [record for record in _read(chunk) if before_id is None or record['id'] < before_id]
+        records = chunk_records + records
+    if len(records) > limit:
+        has_more = True
+        records = records[-limit:]
+    senders = get_user_model().objects.in_bulk({record['sender_id'] for record in records})
+    return [_message(record, conversation, senders) for record in records], has_more
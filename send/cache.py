@@ -0,0 +1,78 @@
+"""
+کش بخش عمومی (غیرشخصی) صفحه‌ی جزئیات کسب‌وکار.
+
+کلید هر ورودی شامل slug و یک نسخه است؛ با هر تغییر در کسب‌وکار یا مدل‌های
+وابسته‌اش فقط نسخه عوض می‌شود و ورودی قبلی دیگر خوانده نمی‌شود (و بعداً منقضی
+می‌شود). از «مشاغل مشابه» فقط id همسایه‌ها کش می‌شود و کارت‌ها در هر درخواست
+خوانده می‌شوند، پس تغییر یک کسب‌وکار صفحه‌ی همسایه‌هایش را باطل نمی‌کند؛ فقط
+ساخت دوباره‌ی جدول همسایه‌ها (send.similarity.rebuild) همه را باطل می‌کند.
+شمارنده‌های hit/miss در همان backend کش نگه‌داری می‌شوند.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+PREFIX = 'send:detail'
+ALL_VERSION_KEY = f'{PREFIX}:version:all'
+
+
+def _version_key(slug):
+    return f'{PREFIX}:version:{slug}'
+
+
+def _version(key):
+    return cache.get_or_set(key, uuid.uuid4().hex, None)
+
+
+def _incr(name):
+    key = f'{PREFIX}:stats:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_detail_context(slug, build):
+    """
+    context ذخیره‌شده برای slug را برمی‌گرداند یا با build() می‌سازد.
+    اگر build() مقدار None برگرداند (کسب‌وکار نیست) چیزی کش نمی‌شود.
+    """
+    key = f'{PREFIX}:{slug}:{_version(_version_key(slug))}:{_version(ALL_VERSION_KEY)}'
+    context = cache.get(key)
+    if context is not None:
+        _incr('hits')
+        return context
+    _incr('misses')
+    context = build()
+    if context is not None:
+        cache.set(key, context, getattr(settings, 'BUSINESS_DETAIL_CACHE_TIMEOUT', 300))
+    return context
+
+
+def invalidate_detail(slug):
+    if slug:
+        cache.set(_version_key(slug), uuid.uuid4().hex, None)
+
+
+def invalidate_all():
+    cache.set(ALL_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_businesses(business_ids):
+    from .models import Business
+
+    for slug in Business.objects.filter(pk__in=set(business_ids)).values_list('slug', flat=True):
+        invalidate_detail(slug)
+
+
+def stats():
+    hits = cache.get(f'{PREFIX}:stats:hits', 0)
+    misses = cache.get(f'{PREFIX}:stats:misses', 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+
+
+def reset_stats():
+    cache.delete_many([f'{PREFIX}:stats:hits', f'{PREFIX}:stats:misses'])
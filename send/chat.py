@@ -0,0 +1,134 @@
+"""
+خواندن پیام‌های یک گفتگو به صورت تکه‌ای با cursor روی id پیام.
+
+id پیام‌ها صعودی است و با ترتیب created_at یکی است، پس «پیام‌های بعد از X» و
+«پیام‌های قبل از X» هر دو یک جستجوی بازه‌ای روی کلید اصلی هستند و هزینه‌شان به
+طول تاریخچه‌ی گفتگو بستگی ندارد.
+
+زمان و متن کوتاه آخرین پیام و تعداد نخوانده‌های هر طرف روی خود Conversation
+نگه داشته می‌شود تا صندوق پیام‌ها بدون زیرکوئری به ازای هر گفتگو ساخته شود.
+"""
+from django.conf import settings
+from django.db.models import Case, F, PositiveIntegerField, When
+from django.utils.text import Truncator
+
+from . import archive, realtime
+from .models import Conversation, Message
+from .pagination import KeysetPaginator
+
+MAX_WAIT = 30
+SNIPPET_LENGTH = 100
+INBOX_ORDERING = ('-last_message_at', '-id')
+FILE_LABELS = {'image': 'تصویر', 'video': 'ویدیو'}
+
+
+def page_size():
+    return getattr(settings, 'CHAT_MESSAGES_PAGE_SIZE', 50)
+
+
+def _messages(conversation):
+    return Message.objects.filter(conversation=conversation).select_related('sender')
+
+
+def _attach(messages, conversation):
+    # گفتگو یک بار خوانده شده؛ کسب‌وکارش برای هر پیام دوباره کوئری نشود
+    for message in messages:
+        message.conversation = conversation
+    return messages
+
+
+def latest(conversation, limit=None, before_id=None):
+    """
+    آخرین limit پیام (قبل از before_id اگر داده شود) به ترتیب زمانی، و اینکه
+    پیام قدیمی‌تری هم هست یا نه.
+    """
+    limit = limit or page_size()
+    queryset = _messages(conversation)
+    if before_id is not None:
+        queryset = queryset.filter(pk__lt=before_id)
+    messages = list(queryset.order_by('-pk')[:limit + 1])
+    if len(messages) > limit:
+        return _attach(messages[:limit][::-1], conversation), True
+    # پیام‌های جدول تمام شد؛ بقیه‌ی صفحه از بایگانی
+    oldest = messages[-1].pk if messages else before_id
+    archived, has_more = archive.latest(conversation, limit - len(messages), oldest)
+    return archived + _attach(messages[::-1], conversation), has_more
+
+
+def after(conversation, after_id, limit=None):
+    """پیام‌های بعد از after_id، قدیمی‌ترین اول؛ has_more یعنی تکه‌ی بعدی هم هست."""
+    limit = limit or page_size()
+    messages = list(_messages(conversation).filter(pk__gt=after_id).order_by('pk')[:limit + 1])
+    return _attach(messages[:limit], conversation), len(messages) > limit
+
+
+def wait_after(conversation, after_id, timeout, limit=None):
+    """
+    مثل after، ولی اگر پیام تازه‌ای نباشد حداکثر timeout ثانیه منتظر انتشار پیام
+    روی broker می‌ماند و بعد یک بار دیگر می‌خواند. گوش دادن قبل از کوئری اول
+    شروع می‌شود تا پیامی که بین این دو commit شود از دست نرود.
+    """
+    timeout = min(max(timeout, 0), MAX_WAIT)
+    waiter = realtime.get_broker().waiter(realtime.conversation_channel(conversation.pk))
+    try:
+        messages, has_more = after(conversation, after_id, limit)
+        if messages or not timeout:
+            return messages, has_more
+        if not waiter.wait(timeout):
+            return [], False
+        return after(conversation, after_id, limit)
+    finally:
+        waiter.close()
+
+
+def serialize(message, user):
+    return {**realtime.message_payload(message), 'is_sent': message.sender_id == user.pk}
+
+
+def snippet(content, file_type=None):
+    """متن کوتاه آخرین پیام برای صندوق؛ پیام بدون متن با نوع فایلش نشان داده می‌شود."""
+    text = ' '.join((content or '').split())
+    if not text and file_type:
+        text = FILE_LABELS.get(file_type, 'فایل')
+    return Truncator(text).chars(SNIPPET_LENGTH)
+
+
+def message_created(message):
+    """
+    آخرین پیام را ثبت و نخوانده‌های طرف مقابل را یکی زیاد می‌کند، در یک UPDATE
+    تا دو پیام هم‌زمان شمارنده را گم نکنند.
+    """
+    from_user = Case(When(user_id=message.sender_id, then=1), default=0, output_field=PositiveIntegerField())
+    Conversation.objects.filter(pk=message.conversation_id).update(
+        last_message_at=message.created_at,
+        last_message=snippet(message.content, message.file_type),
+        owner_unread=F('owner_unread') + from_user,
+        user_unread=F('user_unread') + 1 - from_user,
+    )
+
+
+def _is_owner(conversation, user):
+    return conversation.owner_id == user.pk and conversation.user_id != user.pk
+
+
+def mark_read(conversation, user):
+    field = 'owner_unread' if _is_owner(conversation, user) else 'user_unread'
+    if getattr(conversation, field):
+        Conversation.objects.filter(pk=conversation.pk).update(**{field: 0})
+        setattr(conversation, field, 0)
+
+
+def inbox(user, as_owner, cursor=None):
+    """
+    یک صفحه از گفتگوهای کاربر (یا همه‌ی گفتگوهای کسب‌وکارهایش اگر as_owner)، تازه‌ترین
+    اول. unread_count هر گفتگو تعداد نخوانده‌های همین کاربر است.
+    """
+    if as_owner:
+        queryset = Conversation.objects.filter(owner=user).select_related('business', 'user')
+    else:
+        queryset = Conversation.objects.filter(user=user).select_related('business')
+    paginator = KeysetPaginator(queryset, INBOX_ORDERING, getattr(settings, 'CHAT_INBOX_PAGE_SIZE', 30))
+    page = paginator.page(cursor)
+    for conversation in page:
+        conversation.unread_count = conversation.owner_unread if as_owner else conversation.user_unread
+    return page
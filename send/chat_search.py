@@ -0,0 +1,214 @@
+"""
+ایندکس متن کامل پیام‌های چت، محدود به گفتگوهایی که کاربر در آن‌ها طرف است.
+
+کنار متن هر پیام، طرفین گفتگو به شکل توکن («u<id>» برای کاربر و «o<id>» برای
+مالک کسب‌وکار) هم ایندکس می‌شوند؛ پس محدود کردن نتایج به گفتگوهای خود کاربر
+بخشی از همان MATCH است و لازم نیست همه‌ی پیام‌های مطابق اسکن شوند. نتایج از
+تازه‌ترین پیام مرتب می‌شوند و صفحه‌ی بعد با before_id (id آخرین نتیجه) می‌آید.
+
+مثل send.search روی SQLite از FTS5 و روی PostgreSQL از tsvector استفاده می‌شود
+و روی بقیه‌ی دیتابیس‌ها به icontains برمی‌گردد.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Message
+from .normalization import normalize
+
+FTS_TABLE = 'send_message_fts'
+BATCH_SIZE = 1000
+SNIPPET_TOKENS = 12
+
+_TERM_RE = re.compile(r'\w+')
+# جداکننده‌های موقت هایلایت؛ بعد از escape به <mark> تبدیل می‌شوند
+_OPEN, _CLOSE = '\x02', '\x03'
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def create_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "content, participants, "
+            "tokenize = 'unicode61 remove_diacritics 2', "
+            # جستجوی پیشوندی کلمه‌های کوتاه و پرتکرار بدون ادغام همه‌ی کلمه‌های هم‌پیشوند
+            "prefix = '2 3 4')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            "message_id bigint PRIMARY KEY REFERENCES send_message (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "user_id bigint NOT NULL, owner_id bigint NOT NULL, "
+            "content text NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+            f"ON {FTS_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_user_idx ON {FTS_TABLE} (user_id, message_id)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_owner_idx ON {FTS_TABLE} (owner_id, message_id)"
+        )
+
+
+def drop_index(schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _write(rows):
+    """rows: لیست (message_id, user_id, owner_id, content)"""
+    if not rows:
+        return
+    # یک تراکنش برای هر دسته؛ در autocommit هر ردیف یک commit جدا می‌شد
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, content, participants) VALUES (%s, %s, %s)",
+                [(pk, normalize(content), f'u{user_id} o{owner_id}') for pk, user_id, owner_id, content in rows],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (message_id, user_id, owner_id, content, document) "
+                "VALUES (%s, %s, %s, %s, to_tsvector('simple', %s)) "
+                "ON CONFLICT (message_id) DO UPDATE SET user_id = EXCLUDED.user_id, "
+                "owner_id = EXCLUDED.owner_id, content = EXCLUDED.content, document = EXCLUDED.document",
+                [
+                    (pk, user_id, owner_id, normalize(content), normalize(content))
+                    for pk, user_id, owner_id, content in rows
+                ],
+            )
+
+
+def _delete(ids):
+    ids = list(ids)
+    if not ids:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'message_id'
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE {column} = %s", [(pk,) for pk in ids])
+
+
+def index_messages(queryset):
+    if not is_supported():
+        return
+    rows = []
+    fields = ('id', 'conversation__user_id', 'conversation__owner_id', 'content')
+    for row in queryset.values_list(*fields).iterator(chunk_size=BATCH_SIZE):
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            _write(rows)
+            rows = []
+    _write(rows)
+
+
+def index_message(message):
+    if is_supported():
+        conversation = message.conversation
+        _write([(message.pk, conversation.user_id, conversation.owner_id, message.content)])
+
+
+def remove_messages(ids):
+    if is_supported():
+        _delete(ids)
+
+
+def rebuild():
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    queryset = Message.objects.all()
+    index_messages(queryset)
+    return queryset.count()
+
+
+def _terms(query):
+    return _TERM_RE.findall(normalize(query))
+
+
+def _match(user, terms):
+    if connection.vendor == 'sqlite':
+        text = ' '.join(f'"{term}"*' for term in terms)
+        return f'content : ({text}) AND participants : ("u{user.pk}" OR "o{user.pk}")'
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _search_rows(user, terms, before_id, limit):
+    """(message_id, snippet) های مطابق، تازه‌ترین اول."""
+    params = [_match(user, terms)]
+    if connection.vendor == 'sqlite':
+        sql = (
+            f"SELECT rowid, snippet({FTS_TABLE}, 0, %s, %s, '…', {SNIPPET_TOKENS}) "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        )
+        params = [_OPEN, _CLOSE, *params]
+        if before_id is not None:
+            sql += " AND rowid < %s"
+            params.append(before_id)
+        sql += " ORDER BY rowid DESC LIMIT %s"
+    else:
+        sql = (
+            f"SELECT message_id, ts_headline('simple', content, to_tsquery('simple', %s), %s) "
+            f"FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', %s) "
+            "AND (user_id = %s OR owner_id = %s)"
+        )
+        options = f'StartSel={_OPEN}, StopSel={_CLOSE}, MaxWords={SNIPPET_TOKENS}, MinWords=3'
+        params = [params[0], options, params[0], user.pk, user.pk]
+        if before_id is not None:
+            sql += " AND message_id < %s"
+            params.append(before_id)
+        sql += " ORDER BY message_id DESC LIMIT %s"
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _highlight(text):
+    return mark_safe(escape(text).replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>'))
+
+
+def search_messages(user, query, before_id=None, limit=20):
+    """
+    یک صفحه از پیام‌های مطابق query در گفتگوهای user (همان شرط دسترسی
+    get_messages)، تازه‌ترین اول. هر پیام snippet هایلایت‌شده دارد؛ has_more
+    یعنی صفحه‌ی بعدی با before_id=آخرین id هست.
+    """
+    terms = _terms(query)
+    if not terms:
+        return [], False
+    if is_supported():
+        rows = _search_rows(user, terms, before_id, limit + 1)
+        snippets = dict(rows[:limit])
+        ids = [pk for pk, _snippet in rows]
+    else:
+        queryset = Message.objects.filter(Q(conversation__user=user) | Q(conversation__owner=user))
+        for term in terms:
+            queryset = queryset.filter(content__icontains=term)
+        if before_id is not None:
+            queryset = queryset.filter(pk__lt=before_id)
+        ids = list(queryset.order_by('-pk').values_list('pk', flat=True)[:limit + 1])
+        snippets = {}
+    has_more = len(ids) > limit
+    # شرط دسترسی دوباره روی خود گفتگو هم چک می‌شود، حتی اگر ایندکس عقب مانده باشد
+    messages = Message.objects.filter(
+        Q(conversation__user=user) | Q(conversation__owner=user), pk__in=ids[:limit]
+    ).select_related(
+        'sender', 'conversation__business', 'conversation__user'
+    ).order_by('-pk')
+    for message in messages:
+        message.snippet = _highlight(snippets.get(message.pk, message.content[:200]))
+    return list(messages), has_more
@@ -0,0 +1,98 @@
+"""
+اعتبارسنج‌های ETag/Last-Modified برای GET شرطی.
+
+همه از روی Business.updated_at (خود کسب‌وکار و همسایه‌هایش) و جدول FacetCount
+حساب می‌شوند و هیچ‌کدام صفحه را رندر نمی‌کنند؛ اگر چیزی عوض نشده باشد پاسخ
+304 بدون بدنه برمی‌گردد.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.db.models import Max, Sum
+from django.middleware.csrf import get_token
+from django.utils import timezone
+
+from . import hours, similarity
+from .models import Business, Category, FacetCount
+
+
+def touch(business_ids):
+    """updated_at کسب‌وکارها را جلو می‌برد (برای تغییر مدل‌های وابسته یا update() گروهی)."""
+    from . import sitemaps
+
+    business_ids = set(business_ids)
+    Business.objects.filter(pk__in=business_ids).update(updated_at=timezone.now())
+    sitemaps.invalidate(business_ids)
+
+
+def catalogue_stamp():
+    """
+    (آخرین تغییر هر کسب‌وکار، تعداد کل تأییدشده‌ها). تعداد لازم است چون حذف
+    یک کسب‌وکار هیچ updated_at ای را جلو نمی‌برد.
+    """
+    last_modified = Business.objects.aggregate(last=Max('updated_at'))['last']
+    total = FacetCount.objects.aggregate(total=Sum('count'))['total'] or 0
+    return last_modified, total
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def business_list_etag(request):
+    # پیام‌های flash با رندر مصرف می‌شوند؛ تا وقتی صف دارند پاسخ شرطی نمی‌دهیم
+    if len(messages.get_messages(request)):
+        return None
+    last_modified, total = catalogue_stamp()
+    # منوی کاربر در base.html رندر می‌شود و فرم خروجش csrf_token دارد، پس کاربر،
+    # session و کوکی CSRF (که با ورود دوباره عوض می‌شود) هم جزء کلید هستند
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    csrf_secret = None
+    if request.user.is_authenticated:
+        # همان secretی که فرم خروج رندر می‌کند (اگر کوکی نباشد همین‌جا ساخته می‌شود)
+        get_token(request)
+        csrf_secret = request.META.get('CSRF_COOKIE')
+    # دسته‌ی تازه (هنوز بدون کسب‌وکار) هم در ستون فیلترها می‌آید
+    categories = list(Category.objects.order_by('pk').values_list('pk', 'name', 'slug'))
+    query = sorted((key, sorted(request.GET.getlist(key))) for key in request.GET)
+    # نتیجه‌ی open=now بدون هیچ تغییری در داده با گذر زمان عوض می‌شود
+    minute = hours.minute_of_week() if request.GET.get('open') == 'now' else None
+    return _etag(
+        request.user.pk, session_key, csrf_secret, categories, query,
+        last_modified and last_modified.isoformat(), total, minute,
+    )
+
+
+def _detail_stamp(request, slug):
+    """
+    (updated_at خود کسب‌وکار، [(id, updated_at) همسایه‌های نمایش‌داده‌شده]) یا None.
+    کارت همسایه‌ها (نام، امتیاز، تصویر کاور) هم در صفحه رندر می‌شود؛ ساخته شدن
+    نسخه‌های کوچک تصویر هم updated_at را جلو می‌برد (send.thumbnails.generate).
+    برای هر درخواست یک بار حساب می‌شود.
+    """
+    cache_attr = '_business_detail_stamp'
+    if not hasattr(request, cache_attr):
+        business = Business.objects.filter(slug=slug, is_approved=True).only('category_id', 'updated_at').first()
+        stamp = None
+        if business is not None:
+            neighbours = similarity.for_business(business, Business.objects.only('updated_at'))
+            stamp = business.updated_at, [(neighbour.pk, neighbour.updated_at) for neighbour in neighbours]
+        setattr(request, cache_attr, stamp)
+    return getattr(request, cache_attr)
+
+
+def business_detail_last_modified(request, slug):
+    stamp = _detail_stamp(request, slug)
+    if stamp is None:
+        return None
+    updated_at, neighbours = stamp
+    return max([updated_at, *(changed for _pk, changed in neighbours)])
+
+
+def business_detail_etag(request, slug):
+    stamp = _detail_stamp(request, slug)
+    if stamp is None:
+        return None
+    updated_at, neighbours = stamp
+    # id همسایه‌ها هم لازم است: حذف یا رد شدن یکی، همسایه‌ی قدیمی‌تری را جایش می‌آورد
+    return _etag(slug, updated_at.isoformat(), *(f'{pk}@{changed.isoformat()}' for pk, changed in neighbours))
@@ -0,0 +1,118 @@
+"""
+شمارنده‌های فیلتر دسته‌بندی، شهر و امکانات در لیست کسب‌وکارها.
+
+به‌جای GROUP BY روی کل جدول کسب‌وکارها در هر درخواست، تعداد تأییدشده‌ها به ازای
+هر (دسته‌بندی، شهر، ترکیب امکانات) در جدول FacetCount نگه‌داری و با هر تغییر
+به‌روز می‌شود.
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Business, FacetCount
+
+
+def facet_key(business):
+    """کلید شمارنده‌ی یک کسب‌وکار، یا None اگر در لیست عمومی نمی‌آید."""
+    if not business.is_approved or not business.slug:
+        return None
+    return (business.category_id, business.city, business.amenities)
+
+
+def apply(deltas):
+    """deltas: نگاشت (category_id, city, amenities) → تغییر تعداد"""
+    for (category_id, city, amenities), delta in deltas.items():
+        if not delta:
+            continue
+        lookup = {'category_id': category_id, 'city': city, 'amenities': amenities}
+        updated = FacetCount.objects.filter(**lookup).update(count=F('count') + delta)
+        if updated or delta < 0:
+            continue
+        try:
+            with transaction.atomic():
+                FacetCount.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # ردیف را درخواست هم‌زمان دیگری ساخته است
+            FacetCount.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def move(old_key, new_key):
+    if old_key == new_key:
+        return
+    deltas = Counter()
+    if old_key is not None:
+        deltas[old_key] -= 1
+    if new_key is not None:
+        deltas[new_key] += 1
+    apply(deltas)
+
+
+def approve(queryset):
+    """
+    تأیید گروهی با update()؛ باید به جای queryset.update(is_approved=True)
+    صدا زده شود چون update() سیگنالی نمی‌فرستد.
+    """
+    with transaction.atomic():
+        pending = list(
+            queryset.filter(is_approved=False).exclude(slug='')
+            .values('category_id', 'city', 'amenities').annotate(n=Count('id'))
+        )
+        updated = queryset.update(is_approved=True)
+        apply(Counter({(row['category_id'], row['city'], row['amenities']): row['n'] for row in pending}))
+    return updated
+
+
+def rebuild():
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        FacetCount.objects.bulk_create([
+            FacetCount(category_id=row['category_id'], city=row['city'], amenities=row['amenities'], count=row['n'])
+            for row in Business.objects.filter(is_approved=True).exclude(slug='')
+            .values('category_id', 'city', 'amenities').annotate(n=Count('id'))
+        ])
+    return FacetCount.objects.count()
+
+
+class Facets:
+    """همه‌ی شمارنده‌ها با یک کوئری خوانده و بقیه در حافظه محاسبه می‌شود."""
+
+    def __init__(self):
+        self.rows = list(
+            FacetCount.objects.filter(count__gt=0).values_list('category_id', 'city', 'amenities', 'count')
+        )
+        self.by_category = defaultdict(int)
+        self.by_city = defaultdict(int)
+        for category_id, city, _amenities, count in self.rows:
+            self.by_category[category_id] += count
+            self.by_city[city] += count
+
+    def _matching(self, category_ids, cities, amenities):
+        for category_id, city, mask, count in self.rows:
+            if (
+                (category_ids is None or category_id in category_ids)
+                and (cities is None or city in cities)
+                and mask & amenities == amenities
+            ):
+                yield mask, count
+
+    def total(self, category_ids=None, cities=None, amenities=0):
+        """
+        تعداد کسب‌وکارها برای ترکیب فیلتر؛ None یعنی بدون فیلتر روی آن بُعد و
+        amenities بیت‌هایی است که همه باید داشته باشند.
+        """
+        return sum(count for _mask, count in self._matching(category_ids, cities, amenities))
+
+    def by_amenity(self, category_ids=None, cities=None, amenities=0):
+        """بیت → تعداد کسب‌وکارهای دارای آن امکان، در کنار بقیه‌ی فیلترهای فعلی."""
+        counts = defaultdict(int)
+        for mask, count in self._matching(category_ids, cities, amenities):
+            bit = 1
+            while bit <= mask:
+                if mask & bit:
+                    counts[bit] += count
+                bit <<= 1
+        return counts
+
+    def cities(self):
+        return [{'city': city, 'count': count} for city, count in sorted(self.by_city.items())]
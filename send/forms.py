@@ -10,7 +10,7 @@ class BusinessRegisterForm(forms.ModelForm):
 
     class Meta:
         model = Business
-        fields = ['name', 'category', 'phone', 'instagram', 'description', 'address', 'city', 'district']
+        fields = ['name', 'category', 'phone', 'instagram', 'description', 'address', 'city', 'district', 'latitude', 'longitude']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-input', 'placeholder': _('مثال: میزبان')}),
             'category': forms.Select(attrs={'class': 'form-select'}),
@@ -26,6 +26,8 @@ class BusinessRegisterForm(forms.ModelForm):
                 ('شیراز', 'شیراز'),
             ]),
             'district': forms.TextInput(attrs={'class': 'form-input', 'placeholder': _('منطقه یا محله')}),
+            'latitude': forms.HiddenInput(),
+            'longitude': forms.HiddenInput(),
         }
         labels = {
             'name': _('نام شغل'),
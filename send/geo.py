@@ -0,0 +1,141 @@
+"""
+جستجوی «نزدیک من» روی مختصات کسب‌وکارها.
+
+هر کسب‌وکار یک geohash دارد (ستون ایندکس‌شده‌ی Business.geohash). برای یک شعاع،
+مستطیل دربرگیرنده با چند خانه‌ی geohash پوشانده می‌شود و هر خانه یک بازه‌ی
+پیشوندی روی ایندکس است؛ فاصله‌ی دقیق (haversine) فقط برای همین نامزدها در خود
+کوئری حساب می‌شود، پس مرتب‌سازی و صفحه‌بندی کلیدی روی فاصله کار می‌کند.
+"""
+import math
+
+from django.db.models import F, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+from .normalization import prefix_range
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+PRECISION = 9
+# بیشتر از این تعداد خانه، کوئری را به OR طولانی تبدیل می‌کند
+MAX_CELLS = 12
+MAX_RADIUS_KM = 50
+
+
+def _cell_size(precision):
+    """ابعاد یک خانه (درجه‌ی عرض، درجه‌ی طول) در این دقت."""
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits), lat_bits, lon_bits
+
+
+def _encode_cell(lat_index, lon_index, precision):
+    _, _, lat_bits, lon_bits = _cell_size(precision)
+    value = 0
+    # بیت‌ها یکی در میان از طول و عرض، با شروع از طول
+    for i in range(precision * 5):
+        if i % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_index >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_index >> lat_bits) & 1)
+    return ''.join(BASE32[(value >> shift) & 31] for shift in range((precision - 1) * 5, -1, -5))
+
+
+def _indexes(lat, lon, precision):
+    height, width, lat_bits, lon_bits = _cell_size(precision)
+    lat_index = min(int((lat + 90) / height), (1 << lat_bits) - 1)
+    lon_index = min(int((lon + 180) / width), (1 << lon_bits) - 1)
+    return lat_index, lon_index
+
+
+def in_range(lat, lon):
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def encode(lat, lon, precision=PRECISION):
+    # بیرون از بازه، اندیس خانه منفی می‌شود و geohash بی‌معنایی ساخته می‌شد
+    if not in_range(lat, lon):
+        raise ValueError(f'coordinates out of range: {lat}, {lon}')
+    return _encode_cell(*_indexes(lat, lon, precision), precision)
+
+
+def bounding_box(lat, lon, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) مستطیلی که دایره را کامل می‌پوشاند."""
+    delta_lat = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = max(lat - delta_lat, -90.0), min(lat + delta_lat, 90.0)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return min_lat, max_lat, -180.0, 180.0
+    delta_lon = delta_lat / math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    # عبور از نصف‌النهار ۱۸۰ پشتیبانی نمی‌شود و به همان مرز بریده می‌شود
+    return min_lat, max_lat, max(lon - delta_lon, -180.0), min(lon + delta_lon, 180.0)
+
+
+def covering_cells(box):
+    """ریزترین مجموعه‌ی پیشوندهای geohash که مستطیل را با حداکثر MAX_CELLS خانه می‌پوشاند."""
+    min_lat, max_lat, min_lon, max_lon = box
+    for precision in range(PRECISION, 0, -1):
+        low = _indexes(min_lat, min_lon, precision)
+        high = _indexes(max_lat, max_lon, precision)
+        count = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+        if count <= MAX_CELLS or precision == 1:
+            return [
+                _encode_cell(lat_index, lon_index, precision)
+                for lat_index in range(low[0], high[0] + 1)
+                for lon_index in range(low[1], high[1] + 1)
+            ]
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """فاصله‌ی دو نقطه به کیلومتر؛ مرجع درستیِ nearby در bench_geo."""
+    a = (
+        math.sin(math.radians(lat2 - lat1) / 2) ** 2
+        + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _distance_expression(lat, lon):
+    a = (
+        Power(Sin(Radians(F('latitude') - lat) / 2), 2)
+        + math.cos(math.radians(lat)) * Cos(Radians(F('latitude'))) * Power(Sin(Radians(F('longitude') - lon) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def nearby(queryset, lat, lon, radius_km):
+    """
+    queryset را به کسب‌وکارهای داخل شعاع محدود می‌کند و فاصله (کیلومتر) را
+    به صورت distance روی هر ردیف می‌گذارد؛ ترتیب را صفحه‌بند تعیین می‌کند.
+    """
+    box = bounding_box(lat, lon, radius_km)
+    cells = Q()
+    for cell in covering_cells(box):
+        cells |= Q(**prefix_range('geohash', cell))
+    min_lat, max_lat, min_lon, max_lon = box
+    return queryset.filter(
+        cells,
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lon, max_lon),
+    ).annotate(
+        distance=_distance_expression(lat, lon),
+    ).filter(
+        distance__lte=radius_km,
+    )
+
+
+def parse_point(data):
+    """
+    (lat, lon, radius) از querystring، یا None اگر مختصاتی داده نشده باشد.
+    مختصات ناقص، غیرعددی یا بیرون از بازه ValueError می‌دهد.
+    """
+    if not data.get('lat') and not data.get('lng'):
+        return None
+    lat = float(data.get('lat', ''))
+    lon = float(data.get('lng', ''))
+    radius = float(data.get('radius') or 5)
+    if not in_range(lat, lon) or not radius > 0:
+        raise ValueError('invalid point')
+    return lat, lon, min(radius, MAX_RADIUS_KM)
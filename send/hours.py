@@ -0,0 +1,152 @@
+"""
+ساعات کاری به صورت بازه‌های «دقیقه‌ی هفته».
+
+BusinessHours روزها را با برچسب فارسی («شنبه - چهارشنبه») و ساعت را به شکل متن
+(«۹:۰۰») نگه می‌دارد که قابل کوئری نیست. از روی آن، هر روز به یک یا دو ردیف
+OpeningInterval تبدیل می‌شود: دقیقه‌ی شروع و پایان از ابتدای هفته (دوشنبه ۰۰:۰۰،
+مثل datetime.weekday). هیچ بازه‌ای بلندتر از یک روز نیست، پس «الان باز است» یک
+جستجوی بازه‌ای روی ایندکس start_minute است.
+"""
+import re
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import BusinessHours, OpeningInterval
+from .normalization import normalize
+
+DAY = 24 * 60
+WEEK = 7 * DAY
+
+# نام روزها بدون فاصله، با شماره‌ی datetime.weekday
+DAYS = {
+    'دوشنبه': 0,
+    'سهشنبه': 1,
+    'چهارشنبه': 2,
+    'پنجشنبه': 3,
+    'جمعه': 4,
+    'شنبه': 5,
+    'یکشنبه': 6,
+}
+# ترتیب روزها در هفته‌ی ایرانی، برای بازه‌هایی مثل «شنبه تا چهارشنبه»
+PERSIAN_WEEK = (5, 6, 0, 1, 2, 3, 4)
+EVERY_DAY = ('همه روزه', 'هر روز', 'همه روز', 'کل هفته', 'تمام هفته')
+
+_LIST_RE = re.compile(r'\s*(?:[،,؛;]|\sو\s)\s*')
+_RANGE_RE = re.compile(r'\s*(?:[-–—]|\sتا\s|\sالی\s)\s*')
+_TIME_RE = re.compile(r'^(\d{1,2})(?:[:٫.](\d{2}))?$')
+
+
+def _day(token):
+    return DAYS.get(token.replace(' ', ''))
+
+
+def parse_days(label):
+    """شماره‌ی روزهای یک برچسب؛ برای برچسب ناشناخته لیست خالی."""
+    text = normalize(label)
+    if not text:
+        return []
+    if text in EVERY_DAY:
+        return list(PERSIAN_WEEK)
+    days = []
+    for part in _LIST_RE.split(text):
+        bounds = _RANGE_RE.split(part)
+        if len(bounds) == 1:
+            day = _day(bounds[0])
+            if day is None:
+                return []
+            days.append(day)
+        elif len(bounds) == 2:
+            first, last = _day(bounds[0]), _day(bounds[1])
+            if first is None or last is None:
+                return []
+            index = PERSIAN_WEEK.index(first)
+            while True:
+                days.append(PERSIAN_WEEK[index])
+                if PERSIAN_WEEK[index] == last:
+                    break
+                index = (index + 1) % 7
+        else:
+            return []
+    return list(dict.fromkeys(days))
+
+
+def parse_time(value):
+    """«۹:۰۰»، «09:30» یا «18» به دقیقه از نیمه‌شب؛ None اگر قابل خواندن نباشد."""
+    match = _TIME_RE.match(normalize(value or ''))
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def intervals_for(days, start_time, end_time, is_closed):
+    """بازه‌های (start_minute, end_minute) یک ردیف BusinessHours."""
+    if is_closed:
+        return []
+    start, end = parse_time(start_time), parse_time(end_time)
+    if start is None or end is None:
+        return []
+    length = (end - start) % DAY or DAY  # پایان قبل از شروع یعنی تا بامداد روز بعد
+    intervals = []
+    for day in parse_days(days):
+        begin = day * DAY + start
+        finish = begin + length
+        if finish > WEEK:
+            intervals.append((begin, WEEK))
+            intervals.append((0, finish - WEEK))
+        else:
+            intervals.append((begin, finish))
+    return intervals
+
+
+def minute_of_week(when=None):
+    when = timezone.localtime(when) if when else timezone.localtime()
+    return when.weekday() * DAY + when.hour * 60 + when.minute
+
+
+def sync(business_ids):
+    """بازه‌های این کسب‌وکارها را از روی BusinessHours فعلی‌شان از نو می‌سازد."""
+    business_ids = list(business_ids)
+    if not business_ids:
+        return
+    rows = []
+    for hours in BusinessHours.objects.filter(business_id__in=business_ids):
+        rows.extend(
+            OpeningInterval(business_id=hours.business_id, start_minute=start, end_minute=end)
+            for start, end in intervals_for(hours.days, hours.start_time, hours.end_time, hours.is_closed)
+        )
+    with transaction.atomic():
+        OpeningInterval.objects.filter(business_id__in=business_ids).delete()
+        OpeningInterval.objects.bulk_create(rows, batch_size=1000)
+
+
+def open_at(queryset, minute):
+    """کسب‌وکارهایی از queryset که در این دقیقه‌ی هفته باز هستند."""
+    open_ids = OpeningInterval.objects.filter(
+        start_minute__gt=minute - DAY,
+        start_minute__lte=minute,
+        end_minute__gt=minute,
+    ).values('business_id')
+    return queryset.filter(id__in=open_ids)
+
+
+def requested_minute(data):
+    """
+    دقیقه‌ی هفته‌ی فیلتر لیست: open=now برای همین حالا، یا open_at به شکل
+    datetime-local («2024-05-01T18:30»)؛ بدون فیلتر None.
+    """
+    if data.get('open') == 'now':
+        return minute_of_week()
+    try:
+        when = parse_datetime(data.get('open_at') or '')
+    except ValueError:
+        return None
+    if when is None:
+        return None
+    if timezone.is_naive(when):
+        when = timezone.make_aware(when)
+    return minute_of_week(when)
@@ -0,0 +1,29 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from send import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'پیام‌های قدیمی چت را به فایل‌های بایگانی فشرده منتقل می‌کند؛ '
+        'برای اجرای دوره‌ای با cron یا هر زمان‌بند دیگر'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'CHAT_ARCHIVE_RETENTION_DAYS', 180),
+            help='پیام‌های قدیمی‌تر از این تعداد روز بایگانی می‌شوند',
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE, help='تعداد گفتگو در هر تراکنش')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        count = archive.archive_before(cutoff, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'{count} پیام در {elapsed:.1f} ثانیه بایگانی شد.'))
@@ -0,0 +1,77 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from send import geo
+from send.models import Business
+from send.pagination import KeysetPaginator
+
+
+class Command(BaseCommand):
+    help = 'مقایسه‌ی جستجوی نزدیکی (geohash) با محاسبه‌ی فاصله‌ی همه‌ی کسب‌وکارها'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=100)
+        parser.add_argument('--radius', type=float, default=5.0, help='کیلومتر')
+        parser.add_argument('--page-size', type=int, default=12)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        radius = options['radius']
+        base = Business.objects.filter(is_approved=True).exclude(slug='')
+        points = list(
+            base.filter(latitude__isnull=False, longitude__isnull=False)
+            .values_list('id', 'latitude', 'longitude')
+        )
+        if not points:
+            self.stdout.write(self.style.WARNING('هیچ کسب‌وکار تأییدشده‌ای مختصات ندارد.'))
+            return
+
+        centres = []
+        for _ in range(options['samples']):
+            _, lat, lon = rng.choice(points)
+            centres.append((lat + rng.uniform(-0.02, 0.02), lon + rng.uniform(-0.02, 0.02)))
+
+        brute_timings, geo_timings, first_page_timings = [], [], []
+        mismatches, found = 0, 0
+        for lat, lon in centres:
+            start = time.perf_counter()
+            expected = sorted(
+                (distance, pk) for pk, distance in (
+                    (pk, geo.haversine(lat, lon, p_lat, p_lon)) for pk, p_lat, p_lon in points
+                ) if distance <= radius
+            )
+            brute_timings.append((time.perf_counter() - start) * 1000)
+
+            # همه‌ی صفحه‌ها را مثل کاربری که تا آخر ورق می‌زند می‌خوانیم
+            paginator = KeysetPaginator(
+                geo.nearby(base.only('id'), lat, lon, radius), ('distance', 'id'), options['page_size']
+            )
+            start = time.perf_counter()
+            page = paginator.page()
+            first_page_timings.append((time.perf_counter() - start) * 1000)
+            actual = [business.id for business in page]
+            while page.has_next():
+                page = paginator.page(page.next_cursor)
+                actual.extend(business.id for business in page)
+            geo_timings.append((time.perf_counter() - start) * 1000)
+
+            found += len(expected)
+            mismatches += actual != [pk for _, pk in expected]
+
+        for label, timings in (
+            ('brute force', brute_timings),
+            ('geo (all pages)', geo_timings),
+            ('geo (page 1)', first_page_timings),
+        ):
+            timings.sort()
+            self.stdout.write(
+                f'{label:>16}: mean {statistics.mean(timings):8.2f} ms  '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms'
+            )
+        self.stdout.write(f'{len(points)} کسب‌وکار با مختصات، میانگین {found / len(centres):.1f} نتیجه در هر جستجو')
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f'{mismatches} جستجو از {len(centres)} با نتیجه‌ی brute force فرق داشت.'))
@@ -0,0 +1,80 @@
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from PIL import Image
+
+from send.forms import BusinessRegisterForm
+from send.models import BusinessHours, BusinessImage, Category, Service
+from send.registration import register_business
+
+SERVICES = [('پارکینگ', 'fa-parking'), ('وای‌فای رایگان', 'fa-wifi'), ('پذیرش کارت', 'fa-credit-card')]
+HOURS = [
+    ('شنبه - چهارشنبه', '۹:۰۰', '۱۸:۰۰', False),
+    ('پنجشنبه', '۹:۰۰', '۱۴:۰۰', False),
+    ('جمعه', None, None, True),
+]
+
+
+def _legacy_register(form, owner, services, hours, files):
+    """مسیر قبلی business_register_view: هر ردیف یک INSERT جدا و بدون تراکنش."""
+    business = form.save(commit=False)
+    business.owner = owner
+    business.save()
+    for name, icon in services:
+        Service.objects.create(business=business, name=name, icon=icon)
+    for days, start_time, end_time, is_closed in hours:
+        BusinessHours.objects.create(
+            business=business, days=days, start_time=start_time, end_time=end_time, is_closed=is_closed
+        )
+    for file in files:
+        BusinessImage.objects.create(business=business, image=file)
+    return business
+
+
+class Command(BaseCommand):
+    help = 'مقایسه‌ی سرعت ثبت کسب‌وکار در مسیر قبلی (INSERT جدا) و مسیر تراکنشی'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200)
+        parser.add_argument('--images', type=int, default=2)
+
+    def handle(self, *args, **options):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'JPEG')
+        image = buffer.getvalue()
+        category = Category.objects.first()
+        media_root = tempfile.mkdtemp()
+        owner = get_user_model().objects.create_user(f'bench-registration-{time.time_ns()}')
+        data = {
+            'category': category.pk if category else '', 'phone': '09120000000',
+            'description': '-', 'address': '-', 'city': 'تهران', 'district': '',
+        }
+        try:
+            # نسخه‌های کوچک در هر دو مسیر همان‌جا ساخته می‌شوند تا مقایسه منصفانه بماند
+            with override_settings(MEDIA_ROOT=media_root, THUMBNAIL_ASYNC=False):
+                for label, register in (('legacy', _legacy_register), ('atomic', register_business)):
+                    start = time.perf_counter()
+                    for i in range(options['count']):
+                        # نام یکتا تا حلقه‌ی ساخت slug در Business.save() در نتیجه اثر نگذارد
+                        form = BusinessRegisterForm({**data, 'name': f'{label} {owner.pk} {i}'})
+                        if not form.is_valid():
+                            self.stderr.write(str(form.errors))
+                            return
+                        files = [
+                            SimpleUploadedFile(f'{n}.jpg', image, 'image/jpeg') for n in range(options['images'])
+                        ]
+                        register(form, owner, SERVICES, HOURS, files)
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{label:>7}: {options["count"] / elapsed:7.1f} ثبت در ثانیه '
+                        f'({elapsed / options["count"] * 1000:.1f} ms برای هر ثبت)'
+                    )
+        finally:
+            owner.delete()
+            shutil.rmtree(media_root, ignore_errors=True)
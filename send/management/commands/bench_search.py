@@ -0,0 +1,61 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from send.models import Business
+from send.search import search_businesses
+
+# شکل‌هایی که کاربران واقعاً تایپ می‌کنند
+_VARIANTS = (
+    lambda text: text.replace('ی', 'ي').replace('ک', 'ك'),
+    lambda text: text.replace(' ', '\u200c'),
+    lambda text: text.translate(str.maketrans('0123456789', '۰۱۲۳۴۵۶۷۸۹')),
+    lambda text: text.upper(),
+    lambda text: text,
+)
+
+
+def _icontains(queryset, query):
+    return queryset.filter(
+        Q(name__icontains=query) |
+        Q(description__icontains=query) |
+        Q(category__name__icontains=query)
+    )
+
+
+class Command(BaseCommand):
+    help = 'مقایسه‌ی نرخ یافتن و تأخیر جستجوی icontains با جستجوی یکسان‌شده'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--samples', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        base = Business.objects.filter(is_approved=True).exclude(slug='')
+        names = list(base.values_list('id', 'name')[:5000])
+        if not names:
+            self.stdout.write(self.style.WARNING('هیچ کسب‌وکار تأییدشده‌ای برای بنچمارک نیست.'))
+            return
+
+        queries = []
+        for _ in range(options['samples']):
+            pk, name = rng.choice(names)
+            queries.append((pk, rng.choice(_VARIANTS)(name)))
+
+        for label, lookup in (('icontains', _icontains), ('normalized', search_businesses)):
+            hits, timings = 0, []
+            for pk, query in queries:
+                start = time.perf_counter()
+                ids = set(lookup(base, query).values_list('id', flat=True))
+                timings.append((time.perf_counter() - start) * 1000)
+                hits += pk in ids
+            timings.sort()
+            self.stdout.write(
+                f'{label:>10}: hit-rate {hits / len(queries):6.1%}  '
+                f'mean {statistics.mean(timings):7.2f} ms  '
+                f'p95 {timings[int(len(timings) * 0.95) - 1]:7.2f} ms'
+            )
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from send import similarity
+
+
+class Command(BaseCommand):
+    help = 'جدول مشاغل مشابه را از نو می‌سازد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=similarity.TOP_K)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = similarity.rebuild(
+            top_k=options['top_k'],
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f'{count} ردیف نوشته شد...'),
+        )
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f'{written} همسایه در {elapsed:.1f} ثانیه ساخته شد.'))
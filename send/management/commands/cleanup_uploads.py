@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from send import uploads
+
+
+class Command(BaseCommand):
+    help = 'آپلودهای تکه‌ای نیمه‌کاره‌ی چت و فایل‌های موقتشان را پاک می‌کند'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-age-hours', type=float, default=uploads.DEFAULT_MAX_AGE.total_seconds() / 3600,
+            help='آپلودی که این مدت تکه‌ی تازه‌ای نگرفته پاک می‌شود',
+        )
+
+    def handle(self, *args, **options):
+        removed = uploads.expire(timedelta(hours=options['max_age_hours']))
+        self.stdout.write(self.style.SUCCESS(f'{removed} آپلود نیمه‌کاره پاک شد.'))
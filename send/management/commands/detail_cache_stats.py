@@ -0,0 +1,25 @@
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from send import cache
+
+
+class Command(BaseCommand):
+    help = 'آمار hit/miss کش صفحه‌ی جزئیات کسب‌وکار'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='شمارنده‌ها را صفر کن')
+
+    def handle(self, *args, **options):
+        if isinstance(default_cache, LocMemCache):
+            self.stdout.write(self.style.WARNING(
+                'کش پیش‌فرض LocMemCache است و فقط داخل هر پردازه وجود دارد؛ شمارنده‌های وب‌سرور اینجا دیده نمی‌شوند.'
+            ))
+        stats = cache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit-rate: {stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('شمارنده‌ها صفر شدند.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from send import thumbnails
+from send.models import BusinessImage
+
+
+class Command(BaseCommand):
+    help = 'نسخه‌های کوچک‌شده‌ی (WebP/JPEG) تصاویر کسب‌وکارها را می‌سازد'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='نسخه‌های موجود را هم از نو بساز')
+
+    def handle(self, *args, **options):
+        images = BusinessImage.objects.all()
+        if not options['force']:
+            # تصاویر قدیمی‌تر از derivative_widths هم عرض ثبت‌شده می‌خواهند
+            images = images.filter(Q(derivatives_ready=False) | Q(derivative_widths={}))
+        done = failed = 0
+        for business_image in images.iterator():
+            try:
+                thumbnails.generate(business_image, force=options['force'])
+                done += 1
+            except Exception as exc:
+                failed += 1
+                self.stderr.write(f'{business_image.image.name}: {exc}')
+        self.stdout.write(self.style.SUCCESS(f'{done} تصویر پردازش شد، {failed} خطا.'))
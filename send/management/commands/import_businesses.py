@@ -0,0 +1,312 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.text import slugify
+
+from send import amenities, facets, geo, hours as opening_hours, search, sitemaps
+from send.models import Business, BusinessHours, BusinessImage, Category, Service
+from send.normalization import normalize, prefix_range
+
+# هر شرط پیشوندی دو پارامتر دارد و SQLite عمق عبارت OR را محدود می‌کند
+SLUG_PREFIXES_PER_QUERY = 250
+MAX_ATTEMPTS = 3
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path, fmt):
+    """ردیف‌ها را یکی‌یکی از فایل می‌خواند؛ فایل هیچ‌وقت کامل در حافظه نمی‌آید."""
+    with open(path, encoding='utf-8-sig', newline='') as handle:
+        if fmt == 'csv':
+            for line_number, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_number, row
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if line.strip():
+                    yield line_number, line
+
+
+def _list(value):
+    """ستون‌های چندمقداری در CSV به صورت آرایه‌ی JSON نوشته می‌شوند."""
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, list):
+        raise RowError('expected a list')
+    return value
+
+
+def _float(value):
+    return None if value in (None, '') else float(value)
+
+
+def _bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+class SlugAllocator:
+    """
+    slugها را به همان شکل Business.save() (base، base-1، ...) می‌سازد، ولی به‌جای
+    یک exists() برای هر شماره، برای baseهای تازه‌ی هر دسته یک کوئری پیشوندی
+    می‌زند و بزرگ‌ترین شماره‌ی هر base را برای دسته‌های بعدی نگه می‌دارد.
+    """
+
+    MAX_CACHED = 100_000
+
+    def __init__(self):
+        self.counters = {}
+
+    def reset(self):
+        self.counters.clear()
+
+    def _load(self, bases):
+        for base in bases:
+            self.counters[base] = -1
+        for start in range(0, len(bases), SLUG_PREFIXES_PER_QUERY):
+            condition = Q()
+            for base in bases[start:start + SLUG_PREFIXES_PER_QUERY]:
+                condition |= Q(**prefix_range('slug', base))
+            for slug in Business.objects.filter(condition).values_list('slug', flat=True).iterator():
+                if slug in self.counters:
+                    self.counters[slug] = max(self.counters[slug], 0)
+                head, _, tail = slug.rpartition('-')
+                if head in self.counters and tail.isdigit():
+                    self.counters[head] = max(self.counters[head], int(tail))
+
+    def allocate(self, bases):
+        if len(self.counters) > self.MAX_CACHED:
+            self.reset()
+        self._load(sorted(set(bases) - self.counters.keys()))
+        issued, slugs = set(), []
+        for base in bases:
+            counter = self.counters[base]
+            slug = None
+            while slug is None or slug in issued:
+                counter += 1
+                slug = f'{base}-{counter}' if counter else base
+            self.counters[base] = counter
+            issued.add(slug)
+            slugs.append(slug)
+        return slugs
+
+
+class Command(BaseCommand):
+    help = 'ورود دسته‌ای کسب‌وکارها از فایل CSV یا JSONL (همراه با خدمات، ساعات و تصاویر)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', required=True, help='نام کاربری مالک کسب‌وکارهای واردشده')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='پیش‌فرض: از پسوند فایل')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--images-dir', help='پوشه‌ی فایل‌های تصویر؛ بدون آن مسیرها نام فایل‌های موجود در storage هستند')
+        parser.add_argument('--approve', action='store_true', help='کسب‌وکارهایی که is_approved ندارند تأییدشده وارد شوند')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} وجود ندارد.')
+        try:
+            self.owner = get_user_model().objects.get(username=options['owner'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"کاربر {options['owner']} وجود ندارد.")
+        self.fmt = fmt
+        self.images_dir = options['images_dir']
+        self.approve = options['approve']
+        self.slugs = SlugAllocator()
+        self.categories = {}
+        for category in Category.objects.all():
+            self.categories[category.slug] = category
+            self.categories[normalize(category.name)] = category
+
+        created = failed = 0
+        started = time.perf_counter()
+        rows = read_rows(path, fmt)
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            parsed = []
+            for line_number, raw in batch:
+                try:
+                    parsed.append(self.parse(raw))
+                except (RowError, ValueError, TypeError, KeyError) as exc:
+                    failed += 1
+                    if failed <= MAX_REPORTED_ERRORS:
+                        self.stderr.write(f'سطر {line_number}: {exc}')
+            created += self.import_batch(parsed)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{created} کسب‌وکار وارد شد، {failed} سطر رد شد '
+                f'({created / elapsed:.0f} ردیف در ثانیه)'
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{created} کسب‌وکار در {elapsed:.1f} ثانیه وارد شد ({created / max(elapsed, 1e-9):.0f} ردیف در ثانیه).'
+        ))
+        if failed:
+            self.stdout.write(self.style.WARNING(f'{failed} سطر نامعتبر بود.'))
+        self.stdout.write('برای ساخت نسخه‌های کوچک تصاویر generate_thumbnails را اجرا کنید.')
+
+    def category_for(self, value):
+        if not value:
+            return None
+        category = self.categories.get(value) or self.categories.get(normalize(value))
+        if category is None:
+            category = Category.objects.filter(name=value).first()
+            if category is None:
+                base = slug = slugify(value, allow_unicode=True) or 'category'
+                counter = 0
+                while Category.objects.filter(slug=slug).exists():
+                    counter += 1
+                    slug = f'{base}-{counter}'
+                category = Category.objects.create(name=value, slug=slug)
+            self.categories[category.slug] = category
+            self.categories[normalize(category.name)] = category
+        return category
+
+    def parse(self, raw):
+        row = raw if self.fmt == 'csv' else json.loads(raw)
+        if not isinstance(row, dict):
+            raise RowError('expected an object')
+        name = (row.get('name') or '').strip()
+        city = (row.get('city') or '').strip()
+        if not name or not city:
+            raise RowError('name and city are required')
+
+        business = Business(
+            owner=self.owner,
+            name=name,
+            category=self.category_for((row.get('category') or '').strip()),
+            description=row.get('description') or '',
+            address=row.get('address') or '',
+            city=city,
+            district=row.get('district') or None,
+            phone=row.get('phone') or '',
+            instagram=row.get('instagram') or None,
+            latitude=_float(row.get('latitude')),
+            longitude=_float(row.get('longitude')),
+            is_approved=_bool(row.get('is_approved'), self.approve),
+        )
+        if (business.latitude is None) != (business.longitude is None):
+            raise RowError('latitude and longitude must be given together')
+        if business.latitude is not None and not geo.in_range(business.latitude, business.longitude):
+            raise RowError('coordinates out of range')
+        # bulk_create متد save() را صدا نمی‌زند؛ همان فیلدهای محاسبه‌شده‌ی save()
+        business.search_key = normalize(business.name)
+        if business.latitude is not None and business.longitude is not None:
+            business.geohash = geo.encode(business.latitude, business.longitude)
+
+        services = []
+        for item in _list(row.get('services')):
+            if isinstance(item, str):
+                item = {'name': item}
+            services.append(Service(name=item['name'], icon=item.get('icon') or None))
+        business.amenities = amenities.mask_for_names(service.name for service in services)
+        hours = [
+            BusinessHours(
+                days=item['days'],
+                start_time=item.get('start_time') or None,
+                end_time=item.get('end_time') or None,
+                is_closed=_bool(item.get('is_closed'), False),
+            )
+            for item in _list(row.get('hours'))
+        ]
+        images = [self.resolve_image(str(item)) for item in _list(row.get('images'))]
+        return business, services, hours, images
+
+    def resolve_image(self, name):
+        """مسیر فایل تصویر در images-dir یا نام آن در storage؛ نبودنش خطای همین سطر است."""
+        if self.images_dir:
+            path = os.path.join(self.images_dir, name)
+            if not os.path.isfile(path):
+                raise RowError(f'image not found: {name}')
+            return path
+        if not name or not BusinessImage._meta.get_field('image').storage.exists(name):
+            raise RowError(f'image not found: {name}')
+        return name
+
+    def store_image(self, source):
+        """
+        تصویر را از راه storage فیلد ذخیره می‌کند تا ارجاع Blob آن ثبت شود؛ باید داخل
+        تراکنش دسته صدا زده شود تا rollback ارجاع را هم برگرداند.
+        """
+        field = BusinessImage._meta.get_field('image')
+        if self.images_dir:
+            handle = open(source, 'rb')
+        else:
+            handle = field.storage.open(source, 'rb')
+        with handle:
+            return field.storage.save(field.generate_filename(None, os.path.basename(source)), File(handle))
+
+    def import_batch(self, parsed):
+        if not parsed:
+            return 0
+        bases = []
+        for business, _, _, _ in parsed:
+            bases.append(slugify(business.name, allow_unicode=True) or 'business')
+
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    return self._write_batch(parsed, bases)
+            except IntegrityError:
+                # slug را هم‌زمان کس دیگری گرفته است؛ شماره‌ها را از نو بخوان
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                self.slugs.reset()
+                for business, _, _, _ in parsed:
+                    business.pk = None
+
+    def _write_batch(self, parsed, bases):
+        businesses = [business for business, _, _, _ in parsed]
+        for business, slug in zip(businesses, self.slugs.allocate(bases)):
+            business.slug = slug
+        Business.objects.bulk_create(businesses)
+
+        services, hours, images = [], [], []
+        for business, business_services, business_hours, sources in parsed:
+            names = [self.store_image(source) for source in sources]
+            for item in business_services:
+                item.business = business
+                services.append(item)
+            for item in business_hours:
+                item.business = business
+                hours.append(item)
+            images.extend(BusinessImage(business=business, image=name) for name in names)
+        Service.objects.bulk_create(services)
+        BusinessHours.objects.bulk_create(hours)
+        BusinessImage.objects.bulk_create(images)
+
+        ids = [business.pk for business in businesses]
+        if images:
+            first_image = BusinessImage.objects.filter(business=OuterRef('pk')).order_by('id').values('id')[:1]
+            Business.objects.filter(pk__in=ids).update(cover_image=Subquery(first_image))
+
+        # کارهایی که سیگنال‌های post_save برای هر کسب‌وکار انجام می‌دادند
+        search.index_businesses(Business.objects.filter(pk__in=ids))
+        if hours:
+            opening_hours.sync(ids)
+        facets.apply(Counter(
+            key for key in map(facets.facet_key, businesses) if key is not None
+        ))
+        transaction.on_commit(lambda: sitemaps.invalidate(ids))
+        return len(businesses)
@@ -0,0 +1,67 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from send.models import BusinessImage, Message
+from send.storage import BLOB_DIR
+from send.thumbnails import FORMATS, SIZES, derivative_name
+
+FIELDS = ((BusinessImage, 'image'), (Message, 'file'))
+
+
+def _move_derivatives(old_name, new_name):
+    """نسخه‌های کوچک ساخته‌شده به نام جدید منتقل می‌شوند تا دوباره encode نشوند."""
+    for size in SIZES:
+        for fmt in FORMATS:
+            source = derivative_name(old_name, size, fmt)
+            if not default_storage.exists(source):
+                continue
+            target = derivative_name(new_name, size, fmt)
+            if default_storage.exists(target):
+                default_storage.delete(source)
+            else:
+                os.makedirs(os.path.dirname(default_storage.path(target)), exist_ok=True)
+                os.replace(default_storage.path(source), default_storage.path(target))
+
+
+class Command(BaseCommand):
+    help = 'فایل‌های قدیمی تصاویر و پیوست‌های چت را به ذخیره‌ی بر اساس محتوا (blobs/) منتقل می‌کند'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true', help='فایل‌های قدیمی را بعد از انتقال پاک نکن')
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        old_sizes = {}
+        new_sizes = {}
+        for model, field_name in FIELDS:
+            field = model._meta.get_field(field_name)
+            rows = (
+                model.objects.exclude(**{f'{field_name}__isnull': True})
+                .exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__startswith': f'{BLOB_DIR}/'})
+                .values_list('pk', field_name)
+            )
+            for pk, old_name in rows.iterator():
+                if not default_storage.exists(old_name):
+                    missing += 1
+                    self.stderr.write(f'{model.__name__} {pk}: {old_name} پیدا نشد')
+                    continue
+                with default_storage.open(old_name, 'rb') as handle, transaction.atomic():
+                    new_name = field.storage.save(field.generate_filename(None, os.path.basename(old_name)), handle)
+                    model.objects.filter(pk=pk).update(**{field_name: new_name})
+                if model is BusinessImage:
+                    _move_derivatives(old_name, new_name)
+                old_sizes.setdefault(old_name, default_storage.size(old_name))
+                new_sizes.setdefault(new_name, field.storage.size(new_name))
+                moved += 1
+
+        if not options['keep_originals']:
+            for old_name in old_sizes:
+                default_storage.delete(old_name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} فایل منتقل شد ({missing} پیدا نشد): {len(old_sizes)} فایل '
+            f'{sum(old_sizes.values()) / 2**20:.1f} MB → {len(new_sizes)} blob {sum(new_sizes.values()) / 2**20:.1f} MB'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from send import facets
+
+
+class Command(BaseCommand):
+    help = 'شمارنده‌های فیلتر دسته‌بندی و شهر را از روی جدول کسب‌وکارها از نو می‌سازد'
+
+    def handle(self, *args, **options):
+        count = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{count} ردیف شمارنده ساخته شد.'))
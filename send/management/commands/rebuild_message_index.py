@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from send import chat_search
+
+
+class Command(BaseCommand):
+    help = 'ایندکس جستجوی متن کامل پیام‌های چت را از نو می‌سازد'
+
+    def handle(self, *args, **options):
+        if not chat_search.is_supported():
+            self.stdout.write(self.style.WARNING('این دیتابیس از جستجوی متن کامل پشتیبانی نمی‌کند.'))
+            return
+        count = chat_search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{count} پیام ایندکس شد.'))
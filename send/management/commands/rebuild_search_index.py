@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from send import search
+
+
+class Command(BaseCommand):
+    help = 'ایندکس جستجوی متن کامل کسب‌وکارها را از نو می‌سازد'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('این دیتابیس از جستجوی متن کامل پشتیبانی نمی‌کند.'))
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{count} کسب‌وکار ایندکس شد.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from send import ratings
+
+
+class Command(BaseCommand):
+    help = 'خلاصه‌ی امتیاز همه‌ی کسب‌وکارها را از روی نظرات تأییدشده دوباره حساب می‌کند'
+
+    def handle(self, *args, **options):
+        count = ratings.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'خلاصه‌ی امتیاز {count} کسب‌وکار به‌روز شد.'))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse
+
+from send import sitemaps
+
+
+class Command(BaseCommand):
+    help = 'همه‌ی بخش‌های نقشه‌ی سایت را از قبل رندر و در کش ذخیره می‌کند'
+
+    def handle(self, *args, **options):
+        if isinstance(cache, LocMemCache):
+            self.stdout.write(self.style.WARNING('کش پیش‌فرض LocMemCache است و وب‌سرور کش این پردازه را نمی‌بیند؛ گرم کردن بی‌فایده است.'))
+            return
+        domain = getattr(settings, 'SITEMAP_DOMAIN', '')
+        if not domain:
+            self.stdout.write(self.style.WARNING('SITEMAP_DOMAIN تنظیم نشده؛ خروجی برای هاست درخواست‌ها کش می‌شود و گرم کردن بی‌فایده است.'))
+            return
+        factory = RequestFactory(HTTP_HOST=domain)
+        sitemaps.index(factory.get(reverse('django_sitemap')))
+        names = sitemaps.section_names()
+        for name in names:
+            sitemaps.section(factory.get(reverse('sitemap_section', args=[name])), section=name)
+        self.stdout.write(self.style.SUCCESS(f'{len(names)} بخش نقشه‌ی سایت رندر شد.'))
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+FTS_TABLE = 'send_business_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # ساختار جدول همان send.search.create_index در زمان این مایگریشن است
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, description, category, city, district, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, city, district) "
+            "SELECT b.id, b.name, b.description, COALESCE(c.name, ''), b.city, COALESCE(b.district, '') "
+            "FROM send_business b LEFT JOIN send_category c ON c.id = b.category_id "
+            "WHERE b.is_approved AND b.slug <> ''"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            "business_id bigint PRIMARY KEY REFERENCES send_business (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+            f"ON {FTS_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (business_id, document) "
+            "SELECT b.id, "
+            "setweight(to_tsvector('simple', b.name), 'A') || "
+            "setweight(to_tsvector('simple', b.description), 'C') || "
+            "setweight(to_tsvector('simple', COALESCE(c.name, '')), 'B') || "
+            "setweight(to_tsvector('simple', b.city), 'B') || "
+            "setweight(to_tsvector('simple', COALESCE(b.district, '')), 'B') "
+            "FROM send_business b LEFT JOIN send_category c ON c.id = b.category_id "
+            "WHERE b.is_approved AND b.slug <> ''"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0003_businessrating_edited_at_alter_service_icon'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
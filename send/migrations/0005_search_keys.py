@@ -0,0 +1,106 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:21
+
+import re
+
+from django.db import migrations, models
+
+FTS_TABLE = 'send_business_fts'
+BATCH_SIZE = 500
+
+# کپی send.normalization.normalize در زمان این مایگریشن؛ تغییرات بعدی آن نباید
+# نتیجه‌ی اجرای دوباره‌ی مایگریشن را عوض کند
+_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',
+    '\u200d': None,
+    '\u200e': None,
+    '\u200f': None,
+    'ـ': None,
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_TRANSLATION))
+    return _SPACE_RE.sub(' ', text).strip().casefold()
+
+
+def _write_index(connection, rows):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, city, district) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (business_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (business_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def populate_search_keys(apps, schema_editor):
+    Category = apps.get_model('send', 'Category')
+    Business = apps.get_model('send', 'Business')
+    for model in (Category, Business):
+        for obj in model.objects.only('id', 'name').iterator():
+            model.objects.filter(pk=obj.pk).update(search_key=normalize(obj.name))
+
+    # ایندکس متن کامل هم باید با متن یکسان‌شده پر شود
+    connection = schema_editor.connection
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return
+    rows = []
+    businesses = Business.objects.filter(is_approved=True).exclude(slug='').values_list(
+        'id', 'name', 'description', 'category__name', 'city', 'district'
+    )
+    for pk, *fields in businesses.iterator():
+        rows.append((pk, *map(normalize, fields)))
+        if len(rows) >= BATCH_SIZE:
+            _write_index(connection, rows)
+            rows = []
+    if rows:
+        _write_index(connection, rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0004_business_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='search_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200, verbose_name='Search Key'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='search_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, verbose_name='Search Key'),
+        ),
+        migrations.RunPython(populate_search_keys, migrations.RunPython.noop),
+    ]
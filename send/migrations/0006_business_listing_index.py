@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0005_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='business',
+            index=models.Index(fields=['is_approved', '-created_at', '-id'], name='send_business_listing_idx'),
+        ),
+    ]
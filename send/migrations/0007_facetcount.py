@@ -0,0 +1,46 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_facet_counts(apps, schema_editor):
+    Business = apps.get_model('send', 'Business')
+    FacetCount = apps.get_model('send', 'FacetCount')
+    FacetCount.objects.bulk_create([
+        FacetCount(category_id=row['category_id'], city=row['city'], count=row['n'])
+        for row in Business.objects.filter(is_approved=True).exclude(slug='')
+        .values('category_id', 'city').annotate(n=models.Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0006_business_listing_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city', models.CharField(max_length=100, verbose_name='City')),
+                ('count', models.IntegerField(default=0, verbose_name='Count')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facet_counts', to='send.category', verbose_name='Category')),
+            ],
+            options={
+                'verbose_name': 'Facet Count',
+                'verbose_name_plural': 'Facet Counts',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('category', 'city'), name='send_facet_category_city_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('city',), name='send_facet_city_uniq'),
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:23
+
+from django.db import migrations, models
+
+
+def populate_rating_summary(apps, schema_editor):
+    Business = apps.get_model('send', 'Business')
+    BusinessRating = apps.get_model('send', 'BusinessRating')
+    buckets = {
+        f'rating_{i}': models.Count('id', filter=models.Q(rating__gte=i - 0.5, rating__lt=i + 0.5))
+        for i in range(1, 6)
+    }
+    rows = BusinessRating.objects.filter(is_approved=True).values('business_id').annotate(
+        rating_avg=models.Avg('rating'), rating_count=models.Count('id'), **buckets
+    )
+    for row in rows:
+        Business.objects.filter(pk=row.pop('business_id')).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0007_facetcount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='1 Star Ratings'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='2 Star Ratings'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='3 Star Ratings'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='4 Star Ratings'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='5 Star Ratings'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_avg',
+            field=models.FloatField(default=0.0, editable=False, verbose_name='Average Rating'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Rating Count'),
+        ),
+        migrations.RunPython(populate_rating_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_cover_images(apps, schema_editor):
+    Business = apps.get_model('send', 'Business')
+    BusinessImage = apps.get_model('send', 'BusinessImage')
+    first_image = BusinessImage.objects.filter(business_id=models.OuterRef('pk')).order_by('id').values('id')[:1]
+    Business.objects.filter(cover_image__isnull=True).update(cover_image=models.Subquery(first_image))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0008_business_rating_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='cover_image',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='send.businessimage', verbose_name='Cover Image'),
+        ),
+        migrations.RunPython(populate_cover_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0009_business_cover_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessimage',
+            name='derivatives_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Derivatives Ready'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0011_business_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarBusiness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Rank')),
+                ('score', models.FloatField(verbose_name='Score')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_links', to='send.business', verbose_name='Business')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='send.business', verbose_name='Similar Business')),
+            ],
+            options={
+                'verbose_name': 'Similar Business',
+                'verbose_name_plural': 'Similar Businesses',
+                'ordering': ['business', 'rank'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='similarbusiness',
+            constraint=models.UniqueConstraint(fields=('business', 'rank'), name='send_similar_business_rank_uniq'),
+        ),
+    ]
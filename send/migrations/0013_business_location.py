@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0012_similarbusiness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, verbose_name='Geohash'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='Longitude'),
+        ),
+    ]
@@ -0,0 +1,159 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:00
+
+import re
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# کپی send.normalization.normalize در زمان این مایگریشن؛ تغییرات بعدی آن نباید
+# نتیجه‌ی اجرای دوباره‌ی مایگریشن را عوض کند
+_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',
+    '\u200d': None,
+    '\u200e': None,
+    '\u200f': None,
+    'ـ': None,
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_TRANSLATION))
+    return _SPACE_RE.sub(' ', text).strip().casefold()
+
+
+# خواندن برچسب روزها و ساعت‌ها مثل send.hours در زمان این مایگریشن
+DAY = 24 * 60
+WEEK = 7 * DAY
+DAYS = {
+    'دوشنبه': 0,
+    'سهشنبه': 1,
+    'چهارشنبه': 2,
+    'پنجشنبه': 3,
+    'جمعه': 4,
+    'شنبه': 5,
+    'یکشنبه': 6,
+}
+PERSIAN_WEEK = (5, 6, 0, 1, 2, 3, 4)
+EVERY_DAY = ('همه روزه', 'هر روز', 'همه روز', 'کل هفته', 'تمام هفته')
+
+_LIST_RE = re.compile(r'\s*(?:[،,؛;]|\sو\s)\s*')
+_RANGE_RE = re.compile(r'\s*(?:[-–—]|\sتا\s|\sالی\s)\s*')
+_TIME_RE = re.compile(r'^(\d{1,2})(?:[:٫.](\d{2}))?$')
+
+
+def _day(token):
+    return DAYS.get(token.replace(' ', ''))
+
+
+def parse_days(label):
+    text = normalize(label)
+    if not text:
+        return []
+    if text in EVERY_DAY:
+        return list(PERSIAN_WEEK)
+    days = []
+    for part in _LIST_RE.split(text):
+        bounds = _RANGE_RE.split(part)
+        if len(bounds) == 1:
+            day = _day(bounds[0])
+            if day is None:
+                return []
+            days.append(day)
+        elif len(bounds) == 2:
+            first, last = _day(bounds[0]), _day(bounds[1])
+            if first is None or last is None:
+                return []
+            index = PERSIAN_WEEK.index(first)
+            while True:
+                days.append(PERSIAN_WEEK[index])
+                if PERSIAN_WEEK[index] == last:
+                    break
+                index = (index + 1) % 7
+        else:
+            return []
+    return list(dict.fromkeys(days))
+
+
+def parse_time(value):
+    match = _TIME_RE.match(normalize(value or ''))
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2) or 0)
+    if hour > 24 or minute > 59 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def intervals_for(days, start_time, end_time, is_closed):
+    if is_closed:
+        return []
+    start, end = parse_time(start_time), parse_time(end_time)
+    if start is None or end is None:
+        return []
+    length = (end - start) % DAY or DAY
+    intervals = []
+    for day in parse_days(days):
+        begin = day * DAY + start
+        finish = begin + length
+        if finish > WEEK:
+            intervals.append((begin, WEEK))
+            intervals.append((0, finish - WEEK))
+        else:
+            intervals.append((begin, finish))
+    return intervals
+
+
+def populate_intervals(apps, schema_editor):
+    BusinessHours = apps.get_model('send', 'BusinessHours')
+    OpeningInterval = apps.get_model('send', 'OpeningInterval')
+    rows = []
+    for hours in BusinessHours.objects.iterator():
+        rows.extend(
+            OpeningInterval(business_id=hours.business_id, start_minute=start, end_minute=end)
+            for start, end in intervals_for(hours.days, hours.start_time, hours.end_time, hours.is_closed)
+        )
+        if len(rows) >= 5000:
+            OpeningInterval.objects.bulk_create(rows)
+            rows = []
+    OpeningInterval.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0013_business_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OpeningInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_minute', models.PositiveIntegerField(verbose_name='Start Minute')),
+                ('end_minute', models.PositiveIntegerField(verbose_name='End Minute')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_intervals', to='send.business', verbose_name='Business')),
+            ],
+            options={
+                'verbose_name': 'Opening Interval',
+                'verbose_name_plural': 'Opening Intervals',
+                'indexes': [models.Index(fields=['start_minute', 'end_minute', 'business'], name='send_opening_minute_idx')],
+            },
+        ),
+        migrations.RunPython(populate_intervals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,119 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:03
+
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+
+# کپی send.normalization.normalize در زمان این مایگریشن؛ تغییرات بعدی آن نباید
+# نتیجه‌ی اجرای دوباره‌ی مایگریشن را عوض کند
+_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',
+    '\u200d': None,
+    '\u200e': None,
+    '\u200f': None,
+    'ـ': None,
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_TRANSLATION))
+    return _SPACE_RE.sub(' ', text).strip().casefold()
+
+
+# کلیدهای send.amenities.SERVICE_CHOICES در زمان این مایگریشن؛ ترتیب، شماره‌ی بیت است
+SERVICE_KEYS = ('تحویل_در_محل', 'رزرو_آنلاین', 'پارکینگ', 'وای_فای_رایگان', 'فضای_خانوادگی', 'پذیرش_کارت')
+_BY_NAME = {normalize(key.replace('_', ' ')): 1 << index for index, key in enumerate(SERVICE_KEYS)}
+
+
+def bit_for_name(name):
+    return _BY_NAME.get(normalize((name or '').replace('_', ' ')), 0)
+
+
+def populate_amenities(apps, schema_editor):
+    Business = apps.get_model('send', 'Business')
+    Service = apps.get_model('send', 'Service')
+    FacetCount = apps.get_model('send', 'FacetCount')
+
+    masks = defaultdict(int)
+    for business_id, name in Service.objects.values_list('business_id', 'name').iterator():
+        masks[business_id] |= bit_for_name(name)
+    by_mask = defaultdict(list)
+    for business_id, mask in masks.items():
+        if mask:
+            by_mask[mask].append(business_id)
+    for mask, ids in by_mask.items():
+        for start in range(0, len(ids), 500):
+            Business.objects.filter(pk__in=ids[start:start + 500]).update(amenities=mask)
+
+    # شمارنده‌ها حالا بُعد امکانات هم دارند
+    FacetCount.objects.all().delete()
+    FacetCount.objects.bulk_create([
+        FacetCount(category_id=row['category_id'], city=row['city'], amenities=row['amenities'], count=row['n'])
+        for row in Business.objects.filter(is_approved=True).exclude(slug='')
+        .values('category_id', 'city', 'amenities').annotate(n=models.Count('id'))
+    ])
+
+
+def merge_amenity_counts(apps, schema_editor):
+    # محدودیت‌های یکتای قبلی بُعد امکانات را ندارند
+    FacetCount = apps.get_model('send', 'FacetCount')
+    merged = list(FacetCount.objects.values('category_id', 'city').annotate(total=models.Sum('count')))
+    FacetCount.objects.all().delete()
+    FacetCount.objects.bulk_create([
+        FacetCount(category_id=row['category_id'], city=row['city'], amenities=0, count=row['total'])
+        for row in merged
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0014_opening_intervals'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='facetcount',
+            name='send_facet_category_city_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='facetcount',
+            name='send_facet_city_uniq',
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='amenities',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False, verbose_name='Amenities'),
+        ),
+        migrations.AddField(
+            model_name='facetcount',
+            name='amenities',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Amenities'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('category', 'city', 'amenities'), name='send_facet_category_city_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('city', 'amenities'), name='send_facet_city_uniq'),
+        ),
+        migrations.RunPython(populate_amenities, merge_amenity_counts),
+    ]
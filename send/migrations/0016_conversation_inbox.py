@@ -0,0 +1,84 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils.text import Truncator
+
+# متن صندوق مثل send.chat.snippet در زمان این مایگریشن
+SNIPPET_LENGTH = 100
+FILE_LABELS = {'image': 'تصویر', 'video': 'ویدیو'}
+
+
+def snippet(content, file_type=None):
+    text = ' '.join((content or '').split())
+    if not text and file_type:
+        text = FILE_LABELS.get(file_type, 'فایل')
+    return Truncator(text).chars(SNIPPET_LENGTH)
+
+
+def populate_inbox(apps, schema_editor):
+    Conversation = apps.get_model('send', 'Conversation')
+    Message = apps.get_model('send', 'Message')
+    conversations = []
+    for conversation in Conversation.objects.select_related('business').iterator():
+        conversation.owner_id = conversation.business.owner_id
+        last = Message.objects.filter(conversation_id=conversation.pk).order_by('-created_at', '-id').first()
+        conversation.last_message_at = last.created_at if last else conversation.created_at
+        conversation.last_message = snippet(last.content, last.file_type) if last else ''
+        conversations.append(conversation)
+        if len(conversations) >= 1000:
+            Conversation.objects.bulk_update(conversations, ['owner', 'last_message_at', 'last_message'])
+            conversations = []
+    Conversation.objects.bulk_update(conversations, ['owner', 'last_message_at', 'last_message'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('send', '0015_amenities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='owner',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owned_conversations', to=settings.AUTH_USER_MODEL, verbose_name='Owner'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Last Message At'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='Last Message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='user_unread',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='User Unread'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='owner_unread',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Owner Unread'),
+        ),
+        migrations.RunPython(populate_inbox, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='conversation',
+            name='owner',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='owned_conversations', to=settings.AUTH_USER_MODEL, verbose_name='Owner'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['owner', '-last_message_at', '-id'], name='send_conv_owner_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-last_message_at', '-id'], name='send_conv_user_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:13
+
+from django.db import migrations, models
+import send.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0016_conversation_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Name')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Size')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='References')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+            ],
+            options={
+                'verbose_name': 'Blob',
+                'verbose_name_plural': 'Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='businessimage',
+            name='image',
+            field=models.ImageField(storage=send.storage.ContentAddressedStorage(), upload_to='business_images/', verbose_name='Image'),
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=send.storage.ContentAddressedStorage(), upload_to='chat_files/', verbose_name='File'),
+        ),
+    ]
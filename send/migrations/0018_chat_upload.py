@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('send', '0017_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Filename')),
+                ('content_type', models.CharField(max_length=100, verbose_name='Content Type')),
+                ('size', models.PositiveIntegerField(verbose_name='Size')),
+                ('offset', models.PositiveIntegerField(default=0, verbose_name='Offset')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Updated At')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to='send.conversation', verbose_name='Conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_uploads', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Chat Upload',
+                'verbose_name_plural': 'Chat Uploads',
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+import re
+
+from django.db import migrations
+
+FTS_TABLE = 'send_message_fts'
+BATCH_SIZE = 1000
+
+# کپی send.normalization.normalize در زمان این مایگریشن؛ تغییرات بعدی آن نباید
+# نتیجه‌ی اجرای دوباره‌ی مایگریشن را عوض کند
+_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',
+    '\u200d': None,
+    '\u200e': None,
+    '\u200f': None,
+    'ـ': None,
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+})
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_TRANSLATION))
+    return _SPACE_RE.sub(' ', text).strip().casefold()
+
+
+def _write_index(connection, rows):
+    """rows: لیست (message_id, user_id, owner_id, content)؛ مثل send.chat_search._write"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, content, participants) VALUES (%s, %s, %s)",
+                [(pk, normalize(content), f'u{user_id} o{owner_id}') for pk, user_id, owner_id, content in rows],
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (message_id, user_id, owner_id, content, document) "
+                "VALUES (%s, %s, %s, %s, to_tsvector('simple', %s)) "
+                "ON CONFLICT (message_id) DO UPDATE SET user_id = EXCLUDED.user_id, "
+                "owner_id = EXCLUDED.owner_id, content = EXCLUDED.content, document = EXCLUDED.document",
+                [
+                    (pk, user_id, owner_id, normalize(content), normalize(content))
+                    for pk, user_id, owner_id, content in rows
+                ],
+            )
+
+
+def create_message_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "content, participants, "
+            "tokenize = 'unicode61 remove_diacritics 2', "
+            "prefix = '2 3 4')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            "message_id bigint PRIMARY KEY REFERENCES send_message (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "user_id bigint NOT NULL, owner_id bigint NOT NULL, "
+            "content text NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+            f"ON {FTS_TABLE} USING GIN (document)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_user_idx ON {FTS_TABLE} (user_id, message_id)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_owner_idx ON {FTS_TABLE} (owner_id, message_id)"
+        )
+    else:
+        return
+
+    Message = apps.get_model('send', 'Message')
+    rows = []
+    fields = ('id', 'conversation__user_id', 'conversation__owner_id', 'content')
+    for row in Message.objects.values_list(*fields).iterator(chunk_size=BATCH_SIZE):
+        rows.append(row)
+        if len(rows) >= BATCH_SIZE:
+            _write_index(schema_editor.connection, rows)
+            rows = []
+    if rows:
+        _write_index(schema_editor.connection, rows)
+
+
+def drop_message_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0018_chat_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_message_index, drop_message_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0019_message_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessages',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(max_length=100, verbose_name='Segment')),
+                ('offset', models.PositiveBigIntegerField(verbose_name='Offset')),
+                ('length', models.PositiveIntegerField(verbose_name='Length')),
+                ('first_message_id', models.BigIntegerField(verbose_name='First Message ID')),
+                ('last_message_id', models.BigIntegerField(verbose_name='Last Message ID')),
+                ('count', models.PositiveIntegerField(verbose_name='Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archives', to='send.conversation', verbose_name='Conversation')),
+            ],
+            options={
+                'verbose_name': 'Archived Messages',
+                'verbose_name_plural': 'Archived Messages',
+                'indexes': [models.Index(fields=['conversation', '-last_message_id'], name='send_archive_conv_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:37
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0020_archived_messages'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='business',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)], verbose_name='Latitude'),
+        ),
+        migrations.AlterField(
+            model_name='business',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)], verbose_name='Longitude'),
+        ),
+    ]
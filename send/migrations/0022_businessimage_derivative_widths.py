@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('send', '0021_business_coordinate_range'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='businessimage',
+            name='derivative_widths',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Derivative Widths'),
+        ),
+    ]
@@ -1,13 +1,21 @@
 # send/models.py
+import uuid
+
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.text import slugify
 from django.contrib.auth import get_user_model
 from django.urls import reverse  # <--- اینو اضافه کن!
+from . import geo
+from .storage import content_storage
+from .normalization import normalize
 
 class Category(models.Model):
     name = models.CharField(max_length=100, verbose_name=_('Name'))
     slug = models.SlugField(max_length=100, unique=True, verbose_name=_('Slug'))
+    search_key = models.CharField(max_length=100, blank=True, db_index=True, editable=False, verbose_name=_('Search Key'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
 
     class Meta:
@@ -17,6 +25,10 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.search_key = normalize(self.name)
+        super().save(*args, **kwargs)
+
 
 class Business(models.Model):
     owner = models.ForeignKey(
@@ -27,6 +39,7 @@ class Business(models.Model):
     )
     name = models.CharField(max_length=200, verbose_name=_('Name'))
     slug = models.SlugField(max_length=200, unique=True, verbose_name=_('Slug'))
+    search_key = models.CharField(max_length=200, blank=True, db_index=True, editable=False, verbose_name=_('Search Key'))
     category = models.ForeignKey(
         Category,
         on_delete=models.SET_NULL,
@@ -38,14 +51,47 @@ class Business(models.Model):
     address = models.CharField(max_length=255, verbose_name=_('Address'))
     city = models.CharField(max_length=100, verbose_name=_('City'))
     district = models.CharField(max_length=100, blank=True, null=True, verbose_name=_('District'))
+    latitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)], verbose_name=_('Latitude')
+    )
+    longitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)], verbose_name=_('Longitude')
+    )
+    # از روی مختصات در save() پر می‌شود؛ send.geo.nearby روی این ایندکس جستجو می‌کند
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False, verbose_name=_('Geohash'))
     phone = models.CharField(max_length=20, verbose_name=_('Phone'))
     instagram = models.CharField(max_length=100, blank=True, null=True, verbose_name=_('Instagram'))
+    # بیت‌های send.amenities.SERVICE_CHOICES؛ از روی Service ها حساب می‌شود
+    amenities = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False, verbose_name=_('Amenities'))
     is_approved = models.BooleanField(default=False, verbose_name=_('Is Approved'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    # با تغییر خود کسب‌وکار یا تصاویر، خدمات، ساعات و نظراتش جلو می‌رود (send.conditional.touch)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_('Updated At'))
+    # تصویر کارت در لیست؛ اگر انتخاب نشود اولین تصویر آپلودشده است
+    cover_image = models.ForeignKey(
+        'BusinessImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name=_('Cover Image')
+    )
+
+    # خلاصه‌ی نظرات تأییدشده؛ توسط send.ratings نگه‌داری می‌شود
+    rating_avg = models.FloatField(default=0.0, editable=False, verbose_name=_('Average Rating'))
+    rating_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Rating Count'))
+    rating_1 = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('1 Star Ratings'))
+    rating_2 = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('2 Star Ratings'))
+    rating_3 = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('3 Star Ratings'))
+    rating_4 = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('4 Star Ratings'))
+    rating_5 = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('5 Star Ratings'))
 
     class Meta:
         verbose_name = _('Business')
         verbose_name_plural = _('Businesses')
+        indexes = [
+            models.Index(fields=['is_approved', '-created_at', '-id'], name='send_business_listing_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -55,7 +101,18 @@ class Business(models.Model):
         return reverse('send:business_detail', kwargs={'slug': self.slug})
     # --- تموم ---
 
+    def rating_percentages(self):
+        return {
+            str(i): round(getattr(self, f'rating_{i}') / self.rating_count * 100, 1) if self.rating_count else 0
+            for i in range(1, 6)
+        }
+
     def save(self, *args, **kwargs):
+        self.search_key = normalize(self.name)
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
         if not self.slug:
             base_slug = slugify(self.name, allow_unicode=True)
             if not base_slug:
@@ -72,7 +129,9 @@ class Business(models.Model):
 # --- بقیه مدل‌ها بدون تغییر ---
 class BusinessImage(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='images', verbose_name=_('Business'))
-    image = models.ImageField(upload_to='business_images/', verbose_name=_('Image'))
+    image = models.ImageField(upload_to='business_images/', storage=content_storage, verbose_name=_('Image'))
+    derivatives_ready = models.BooleanField(default=False, editable=False, verbose_name=_('Derivatives Ready'))
+    derivative_widths = models.JSONField(default=dict, editable=False, verbose_name=_('Derivative Widths'))
 
     class Meta:
         verbose_name = _('Business Image')
@@ -112,6 +171,23 @@ class BusinessHours(models.Model):
         return f"{self.days}: {self.start_time}-{self.end_time}"
 
 
+class OpeningInterval(models.Model):
+    """یک بازه‌ی باز بودن به دقیقه از ابتدای هفته؛ توسط send.hours از BusinessHours ساخته می‌شود."""
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='opening_intervals', verbose_name=_('Business'))
+    start_minute = models.PositiveIntegerField(verbose_name=_('Start Minute'))
+    end_minute = models.PositiveIntegerField(verbose_name=_('End Minute'))
+
+    class Meta:
+        verbose_name = _('Opening Interval')
+        verbose_name_plural = _('Opening Intervals')
+        indexes = [
+            models.Index(fields=['start_minute', 'end_minute', 'business'], name='send_opening_minute_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.business_id}: {self.start_minute}-{self.end_minute}"
+
+
 class BusinessRating(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='ratings', verbose_name=_('Business'))
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, verbose_name=_('User'))
@@ -140,13 +216,29 @@ class BusinessRating(models.Model):
 class Conversation(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='conversations', verbose_name=_('Business'))
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='conversations', verbose_name=_('User'))
+    # کپی business.owner تا صندوق مالک با یک ایندکس روی همه‌ی کسب‌وکارهایش مرتب شود
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='owned_conversations', editable=False, verbose_name=_('Owner'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
+    # توسط send.chat با هر پیام و هر بار خواندن به‌روز می‌شوند
+    last_message_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name=_('Last Message At'))
+    last_message = models.CharField(max_length=100, blank=True, editable=False, verbose_name=_('Last Message'))
+    user_unread = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('User Unread'))
+    owner_unread = models.PositiveIntegerField(default=0, editable=False, verbose_name=_('Owner Unread'))
 
     class Meta:
         verbose_name = _('Conversation')
         verbose_name_plural = _('Conversations')
         unique_together = ['business', 'user']
+        indexes = [
+            models.Index(fields=['owner', '-last_message_at', '-id'], name='send_conv_owner_inbox_idx'),
+            models.Index(fields=['user', '-last_message_at', '-id'], name='send_conv_user_inbox_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.owner_id:
+            self.owner_id = self.business.owner_id
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Conversation between {self.user.username} and {self.business.name}"
@@ -156,7 +248,7 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages', verbose_name=_('Conversation'))
     sender = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, verbose_name=_('Sender'))
     content = models.TextField(verbose_name=_('Message Content'))
-    file = models.FileField(upload_to='chat_files/', blank=True, null=True, verbose_name=_('File'))
+    file = models.FileField(upload_to='chat_files/', storage=content_storage, blank=True, null=True, verbose_name=_('File'))
     file_type = models.CharField(max_length=20, blank=True, null=True, verbose_name=_('File Type'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
 
@@ -166,4 +258,105 @@ class Message(models.Model):
         ordering = ['created_at']
 
     def __str__(self):
-        return f"Message from {self.sender.username} in {self.conversation}"
\ No newline at end of file
+        return f"Message from {self.sender.username} in {self.conversation}"
+
+class ChatUpload(models.Model):
+    """آپلود تکه‌ای نیمه‌کاره‌ی یک پیوست چت؛ send.uploads نگهش می‌دارد."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='uploads', verbose_name=_('Conversation'))
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='chat_uploads', verbose_name=_('User'))
+    filename = models.CharField(max_length=255, verbose_name=_('Filename'))
+    content_type = models.CharField(max_length=100, verbose_name=_('Content Type'))
+    size = models.PositiveIntegerField(verbose_name=_('Size'))
+    offset = models.PositiveIntegerField(default=0, verbose_name=_('Offset'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_('Updated At'))
+
+    class Meta:
+        verbose_name = _('Chat Upload')
+        verbose_name_plural = _('Chat Uploads')
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+
+class ArchivedMessages(models.Model):
+    """
+    پیام‌های بایگانی‌شده‌ی یک گفتگو: یک عضو gzip در یک فایل segment از
+    send.archive، با بازه‌ی id پیام‌هایش.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archives', verbose_name=_('Conversation'))
+    segment = models.CharField(max_length=100, verbose_name=_('Segment'))
+    offset = models.PositiveBigIntegerField(verbose_name=_('Offset'))
+    length = models.PositiveIntegerField(verbose_name=_('Length'))
+    first_message_id = models.BigIntegerField(verbose_name=_('First Message ID'))
+    last_message_id = models.BigIntegerField(verbose_name=_('Last Message ID'))
+    count = models.PositiveIntegerField(verbose_name=_('Count'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+
+    class Meta:
+        verbose_name = _('Archived Messages')
+        verbose_name_plural = _('Archived Messages')
+        indexes = [
+            models.Index(fields=['conversation', '-last_message_id'], name='send_archive_conv_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.segment}@{self.offset} ({self.first_message_id}-{self.last_message_id})"
+
+
+class FacetCount(models.Model):
+    """
+    تعداد کسب‌وکارهای تأییدشده به ازای هر (دسته‌بندی، شهر، ترکیب امکانات).
+    شمارش هر دسته، هر شهر یا هر امکان به‌تنهایی از جمع همین ردیف‌ها به دست می‌آید.
+    توسط send.facets به‌صورت افزایشی نگه‌داری می‌شود.
+    """
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='facet_counts', verbose_name=_('Category'))
+    city = models.CharField(max_length=100, verbose_name=_('City'))
+    amenities = models.PositiveSmallIntegerField(default=0, verbose_name=_('Amenities'))
+    count = models.IntegerField(default=0, verbose_name=_('Count'))
+
+    class Meta:
+        verbose_name = _('Facet Count')
+        verbose_name_plural = _('Facet Counts')
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'city', 'amenities'], condition=models.Q(category__isnull=False), name='send_facet_category_city_uniq'),
+            models.UniqueConstraint(fields=['city', 'amenities'], condition=models.Q(category__isnull=True), name='send_facet_city_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.category_id or '-'} / {self.city}: {self.count}"
+
+
+class SimilarBusiness(models.Model):
+    """K همسایه‌ی نزدیک هر کسب‌وکار؛ توسط send.similarity ساخته می‌شود."""
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='similar_links', verbose_name=_('Business'))
+    similar = models.ForeignKey(Business, on_delete=models.CASCADE, related_name='+', verbose_name=_('Similar Business'))
+    rank = models.PositiveSmallIntegerField(verbose_name=_('Rank'))
+    score = models.FloatField(verbose_name=_('Score'))
+
+    class Meta:
+        verbose_name = _('Similar Business')
+        verbose_name_plural = _('Similar Businesses')
+        ordering = ['business', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'rank'], name='send_similar_business_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.business_id} → {self.similar_id} ({self.score:.3f})"
+
+
+class Blob(models.Model):
+    """یک فایل ذخیره‌شده در send.storage و تعداد فیلدهایی که به آن اشاره می‌کنند."""
+    name = models.CharField(max_length=100, unique=True, verbose_name=_('Name'))
+    size = models.PositiveBigIntegerField(verbose_name=_('Size'))
+    refs = models.PositiveIntegerField(default=0, verbose_name=_('References'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+
+    class Meta:
+        verbose_name = _('Blob')
+        verbose_name_plural = _('Blobs')
+
+    def __str__(self):
+        return self.name
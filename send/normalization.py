@@ -0,0 +1,47 @@
+"""
+یکسان‌سازی متن فارسی برای جستجو و ایندکس.
+
+همه‌ی مقایسه‌های متنی جستجو (ستون‌های search_key، ایندکس متن کامل و عبارت
+جستجوی کاربر) باید از normalize رد شوند تا «ي/ی»، «ك/ک»، نیم‌فاصله و
+ارقام فارسی/عربی باعث از دست رفتن نتیجه نشوند.
+"""
+import re
+
+_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ئ': 'ی',
+    'ك': 'ک',
+    'ۀ': 'ه',
+    'ة': 'ه',
+    'أ': 'ا',
+    'إ': 'ا',
+    'ٱ': 'ا',
+    'ؤ': 'و',
+    '\u200c': ' ',  # نیم‌فاصله
+    '\u200d': None,
+    '\u200e': None,
+    '\u200f': None,
+    'ـ': None,  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+})
+
+# اعراب و تنوین
+_DIACRITICS_RE = re.compile('[\u064b-\u065f\u0670]')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_TRANSLATION))
+    return _SPACE_RE.sub(' ', text).strip().casefold()
+
+
+def prefix_range(field, key):
+    """
+    شرط «شروع شود با» به شکل بازه‌ی [key, key + U+FFFF) تا روی همه‌ی دیتابیس‌ها
+    از ایندکس ستون استفاده کند (LIKE روی SQLite از ایندکس استفاده نمی‌کند).
+    """
+    return {f'{field}__gte': key, f'{field}__lt': key + '\uffff'}
@@ -0,0 +1,132 @@
+"""
+صفحه‌بندی کلیدی (keyset) بر اساس مقدار ستون‌های مرتب‌سازی.
+
+برخلاف Paginator جنگو نه COUNT(*) می‌زند و نه OFFSET؛ هزینه‌ی هر صفحه فقط به
+اندازه‌ی صفحه بستگی دارد، نه به عمق آن در لیست.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    ordering مثل order_by جنگو است، مثلاً ('-created_at', '-id')؛ آخرین ستون
+    باید یکتا باشد تا ترتیب پایدار بماند. ستون‌ها می‌توانند annotation عددی هم باشند
+    (مثل distance در send.geo)؛ مقدارشان همان‌طور که هست در cursor می‌رود.
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [name.lstrip('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        direction, values = self.decode(cursor) if cursor else (NEXT, None)
+        forward = direction == NEXT
+        ordering = self.ordering if forward else tuple(self._flip(name) for name in self.ordering)
+
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+        has_next = has_more if forward else True
+        has_previous = values is not None if forward else has_more
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode(NEXT, rows[-1]) if has_next else None,
+            previous_cursor=self.encode(PREVIOUS, rows[0]) if has_previous else None,
+        )
+
+    def _field(self, name):
+        if name in self.queryset.query.annotations:
+            return None
+        return self.queryset.model._meta.get_field(name)
+
+    def encode(self, direction, obj):
+        values = []
+        for name in self.fields:
+            field = self._field(name)
+            values.append(getattr(obj, name) if field is None else field.value_to_string(obj))
+        raw = json.dumps([direction, *values], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, *values = json.loads(raw)
+            if direction not in (NEXT, PREVIOUS) or len(values) != len(self.fields):
+                raise ValueError
+            decoded = []
+            for name, value in zip(self.fields, values):
+                field = self._field(name)
+                if field is None:
+                    if not isinstance(value, (int, float)):
+                        raise ValueError
+                    decoded.append(value)
+                else:
+                    decoded.append(field.to_python(value))
+            return direction, decoded
+        except Exception as exc:
+            raise InvalidCursor(cursor) from exc
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _after(self, ordering, values):
+        """شرط «بعد از این ردیف» در ترتیب داده‌شده: (a < va) OR (a = va AND b < vb) ..."""
+        condition = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            term = Q(**{f'{field}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(ordering[:i], values[:i]):
+                term &= Q(**{prev_name.lstrip('-'): prev_value})
+            condition |= term
+        return condition
+
+
+def cursor_querystring(request, cursor, param='cursor'):
+    """querystring فعلی (فیلترها) را با cursor جدید برمی‌گرداند."""
+    query = request.GET.copy()
+    query[param] = cursor
+    return query.urlencode()
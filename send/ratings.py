@@ -0,0 +1,39 @@
+"""
+نگه‌داری خلاصه‌ی امتیازها (میانگین، تعداد و هیستوگرام ۱ تا ۵) روی Business.
+
+خلاصه همیشه از روی نظرات تأییدشده دوباره حساب می‌شود؛ پس صدا زدن دوباره‌ی
+refresh بی‌خطر است و برای تعمیر داده‌ها هم همین تابع کافی است.
+"""
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+
+from .models import Business, BusinessRating
+
+
+def _summary(business_id):
+    buckets = {
+        f'rating_{i}': Count('id', filter=Q(rating__gte=i - 0.5, rating__lt=i + 0.5))
+        for i in range(1, 6)
+    }
+    summary = BusinessRating.objects.filter(business_id=business_id, is_approved=True).aggregate(
+        rating_avg=Avg('rating'), rating_count=Count('id'), **buckets
+    )
+    summary['rating_avg'] = summary['rating_avg'] or 0.0
+    return summary
+
+
+def refresh(business_ids):
+    """خلاصه‌ی امتیاز کسب‌وکارهای داده‌شده را در یک تراکنش به‌روز می‌کند."""
+    with transaction.atomic():
+        for business_id in sorted(set(business_ids)):
+            # قفل ردیف تا دو تغییر هم‌زمان خلاصه‌ی کهنه ننویسند
+            if not Business.objects.select_for_update().filter(pk=business_id).exists():
+                continue
+            Business.objects.filter(pk=business_id).update(**_summary(business_id))
+
+
+def rebuild():
+    ids = list(Business.objects.values_list('id', flat=True))
+    for start in range(0, len(ids), 500):
+        refresh(ids[start:start + 500])
+    return len(ids)
@@ -0,0 +1,221 @@
+"""
+ارسال لحظه‌ای پیام‌های چت از طریق WebSocket (ASGI خام، بدون Channels).
+
+هر گفتگو یک کانال دارد؛ وقتی Message ذخیره می‌شود (سیگنال post_save) بعد از
+commit روی broker منتشر می‌شود و هر اتصال WebSocket باز روی آن گفتگو پیام را
+دریافت می‌کند. broker از تنظیم CHAT_BROKER_BACKEND خوانده می‌شود. InProcessBroker
+فقط بین درخواست‌ها و اتصال‌های همان پروسه کار می‌کند؛ با چند worker باید backend
+دیگری (مثلاً روی Redis) با همین متدهای subscribe/waiter/publish جایش بنشیند.
+"""
+import asyncio
+import json
+import threading
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import transaction
+from django.http.request import split_domain_port, validate_host
+from django.urls import Resolver404, path, resolve
+from django.utils.module_loading import import_string
+
+from .models import Conversation
+
+DEFAULT_BACKEND = 'send.realtime.InProcessBroker'
+
+
+class Subscription:
+    """صف پیام‌های یک اتصال؛ publish می‌تواند از هر thread صدا زده شود."""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+
+    def deliver(self, payload):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, payload)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Waiter:
+    """گوش دادن در کد همگام (مثل long-poll): فقط خبر می‌دهد که پیامی منتشر شد."""
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.event = threading.Event()
+
+    def deliver(self, payload):
+        self.event.set()
+
+    def wait(self, timeout):
+        return self.event.wait(timeout)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def _add(self, subscription):
+        with self.lock:
+            self.subscribers.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def subscribe(self, channel):
+        return self._add(Subscription(self, channel))
+
+    def waiter(self, channel):
+        return self._add(Waiter(self, channel))
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.channel]
+
+    def publish(self, channel, payload):
+        with self.lock:
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(payload)
+            except RuntimeError:
+                # حلقه‌ی رویداد اتصال بسته شده است
+                subscription.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'CHAT_BROKER_BACKEND', DEFAULT_BACKEND))()
+    return _broker
+
+
+def conversation_channel(conversation_id):
+    return f'conversation.{conversation_id}'
+
+
+def message_payload(message):
+    """همان فیلدهای JSON فعلی چت، بدون is_sent که به بیننده بستگی دارد."""
+    business = message.conversation.business
+    return {
+        'id': message.pk,
+        'content': message.content,
+        'file_url': message.file.url if message.file else None,
+        'file_type': message.file_type,
+        'sender': message.sender.username,
+        'sender_id': message.sender_id,
+        'business_name': business.name,
+        'business_slug': business.slug,
+        'created_at': message.created_at.strftime('%H:%M'),
+    }
+
+
+def publish_message(message):
+    payload = message_payload(message)
+    channel = conversation_channel(message.conversation_id)
+    transaction.on_commit(lambda: get_broker().publish(channel, payload))
+
+
+def can_access(user, conversation):
+    """همان شرط get_messages: کاربر گفتگو یا مالک کسب‌وکار."""
+    return user.is_authenticated and (
+        conversation.user_id == user.pk or conversation.business.owner_id == user.pk
+    )
+
+
+# --- ASGI ---
+
+websocket_patterns = [
+    path('ws/chat/<int:conversation_id>/', lambda: None, name='chat_socket'),
+]
+
+
+def _headers(scope):
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+
+
+def _origin_allowed(headers):
+    """اتصال با کوکی session است، پس مثل CSRF فقط از همان سایت پذیرفته می‌شود."""
+    origin = headers.get('origin')
+    if not origin:
+        return True
+    origin_host, _ = split_domain_port(urlsplit(origin).netloc)
+    host, _ = split_domain_port(headers.get('host', ''))
+    if origin_host == host:
+        return True
+    trusted = [urlsplit(value).netloc for value in getattr(settings, 'CSRF_TRUSTED_ORIGINS', [])]
+    return validate_host(urlsplit(origin).netloc, trusted)
+
+
+def _authorize(headers, conversation_id):
+    cookie = SimpleCookie()
+    cookie.load(headers.get('cookie', ''))
+    session_key = cookie[settings.SESSION_COOKIE_NAME].value if settings.SESSION_COOKIE_NAME in cookie else None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key)
+    user = get_user(SimpleNamespace(session=session))
+    conversation = Conversation.objects.filter(pk=conversation_id).select_related('business').first()
+    return conversation is not None and can_access(user, conversation)
+
+
+async def websocket_application(scope, receive, send):
+    try:
+        match = resolve('/' + scope['path'].lstrip('/'), urlconf=__name__)
+    except Resolver404:
+        match = None
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    headers = _headers(scope)
+    if match is None or not _origin_allowed(headers):
+        await send({'type': 'websocket.close', 'code': 4404 if match is None else 4403})
+        return
+    conversation_id = match.kwargs['conversation_id']
+    if not await sync_to_async(_authorize)(headers, conversation_id):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    subscription = get_broker().subscribe(conversation_channel(conversation_id))
+    incoming = asyncio.ensure_future(receive())
+    outgoing = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({incoming, outgoing}, return_when=asyncio.FIRST_COMPLETED)
+            if incoming in done:
+                # پیام‌ها با POST فرستاده می‌شوند؛ از کلاینت فقط قطع اتصال مهم است
+                if incoming.result()['type'] == 'websocket.disconnect':
+                    break
+                incoming = asyncio.ensure_future(receive())
+            if outgoing in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(outgoing.result(), ensure_ascii=False)})
+                outgoing = asyncio.ensure_future(subscription.get())
+    finally:
+        subscription.close()
+        for task in (incoming, outgoing):
+            task.cancel()
+
+
+urlpatterns = websocket_patterns
@@ -0,0 +1,66 @@
+"""
+ثبت یک کسب‌وکار همراه با خدمات، ساعات کاری و تصاویرش در یک تراکنش.
+
+ردیف‌های فرزند با bulk_create نوشته می‌شوند، پس روی SQLite کل ثبت‌نام یک commit
+(یک fsync) است. فایل تصاویر قبل از تراکنش در storage ذخیره می‌شوند و اگر
+تراکنش به هر دلیلی برگردد پاک می‌شوند تا فایل یتیم نماند.
+"""
+from django.db import transaction
+
+from . import amenities, hours as opening_hours, thumbnails
+from .models import Business, BusinessHours, BusinessImage, Service
+
+
+def store_images(files):
+    """فایل‌ها را با همان upload_to فیلد image ذخیره می‌کند و نام‌ها را برمی‌گرداند."""
+    field = BusinessImage._meta.get_field('image')
+    names = []
+    try:
+        for upload in files:
+            names.append(field.storage.save(field.generate_filename(None, upload.name), upload))
+    except Exception:
+        delete_images(names)
+        raise
+    return names
+
+
+def delete_images(names):
+    storage = BusinessImage._meta.get_field('image').storage
+    for name in names:
+        storage.delete(name)
+
+
+def register_business(form, owner, services=(), hours=(), files=()):
+    """
+    services: لیست (name, icon) و hours: لیست (days, start_time, end_time, is_closed).
+    form باید معتبر باشد؛ کسب‌وکار ساخته‌شده را برمی‌گرداند.
+    """
+    names = store_images(files)
+    try:
+        with transaction.atomic():
+            business = form.save(commit=False)
+            business.owner = owner
+            business.amenities = amenities.mask_for_names(name for name, _icon in services)
+            business.save()
+
+            # bulk_create سیگنال نمی‌فرستد؛ برای کسب‌وکار تازه و تأییدنشده کاری جز
+            # بازه‌های ساعات کاری، کاور و نسخه‌های کوچک تصاویر لازم نیست
+            Service.objects.bulk_create([
+                Service(business=business, name=name, icon=icon) for name, icon in services
+            ])
+            BusinessHours.objects.bulk_create([
+                BusinessHours(business=business, days=days, start_time=start_time, end_time=end_time, is_closed=is_closed)
+                for days, start_time, end_time, is_closed in hours
+            ])
+            opening_hours.sync([business.pk])
+            images = BusinessImage.objects.bulk_create([
+                BusinessImage(business=business, image=name) for name in names
+            ])
+            if images:
+                business.cover_image = images[0]
+                Business.objects.filter(pk=business.pk).update(cover_image=images[0])
+                thumbnails.schedule([image.pk for image in images])
+    except Exception:
+        delete_images(names)
+        raise
+    return business
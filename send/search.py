@@ -0,0 +1,194 @@
+"""
+ایندکس متن کامل کسب‌وکارهای تأییدشده.
+
+روی SQLite از جدول مجازی FTS5 و روی PostgreSQL از ستون tsvector با ایندکس GIN
+استفاده می‌شود. روی بقیه‌ی دیتابیس‌ها جستجو به icontains برمی‌گردد. نتیجه‌ها
+می‌توانند با search_rank (bm25 / ts_rank، کوچک‌تر یعنی مرتبط‌تر) مرتب شوند.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .normalization import normalize, prefix_range
+
+FTS_TABLE = 'send_business_fts'
+BATCH_SIZE = 500
+
+_TERM_RE = re.compile(r'\w+')
+
+# وزن ستون‌ها در bm25 به ترتیب ستون‌های جدول؛ هم‌ارز وزن‌های A/B/C در PostgreSQL
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 2.0, 2.0)
+RANK_ORDERING = ('search_rank', 'id')
+
+
+def is_supported():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def create_index(schema_editor):
+    """ساخت جدول ایندکس؛ از مایگریشن صدا زده می‌شود."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "name, description, category, city, district, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+            "business_id bigint PRIMARY KEY REFERENCES send_business (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document_gin "
+            f"ON {FTS_TABLE} USING GIN (document)"
+        )
+
+
+def drop_index(schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def _document(business):
+    category = business.category.name if business.category_id else ''
+    return (
+        normalize(business.name),
+        normalize(business.description),
+        normalize(category),
+        normalize(business.city),
+        normalize(business.district),
+    )
+
+
+def _write(rows):
+    """rows: لیست (id, name, description, category, city, district)"""
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.executemany(
+                f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(row[0],) for row in rows]
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, category, city, district) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                rows,
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (business_id, document) VALUES (%s, "
+                "setweight(to_tsvector('simple', %s), 'A') || "
+                "setweight(to_tsvector('simple', %s), 'C') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B') || "
+                "setweight(to_tsvector('simple', %s), 'B')) "
+                "ON CONFLICT (business_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+
+def _delete(ids):
+    ids = list(ids)
+    if not ids:
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'business_id'
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE {column} = %s", [(pk,) for pk in ids])
+
+
+def index_business(business):
+    """ایندکس یک کسب‌وکار را با وضعیت فعلی‌اش هماهنگ می‌کند."""
+    if not is_supported():
+        return
+    if business.is_approved and business.slug:
+        _write([(business.pk, *_document(business))])
+    else:
+        _delete([business.pk])
+
+
+def index_businesses(queryset):
+    """نسخه‌ی دسته‌ای index_business برای update های گروهی (مثل اکشن‌های ادمین)."""
+    if not is_supported():
+        return
+    rows, stale = [], []
+    for business in queryset.select_related('category').iterator(chunk_size=BATCH_SIZE):
+        if business.is_approved and business.slug:
+            rows.append((business.pk, *_document(business)))
+        else:
+            stale.append(business.pk)
+        if len(rows) >= BATCH_SIZE:
+            _write(rows)
+            rows = []
+    _write(rows)
+    _delete(stale)
+
+
+def remove_business(pk):
+    if is_supported():
+        _delete([pk])
+
+
+def rebuild():
+    """کل ایندکس را از روی جدول کسب‌وکارها از نو می‌سازد."""
+    from .models import Business
+
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    queryset = Business.objects.filter(is_approved=True).exclude(slug='')
+    index_businesses(queryset)
+    return queryset.count()
+
+
+def _match_expression(query):
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return None
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{term}"*' for term in terms)
+    return ' & '.join(f'{term}:*' for term in terms)
+
+
+def _rank_sql():
+    # بدون ردیف ایندکس (مثلاً فقط تطبیق پیشوندی) بدترین رتبه، تا cursor هیچ‌وقت NULL نداشته باشد
+    if connection.vendor == 'sqlite':
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        return (
+            f"COALESCE((SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = send_business.id), 0)"
+        )
+    return (
+        f"COALESCE((SELECT -ts_rank(document, to_tsquery('simple', %s)) FROM {FTS_TABLE} "
+        "WHERE business_id = send_business.id), 0)"
+    )
+
+
+def search_businesses(queryset, query, rank=False):
+    """
+    queryset را به کسب‌وکارهایی که با عبارت جستجو مطابقت دارند محدود می‌کند. با
+    rank=True، اگر ایندکس متن کامل در کار باشد، annotation search_rank هم اضافه
+    می‌شود (برای مرتب‌سازی با RANK_ORDERING).
+    """
+    key = normalize(query)
+    if not key:
+        return queryset.none()
+    prefix = Q(**prefix_range('search_key', key)) | Q(**prefix_range('category__search_key', key))
+    if not is_supported():
+        return queryset.filter(prefix | Q(description__icontains=query))
+    match = _match_expression(key)
+    if match is None:
+        return queryset.filter(prefix)
+    if connection.vendor == 'sqlite':
+        sql = f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+    else:
+        sql = f"SELECT business_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('simple', %s)"
+    queryset = queryset.filter(prefix | Q(id__in=RawSQL(sql, [match])))
+    if rank:
+        queryset = queryset.annotate(search_rank=RawSQL(_rank_sql(), [match], output_field=FloatField()))
+    return queryset
@@ -0,0 +1,165 @@
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete
+from django.db import transaction
+from django.db.models import Subquery
+from django.dispatch import receiver
+
+from . import amenities, archive, cache, chat, chat_search, conditional, facets, hours, ratings, realtime, search, sitemaps, thumbnails
+from .models import ArchivedMessages, Business, BusinessHours, BusinessImage, BusinessRating, Category, Conversation, Message, Service
+
+
+@receiver(pre_save, sender=Business)
+def business_saving(sender, instance, **kwargs):
+    previous = None
+    if instance.pk:
+        previous = Business.objects.filter(pk=instance.pk).only(
+            'is_approved', 'slug', 'category_id', 'city', 'amenities', 'owner_id'
+        ).first()
+    instance._facet_key = facets.facet_key(previous) if previous else None
+    instance._previous_slug = previous.slug if previous else None
+    instance._previous_owner_id = previous.owner_id if previous else None
+
+
+@receiver(post_save, sender=Business)
+def business_saved(sender, instance, **kwargs):
+    search.index_business(instance)
+    facets.move(getattr(instance, '_facet_key', None), facets.facet_key(instance))
+    instance._facet_key = facets.facet_key(instance)
+    cache.invalidate_detail(instance.slug)
+    sitemaps.invalidate([instance.pk])
+    if getattr(instance, '_previous_slug', None) not in (None, instance.slug):
+        cache.invalidate_detail(instance._previous_slug)
+    if getattr(instance, '_previous_owner_id', None) not in (None, instance.owner_id):
+        Conversation.objects.filter(business=instance).update(owner_id=instance.owner_id)
+        chat_search.index_messages(Message.objects.filter(conversation__business=instance))
+
+
+@receiver(pre_delete, sender=Business)
+def business_deleting(sender, instance, **kwargs):
+    # نمونه‌ی در حافظه ممکن است کهنه باشد (مثلاً amenities.sync نمونه‌ی دیگری را ذخیره کرده)
+    current = Business.objects.filter(pk=instance.pk).only(
+        'is_approved', 'slug', 'category_id', 'city', 'amenities'
+    ).first()
+    instance._facet_key = facets.facet_key(current) if current else None
+
+
+@receiver(post_delete, sender=Business)
+def business_deleted(sender, instance, **kwargs):
+    search.remove_business(instance.pk)
+    facets.move(getattr(instance, '_facet_key', None), None)
+    cache.invalidate_detail(instance.slug)
+    sitemaps.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, **kwargs):
+    if not created:
+        search.index_businesses(instance.businesses.all())
+        conditional.touch(instance.businesses.values_list('id', flat=True))
+        for slug in instance.businesses.values_list('slug', flat=True):
+            cache.invalidate_detail(slug)
+
+
+@receiver(pre_delete, sender=Category)
+def category_deleting(sender, instance, **kwargs):
+    # بعد از حذف، category_id کسب‌وکارها با update() نال می‌شود و سیگنالی نمی‌آید
+    instance._business_ids = list(instance.businesses.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    business_ids = getattr(instance, '_business_ids', None)
+    if business_ids:
+        search.index_businesses(Business.objects.filter(id__in=business_ids))
+        # شمارنده‌های این دسته با CASCADE حذف شده‌اند؛ کسب‌وکارهایش حالا بدون دسته‌اند
+        facets.rebuild()
+
+
+@receiver(pre_save, sender=BusinessRating)
+def rating_saving(sender, instance, **kwargs):
+    instance._was_approved = bool(instance.pk) and BusinessRating.objects.filter(
+        pk=instance.pk, is_approved=True
+    ).exists()
+
+
+@receiver(post_save, sender=BusinessRating)
+@receiver(post_delete, sender=BusinessRating)
+def rating_changed(sender, instance, **kwargs):
+    # نظر تأییدنشده در صفحه‌ی عمومی و خلاصه‌ی امتیاز نیست
+    if not instance.is_approved and not getattr(instance, '_was_approved', False):
+        return
+    ratings.refresh([instance.business_id])
+    conditional.touch([instance.business_id])
+    cache.invalidate_businesses([instance.business_id])
+
+
+@receiver(post_save, sender=BusinessImage)
+def image_saved(sender, instance, created, **kwargs):
+    if created:
+        Business.objects.filter(pk=instance.business_id, cover_image__isnull=True).update(cover_image=instance)
+    if not instance.derivatives_ready:
+        thumbnails.schedule([instance.pk])
+
+
+@receiver(post_delete, sender=BusinessImage)
+def image_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: _release_image(instance))
+    # اگر تصویر کاور حذف شد (SET_NULL)، اولین تصویر باقی‌مانده کاور می‌شود
+    first_image = BusinessImage.objects.filter(business_id=instance.business_id).order_by('id').values('id')[:1]
+    Business.objects.filter(pk=instance.business_id, cover_image__isnull=True).update(cover_image=Subquery(first_image))
+
+
+def _release_image(instance):
+    # فایل ممکن است بین چند تصویر مشترک باشد؛ نسخه‌های کوچک با آخرین ارجاع پاک می‌شوند
+    storage = instance.image.storage
+    storage.delete(instance.image.name)
+    if not storage.exists(instance.image.name):
+        thumbnails.delete(instance)
+
+
+@receiver(post_save, sender=BusinessHours)
+@receiver(post_delete, sender=BusinessHours)
+def hours_changed(sender, instance, **kwargs):
+    hours.sync([instance.business_id])
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+def service_changed(sender, instance, origin=None, **kwargs):
+    # در حذف زنجیره‌ای خود کسب‌وکار (یا مالکش) شمارنده‌ها را business_deleted کم می‌کند
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Service:
+        return
+    amenities.sync([instance.business_id])
+
+
+@receiver(post_save, sender=BusinessImage)
+@receiver(post_delete, sender=BusinessImage)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=BusinessHours)
+@receiver(post_delete, sender=BusinessHours)
+def business_content_changed(sender, instance, **kwargs):
+    conditional.touch([instance.business_id])
+    cache.invalidate_businesses([instance.business_id])
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created, **kwargs):
+    chat_search.index_message(instance)
+    if created:
+        chat.message_created(instance)
+        realtime.publish_message(instance)
+
+
+@receiver(post_delete, sender=Message)
+def message_deleted(sender, instance, **kwargs):
+    # بایگانی ایندکس را یک‌جا پاک می‌کند و ارجاع پیوست حالا مال بایگانی است
+    if archive.is_archiving():
+        return
+    chat_search.remove_messages([instance.pk])
+    if instance.file:
+        transaction.on_commit(lambda: instance.file.storage.delete(instance.file.name))
+
+
+@receiver(post_delete, sender=ArchivedMessages)
+def archived_messages_deleted(sender, instance, **kwargs):
+    archive.release(instance)
@@ -0,0 +1,159 @@
+"""
+ساخت آفلاین «مشاغل مشابه».
+
+برای هر کسب‌وکار تأییدشده، K همسایه از همان دسته‌بندی با این امتیاز انتخاب می‌شوند:
+شباهت کسینوسی TF-IDF نام و توضیحات + هم‌شهری/هم‌محله بودن + اشتراک خدمات.
+کاندیدها از روی ایندکس معکوس واژه‌ها (و چند هم‌محله‌ای) جمع می‌شوند، پس هزینه
+متناسب با تعداد جفت‌هایی است که واقعاً واژه‌ی مشترک دارند، نه N².
+"""
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from . import cache
+from .models import Business, Service, SimilarBusiness
+from .normalization import normalize
+
+TOP_K = 6
+# تعداد همسایه‌هایی که صفحه‌ی جزئیات نشان می‌دهد
+DETAIL_LIMIT = 3
+# واژه‌هایی که در بیش از این نسبت از اسناد یک دسته آمده‌اند عملاً stop word هستند
+MAX_DF_RATIO = 0.2
+MAX_POSTINGS = 2000
+# کاندیدهای بدون واژه‌ی مشترک از همان شهر/محله
+LOCAL_CANDIDATES = 20
+
+WEIGHT_TEXT = 0.6
+WEIGHT_SERVICES = 0.2
+WEIGHT_CITY = 0.1
+WEIGHT_DISTRICT = 0.1
+
+_TERM_RE = re.compile(r'\w{2,}')
+
+
+def _terms(text):
+    return Counter(term for term in _TERM_RE.findall(normalize(text)) if not term.isdigit())
+
+
+def _vectors(docs):
+    """docs: {id: Counter} → {id: {term: وزن نرمال‌شده}} و ایندکس معکوس"""
+    df = Counter()
+    for counts in docs.values():
+        df.update(counts.keys())
+    total = len(docs)
+    max_df = max(2, int(total * MAX_DF_RATIO))
+    idf = {
+        term: math.log(total / count)
+        for term, count in df.items()
+        if 1 < count <= min(max_df, MAX_POSTINGS)
+    }
+    vectors, postings = {}, defaultdict(list)
+    for pk, counts in docs.items():
+        weights = {term: (1 + math.log(tf)) * idf[term] for term, tf in counts.items() if term in idf}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        vector = {term: weight / norm for term, weight in weights.items()}
+        vectors[pk] = vector
+        for term, weight in vector.items():
+            postings[term].append((pk, weight))
+    return vectors, postings
+
+
+def _neighbours(group, services, top_k):
+    """group: لیست (id, city, district, متن) های یک دسته‌بندی"""
+    info = {pk: (city, district) for pk, city, district, _text in group}
+    vectors, postings = _vectors({pk: _terms(text) for pk, _city, _district, text in group})
+
+    by_place = defaultdict(list)
+    for pk, city, district, _text in group:
+        by_place[(city, district)].append(pk)
+        if district:
+            by_place[(city, None)].append(pk)
+
+    for pk, (city, district) in info.items():
+        scores = defaultdict(float)
+        for term, weight in vectors[pk].items():
+            for other, other_weight in postings[term]:
+                if other != pk:
+                    scores[other] += weight * other_weight
+        for other in by_place[(city, district)][:LOCAL_CANDIDATES]:
+            if other != pk:
+                scores.setdefault(other, 0.0)
+
+        ranked = []
+        own_services = services.get(pk, set())
+        for other, cosine in scores.items():
+            other_city, other_district = info[other]
+            score = WEIGHT_TEXT * cosine
+            if other_city == city:
+                score += WEIGHT_CITY
+                if district and other_district == district:
+                    score += WEIGHT_DISTRICT
+            other_services = services.get(other, set())
+            if own_services and other_services:
+                score += WEIGHT_SERVICES * len(own_services & other_services) / len(own_services | other_services)
+            ranked.append((score, other))
+        yield pk, heapq.nsmallest(top_k, ranked, key=lambda item: (-item[0], item[1]))
+
+
+def rebuild(top_k=TOP_K, batch_size=5000, progress=None):
+    businesses = defaultdict(list)
+    queryset = Business.objects.filter(is_approved=True).exclude(slug='').values_list(
+        'id', 'category_id', 'city', 'district', 'name', 'description'
+    )
+    for pk, category_id, city, district, name, description in queryset.iterator(chunk_size=batch_size):
+        businesses[category_id].append((pk, normalize(city), normalize(district) or None, f'{name} {description}'))
+
+    services = defaultdict(set)
+    for business_id, name in Service.objects.filter(business__is_approved=True).values_list('business_id', 'name').iterator(chunk_size=batch_size):
+        services[business_id].add(normalize(name))
+
+    written = 0
+    with transaction.atomic():
+        SimilarBusiness.objects.all().delete()
+        rows = []
+        for group in businesses.values():
+            for pk, ranked in _neighbours(group, services, top_k):
+                rows.extend(
+                    SimilarBusiness(business_id=pk, similar_id=other, rank=rank, score=score)
+                    for rank, (score, other) in enumerate(ranked, start=1)
+                )
+                if len(rows) >= batch_size:
+                    SimilarBusiness.objects.bulk_create(rows)
+                    written += len(rows)
+                    rows = []
+                    if progress:
+                        progress(written)
+        SimilarBusiness.objects.bulk_create(rows)
+        written += len(rows)
+    # id همسایه‌ها در کش صفحه‌ی جزئیات همه‌ی کسب‌وکارها هست
+    cache.invalidate_all()
+    return written
+
+
+def linked_ids(business):
+    """id همسایه‌های ساخته‌شده برای business به ترتیب rank (بدون توجه به تأیید)."""
+    return list(SimilarBusiness.objects.filter(business=business).order_by('rank').values_list('similar_id', flat=True))
+
+
+def for_business(business, queryset=None, limit=DETAIL_LIMIT, linked=None):
+    """
+    همسایه‌هایی که صفحه‌ی جزئیات نشان می‌دهد: همسایه‌های تأییدشده‌ی SimilarBusiness
+    به ترتیب rank، یا اگر هنوز ساخته نشده‌اند (مثلاً تازه تأیید شده) هم‌دسته‌ها.
+    linked همان linked_ids است اگر از قبل (مثلاً از کش) در دست باشد. send.conditional
+    هم همین را برای اعتبارسنجی صفحه می‌خواند.
+    """
+    queryset = Business.objects.all() if queryset is None else queryset
+    if linked is None:
+        linked = linked_ids(business)
+    if linked:
+        by_id = queryset.filter(is_approved=True).in_bulk(linked)
+        ranked = [by_id[pk] for pk in linked if pk in by_id][:limit]
+        if ranked:
+            return ranked
+    return list(
+        queryset.filter(category_id=business.category_id, is_approved=True)
+        .exclude(pk=business.pk).order_by('-created_at', '-id')[:limit]
+    )
@@ -1,13 +1,45 @@
+"""
+نقشه‌ی سایت به شکل index + بخش‌های ثابت.
+
+کسب‌وکارها بر اساس بازه‌ی id به بخش‌هایی با اندازه‌ی SITEMAP_SECTION_SIZE تقسیم
+می‌شوند تا اضافه یا حذف شدن یک کسب‌وکار فقط بخش خودش را عوض کند. خروجی XML هر
+بخش و خود index رندرشده در کش نگه‌داری می‌شود و کلیدش نسخه‌ای دارد که با تغییر
+کسب‌وکارهای همان بازه (send.sitemaps.invalidate) عوض می‌شود.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
+from django.db.models import F, Max
+from django.http import Http404, HttpResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.views.decorators.http import condition
+
 from .models import Business
-from datetime import datetime
 
-class StaticSitemap(Sitemap):
+CACHE_PREFIX = 'send:sitemap'
+
+
+def section_size():
+    return getattr(settings, 'SITEMAP_SECTION_SIZE', 5000)
+
+
+class ConfiguredDomainMixin:
+    """دامنه و پروتکل از تنظیمات (SITEMAP_DOMAIN / SITEMAP_PROTOCOL) خوانده می‌شود."""
+
+    def get_domain(self, site=None):
+        return getattr(settings, 'SITEMAP_DOMAIN', None) or super().get_domain(site)
+
+    def get_protocol(self, protocol=None):
+        return getattr(settings, 'SITEMAP_PROTOCOL', None) or super().get_protocol(protocol)
+
+
+class StaticSitemap(ConfiguredDomainMixin, Sitemap):
     priority = 0.8
     changefreq = 'weekly'
-    protocol = 'http'
-    domain = '127.0.0.1:8000'  # چون رو لوکال‌هاست تست می‌کنی
 
     def items(self):
         return [
@@ -21,19 +53,129 @@ class StaticSitemap(Sitemap):
         return reverse(item)
 
     def lastmod(self, item):
-        return datetime.now()
+        # فقط لیست کسب‌وکارها تاریخ تغییر واقعی دارد؛ بقیه بدون lastmod
+        if item == 'send:business_list':
+            return Business.objects.filter(is_approved=True).aggregate(last=Max('updated_at'))['last']
+        return None
 
-class BusinessSitemap(Sitemap):
+
+class BusinessSitemap(ConfiguredDomainMixin, Sitemap):
     changefreq = 'daily'
     priority = 0.9
-    protocol = 'http'
-    domain = '127.0.0.1:8000'
+
+    def __init__(self, section=0):
+        self.section = section
 
     def items(self):
-        return Business.objects.filter(is_approved=True).order_by('-created_at')
+        size = section_size()
+        return (
+            Business.objects.filter(
+                is_approved=True,
+                id__gt=self.section * size,
+                id__lte=(self.section + 1) * size,
+            )
+            .exclude(slug='')
+            .only('id', 'slug', 'updated_at')
+            .order_by('id')
+        )
 
     def location(self, obj):
         return obj.get_absolute_url()
 
     def lastmod(self, obj):
-        return obj.created_at
\ No newline at end of file
+        return obj.updated_at
+
+
+def _version_key(name):
+    return f'{CACHE_PREFIX}:version:{name}'
+
+
+def _version(name):
+    return cache.get_or_set(_version_key(name), uuid.uuid4().hex, None)
+
+
+def invalidate(business_ids):
+    """بخش‌های شامل این کسب‌وکارها و خود index را باطل می‌کند."""
+    size = section_size()
+    keys = {_version_key('index'), _version_key('static')}
+    keys.update(_version_key(f'businesses-{(pk - 1) // size}') for pk in business_ids if pk)
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def _base_url(request):
+    static = StaticSitemap()
+    return f'{static.get_protocol()}://{static.get_domain(_request_site(request))}'
+
+
+def _cached_xml(request, name, render):
+    # دامنه هم جزء کلید است تا بدون SITEMAP_DOMAIN، هاست یک درخواست برای بقیه کش نشود
+    key = f'{CACHE_PREFIX}:xml:{name}:{_version(name)}:{_base_url(request)}'
+    xml = cache.get(key)
+    if xml is None:
+        xml = render()
+        cache.set(key, xml, None)
+    return xml
+
+
+def _buckets():
+    size = section_size()
+    return (
+        Business.objects.filter(is_approved=True).exclude(slug='')
+        .annotate(bucket=(F('id') - 1) / size)
+        .values('bucket').annotate(last_mod=Max('updated_at')).order_by('bucket')
+    )
+
+
+def section_names():
+    return ['static'] + [f"businesses-{row['bucket']}" for row in _buckets()]
+
+
+def _render_index(request):
+    base = _base_url(request)
+    sections = [{'location': base + reverse('sitemap_section', args=['static']), 'last_mod': None}]
+    for row in _buckets():
+        name = f"businesses-{row['bucket']}"
+        sections.append({'location': base + reverse('sitemap_section', args=[name]), 'last_mod': row['last_mod']})
+    return render_to_string('sitemap_index.xml', {'sitemaps': sections})
+
+
+def _render_section(request, sitemap):
+    return render_to_string('sitemap.xml', {
+        'urlset': sitemap.get_urls(site=_request_site(request)),
+    })
+
+
+def _request_site(request):
+    from django.contrib.sites.requests import RequestSite
+
+    return RequestSite(request)
+
+
+def _sitemap_for(section):
+    if section == 'static':
+        return StaticSitemap()
+    name, _, number = section.partition('-')
+    if name != 'businesses' or not number.isdigit():
+        raise Http404
+    return BusinessSitemap(int(number))
+
+
+def _etag(request, section=None):
+    name = section or 'index'
+    if section is not None:
+        try:
+            _sitemap_for(section)
+        except Http404:
+            return None
+    return hashlib.md5(f'{name}:{_version(name)}:{_base_url(request)}'.encode()).hexdigest()
+
+
+@condition(etag_func=_etag)
+def index(request):
+    return HttpResponse(_cached_xml(request, 'index', lambda: _render_index(request)), content_type='text/xml')
+
+
+@condition(etag_func=_etag)
+def section(request, section):
+    sitemap = _sitemap_for(section)
+    return HttpResponse(_cached_xml(request, section, lambda: _render_section(request, sitemap)), content_type='text/xml')
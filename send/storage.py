@@ -0,0 +1,94 @@
+"""
+ذخیره‌ی فایل‌ها بر اساس محتوا (content-addressed) با شمارش ارجاع.
+
+هر فایل هنگام نوشتن روی دیسک هش می‌شود و زیر blobs/ab/cd/<sha256><پسوند> قرار
+می‌گیرد؛ فایل تکراری (لوگو یا تراکتی که چند بار فرستاده می‌شود) فقط یک بار
+نوشته می‌شود. پوشه‌های دو سطحی نمی‌گذارند یک پوشه صدها هزار فایل بگیرد.
+
+هر save() یک ارجاع به blob اضافه و هر delete() یکی کم می‌کند؛ فایل وقتی پاک می‌شود
+که آخرین ارجاع برداشته شود. شمارنده در جدول Blob و در همان تراکنشِ ردیفی است که
+فایل را نگه می‌دارد، پس rollback آن ارجاع را هم برمی‌گرداند. فایل‌های قدیمی که
+بیرون از blobs/ هستند مثل قبل مستقیم پاک می‌شوند.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+
+
+def blob_name(digest, extension):
+    return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # نام نهایی از هش محتوا ساخته می‌شود؛ نام تکراری یعنی همان فایل
+        return name
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        extension = os.path.splitext(name)[1].lower()
+        temp_dir = self.path(os.path.join(BLOB_DIR, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+                    size += len(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+
+            name = blob_name(digest.hexdigest(), extension)
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with transaction.atomic():
+                if not Blob.objects.filter(name=name).update(refs=F('refs') + 1):
+                    try:
+                        with transaction.atomic():
+                            Blob.objects.create(name=name, size=size, refs=1)
+                    except IntegrityError:
+                        # آپلود هم‌زمان همین محتوا زودتر ردیف را ساخته است
+                        Blob.objects.filter(name=name).update(refs=F('refs') + 1)
+                # داخل تراکنش تا delete هم‌زمان بین ارجاع و فایل فاصله نیندازد
+                if os.path.exists(path):
+                    os.remove(temp_path)
+                else:
+                    file_move_safe(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
+
+    def delete(self, name):
+        from .models import Blob
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        if not name.startswith(f'{BLOB_DIR}/'):
+            return super().delete(name)
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refs > 1:
+                Blob.objects.filter(pk=blob.pk).update(refs=F('refs') - 1)
+                return
+            blob.delete()
+            super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,32 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from ..thumbnails import PURPOSES, derivative_name
+
+register = template.Library()
+
+
+def _url(business_image, size, fmt):
+    if not business_image.derivatives_ready:
+        return business_image.image.url
+    return default_storage.url(derivative_name(business_image.image.name, size, fmt))
+
+
+@register.filter
+def image_url(business_image, size='card'):
+    """آدرس JPEG در اندازه‌ی داده‌شده؛ تا آماده شدن نسخه‌ها، فایل اصلی."""
+    return _url(business_image, size, 'jpeg')
+
+
+@register.filter
+def image_srcset(business_image, spec='gallery'):
+    """srcset یک کاربرد ('card' یا 'gallery'، با پسوند ':webp' برای WebP) با عرض واقعی نسخه‌ها."""
+    purpose, _, fmt = spec.partition(':')
+    widths = business_image.derivative_widths if business_image.derivatives_ready else {}
+    candidates = {}
+    for size in PURPOSES[purpose]:
+        width = widths.get(size)
+        # منبع کوچک‌تر از کادر، gallery و full را هم‌عرض می‌کند
+        if width and width not in candidates:
+            candidates[width] = _url(business_image, size, fmt or 'jpeg')
+    return ', '.join(f'{url} {width}w' for width, url in sorted(candidates.items()))
@@ -1,3 +1,1041 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import (
+    amenities, archive, cache as detail_cache, chat_search, facets, geo, hours, realtime, search, similarity, thumbnails,
+    uploads,
+)
+from .forms import BusinessRegisterForm
+from .management.commands.import_businesses import SlugAllocator
+from .pagination import InvalidCursor, KeysetPaginator
+from .normalization import normalize
+from .models import Blob, Business, BusinessHours, BusinessImage, BusinessRating, Category, ChatUpload, Conversation, FacetCount
+from .registration import register_business
+from .storage import content_storage
+from .templatetags.business_images import image_srcset
+
+# کوچک‌ترین GIF معتبر
+TINY_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x01\x00\x00'
+)
+
+
+class BusinessListQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        self.category = Category.objects.create(name='کافه', slug='cafe')
+
+    def add_businesses(self, count):
+        for _ in range(count):
+            business = Business.objects.create(
+                owner=self.owner, name='کافه', category=self.category, description='-',
+                address='-', city='تهران', phone='0', is_approved=True,
+            )
+            for _ in range(2):
+                BusinessImage.objects.create(
+                    business=business, image=SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif')
+                )
+
+    def count_listing_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('send:business_list'))
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_listing_queries_do_not_grow_with_cards(self):
+        self.add_businesses(2)
+        baseline = self.count_listing_queries()
+        self.add_businesses(8)
+        self.assertEqual(self.count_listing_queries(), baseline)
+
+    def test_first_image_becomes_cover(self):
+        self.add_businesses(1)
+        business = Business.objects.get()
+        first = business.images.order_by('id').first()
+        self.assertEqual(business.cover_image, first)
+
+        first.delete()
+        business.refresh_from_db()
+        self.assertEqual(business.cover_image, business.images.get())
+
+
+class FacetCountTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        self.cafe = Category.objects.create(name='کافه', slug='cafe')
+        self.bakery = Category.objects.create(name='نانوایی', slug='bakery')
+
+    def create(self, **fields):
+        fields = {'category': self.cafe, 'is_approved': True, **fields}
+        return Business.objects.create(
+            owner=self.owner, name='کافه', description='-', address='-', city='تهران', phone='0', **fields
+        )
+
+    def assertCountsMatch(self):
+        recount = {
+            (row['category_id'], row['city'], row['amenities']): row['n']
+            for row in Business.objects.filter(is_approved=True).exclude(slug='')
+            .values('category_id', 'city', 'amenities').annotate(n=Count('id'))
+        }
+        stored = {
+            (row.category_id, row.city, row.amenities): row.count
+            for row in FacetCount.objects.filter(count__gt=0)
+        }
+        self.assertEqual(stored, recount)
+
+    def test_counts_follow_approval_category_and_delete(self):
+        business = self.create()
+        pending = self.create(is_approved=False)
+        self.assertCountsMatch()
+
+        facets.approve(Business.objects.filter(pk=pending.pk))
+        self.assertCountsMatch()
+        pending.refresh_from_db()
+        pending.is_approved = False
+        pending.save()
+        self.assertCountsMatch()
+
+        business.category = self.bakery
+        business.save()
+        self.assertCountsMatch()
+        self.assertEqual(facets.Facets().by_category, {self.bakery.pk: 1})
+
+        business.delete()
+        pending.delete()
+        self.assertCountsMatch()
+        self.assertEqual(facets.Facets().total(), 0)
+
+    def test_delete_through_stale_instance(self):
+        business = self.create()
+        # amenities.sync نمونه‌ی دیگری را ذخیره می‌کند؛ business هنوز amenities=0 دارد
+        business.services.create(name='پارکینگ')
+        self.assertEqual(business.amenities, 0)
+        business.delete()
+        self.assertCountsMatch()
+        self.assertFalse(FacetCount.objects.filter(count__gt=0).exists())
+
+    def test_amenity_filter_and_counts(self):
+        both = self.create()
+        both.services.create(name='پارکینگ')
+        both.services.create(name='پذیرش_کارت')
+        parking = self.create(category=self.bakery)
+        parking.services.create(name='پارکينگ')
+        wifi = self.create()
+        wifi.services.create(name='وای‌فای رایگان')
+        self.assertCountsMatch()
+
+        def listing(**params):
+            response = self.client.get(reverse('send:business_list'), params)
+            counts = {choice['key']: choice['count'] for choice in response.context['service_choices']}
+            return sorted(business.pk for business in response.context['businesses']), counts
+
+        found, counts = listing(**{'amenity[]': ['پارکینگ']})
+        self.assertEqual(found, sorted([both.pk, parking.pk]))
+        self.assertEqual((counts['پارکینگ'], counts['پذیرش_کارت'], counts['وای_فای_رایگان']), (2, 1, 0))
+        self.assertEqual(listing(**{'amenity[]': ['پارکینگ', 'پذیرش_کارت']})[0], [both.pk])
+        found, counts = listing(**{'amenity[]': ['پارکینگ'], 'category[]': ['cafe']})
+        self.assertEqual((found, counts['پارکینگ']), ([both.pk], 1))
+        # شمارش بدون فیلتر امکانات همه‌ی کسب‌وکارهای تأییدشده است
+        self.assertEqual(listing()[1]['وای_فای_رایگان'], 1)
+
+        both.services.filter(name='پارکینگ').delete()
+        self.assertCountsMatch()
+        found, counts = listing(**{'amenity[]': ['پارکینگ']})
+        self.assertEqual((found, counts['پذیرش_کارت']), ([parking.pk], 0))
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        self.category = Category.objects.create(name='شیرینی', slug='sweets')
+
+    def create(self, name, description='-', **fields):
+        return Business.objects.create(
+            owner=self.owner, name=name, description=description, address='-', city='تهران', phone='0',
+            category=self.category, **fields
+        )
+
+    def found(self, query):
+        return list(search.search_businesses(Business.objects.all(), query).values_list('pk', flat=True))
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def test_index_follows_save_approval_and_delete(self):
+        business = self.create('نانوایی سنتی', 'نان بربری')
+        self.assertEqual((self.indexed(), self.found('بربری')), ([], []))
+
+        business.is_approved = True
+        business.save()
+        self.assertEqual(self.found('بربری'), [business.pk])
+
+        business.description = 'نان سنگک'
+        business.save()
+        self.assertEqual((self.found('بربری'), self.found('سنگک')), ([], [business.pk]))
+
+        business.is_approved = False
+        business.save()
+        self.assertEqual(self.indexed(), [])
+
+        business.is_approved = True
+        business.save()
+        business.delete()
+        self.assertEqual(self.indexed(), [])
+
+    def test_list_is_ranked_by_relevance(self):
+        by_name = self.create('کیک خانگی', is_approved=True)
+        by_description = self.create('قنادی', 'کیک و شیرینی تازه', is_approved=True)
+        self.create('قنادی دیگر', 'شیرینی', is_approved=True)
+        response = self.client.get(reverse('send:business_list'), {'search': 'کیک'})
+        # جدیدتر بودن به تنهایی کسب‌وکار کم‌ارتباط‌تر را بالا نمی‌آورد
+        self.assertEqual([business.pk for business in response.context['businesses']], [by_name.pk, by_description.pk])
+
+    def test_ranked_pages_follow_cursor(self):
+        for i in range(5):
+            self.create(f'کیک {i}', is_approved=True)
+        seen, query = [], urlencode({'search': 'کیک'})
+        with override_settings(BUSINESS_LIST_PAGE_SIZE=2):
+            while query:
+                response = self.client.get(f"{reverse('send:business_list')}?{query}")
+                seen += [business.pk for business in response.context['businesses']]
+                query = response.context['next_query']
+        self.assertEqual(sorted(seen), list(Business.objects.order_by('pk').values_list('pk', flat=True)))
+
+
+class NormalizationTests(TestCase):
+    def test_arabic_and_persian_variants_share_a_key(self):
+        self.assertEqual(normalize('كافي‌شاپ'), normalize('کافی شاپ'))
+        self.assertEqual(normalize('  مؤسسۀ  قرآنی  '), 'موسسه قرآنی')
+        self.assertEqual(normalize('كِتابـــخانه ۱۲۳ ٤٥'), 'کتابخانه 123 45')
+        self.assertEqual(normalize('Café ABC'), 'café abc')
+        self.assertEqual(normalize(None), '')
+
+    def test_search_key_is_written_and_queried_normalized(self):
+        category = Category.objects.create(name='كافي‌شاپ', slug='coffee')
+        business = Business.objects.create(
+            owner=get_user_model().objects.create_user('owner'), name='كافه ۲۴ ساعته', description='-',
+            address='-', city='تهران', phone='0', category=category, is_approved=True,
+        )
+        self.assertEqual(category.search_key, 'کافی شاپ')
+        self.assertEqual(Business.objects.get(pk=business.pk).search_key, 'کافه 24 ساعته')
+        queryset = Business.objects.all()
+        for query in ('کافه 24', 'كافه ٢٤', 'کافی‌شاپ'):
+            self.assertEqual(list(search.search_businesses(queryset, query)), [business], query)
+
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        owner = get_user_model().objects.create_user('owner')
+        now = timezone.now()
+        for i in range(7):
+            business = Business.objects.create(
+                owner=owner, name=f'کافه {i}', description='-', address='-', city='تهران', phone='0',
+            )
+            # سه کسب‌وکار با created_at یکسان تا ترتیب فقط با id شکسته شود
+            Business.objects.filter(pk=business.pk).update(created_at=now - timedelta(hours=min(i, 3)))
+        self.expected = list(Business.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.paginator = KeysetPaginator(Business.objects.all(), ('-created_at', '-id'), per_page=3)
+
+    def ids(self, page):
+        return [business.pk for business in page]
+
+    def test_next_and_previous_cursors(self):
+        first = self.paginator.page()
+        self.assertFalse(first.has_previous())
+        second = self.paginator.page(first.next_cursor)
+        third = self.paginator.page(second.next_cursor)
+        self.assertEqual(self.ids(first) + self.ids(second) + self.ids(third), self.expected)
+        self.assertFalse(third.has_next())
+        self.assertEqual(self.ids(self.paginator.page(third.previous_cursor)), self.ids(second))
+        back = self.paginator.page(second.previous_cursor)
+        self.assertEqual(self.ids(back), self.ids(first))
+        self.assertFalse(back.has_previous())
+
+    def test_ties_are_stable_across_inserts(self):
+        first = self.paginator.page()
+        # ردیف تازه در ابتدای لیست، صفحه‌ی بعدی را جابه‌جا نمی‌کند
+        Business.objects.create(
+            owner=get_user_model().objects.get(), name='کافه تازه', description='-', address='-', city='تهران',
+            phone='0',
+        )
+        second = self.paginator.page(first.next_cursor)
+        self.assertEqual(self.ids(second), self.expected[3:6])
+
+    def test_tampered_cursor_is_rejected(self):
+        cursor = self.paginator.page().next_cursor
+        for bad in ('not-base64!', cursor[:-2], 'WyJ4IiwxXQ', 'WyJuIiwib29wcyIsMV0'):
+            with self.assertRaises(InvalidCursor, msg=bad):
+                self.paginator.page(bad)
+        # view با cursor خراب صفحه‌ی اول را نشان می‌دهد
+        response = self.client.get(reverse('send:business_list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+
+
+class SimilarityTests(TestCase):
+    def setUp(self):
+        self.owner = get_user_model().objects.create_user('owner')
+        self.cafe = Category.objects.create(name='کافه', slug='cafe')
+        self.bakery = Category.objects.create(name='نانوایی', slug='bakery')
+
+    def create(self, name, description, category=None, city='تهران', **fields):
+        fields = {'is_approved': True, **fields}
+        return Business.objects.create(
+            owner=self.owner, name=name, description=description, address='-', city=city, phone='0',
+            category=category or self.cafe, **fields
+        )
+
+    def test_rebuild_ranks_text_and_place_within_category(self):
+        book_cafe = self.create('کافه کتاب', 'قهوه دمی و کتابخوانی آرام')
+        twin = self.create('کتاب و قهوه', 'کتابخوانی با قهوه دمی')
+        local = self.create('کافه گلستان', 'بستنی سنتی')
+        far = self.create('کافه ساحل', 'بستنی سنتی', city='بندرعباس')
+        other_category = self.create('نان کتاب', 'کتابخوانی قهوه دمی', category=self.bakery)
+
+        self.assertGreater(similarity.rebuild(), 0)
+        linked = similarity.linked_ids(book_cafe)
+        self.assertEqual(linked[:2], [twin.pk, local.pk])
+        self.assertNotIn(other_category.pk, linked)
+        self.assertEqual(similarity.linked_ids(local)[0], far.pk)
+
+    def test_category_fallback_until_rebuilt(self):
+        first = self.create('کافه یک', '-')
+        unapproved = self.create('کافه پنهان', '-', is_approved=False)
+        newest = self.create('کافه سه', '-')
+        self.create('نانوایی', '-', category=self.bakery)
+        self.assertEqual(similarity.linked_ids(first), [])
+        self.assertEqual(similarity.for_business(first), [newest])
+
+        similarity.rebuild()
+        late = self.create('کافه دیر', '-')
+        self.assertEqual(similarity.for_business(newest), [first])
+        # همسایه‌ی ساخته‌شده‌ای که دیگر تأیید نیست کنار می‌رود و دسته جایش را می‌گیرد
+        Business.objects.filter(pk=first.pk).update(is_approved=False)
+        self.assertEqual(similarity.for_business(newest), [late])
+        self.assertNotIn(unapproved, similarity.for_business(late))
+
+
+class RatingSummaryTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.business = Business.objects.create(
+            owner=User.objects.create_user('owner', password='x'),
+            name='کافه', description='-', address='-', city='تهران', phone='0', is_approved=True,
+        )
+        self.users = [User.objects.create_user(f'user{i}', password='x') for i in range(3)]
+
+    def summary(self):
+        self.business.refresh_from_db()
+        return (
+            self.business.rating_avg, self.business.rating_count,
+            [getattr(self.business, f'rating_{i}') for i in range(1, 6)],
+        )
+
+    def test_summary_follows_create_edit_and_delete(self):
+        first = BusinessRating.objects.create(business=self.business, user=self.users[0], rating=5, is_approved=True)
+        BusinessRating.objects.create(business=self.business, user=self.users[1], rating=3, is_approved=True)
+        BusinessRating.objects.create(business=self.business, user=self.users[2], rating=1, is_approved=False)
+        self.assertEqual(self.summary(), (4.0, 2, [0, 0, 1, 0, 1]))
+
+        first.rating = 2
+        first.save()
+        self.assertEqual(self.summary(), (2.5, 2, [0, 1, 1, 0, 0]))
+
+        first.delete()
+        self.assertEqual(self.summary(), (3.0, 1, [0, 0, 1, 0, 0]))
+        self.assertEqual(self.business.rating_percentages()['3'], 100.0)
+
+
+class BusinessListConditionalTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('owner', password='x')
+        self.url = reverse('send:business_list')
+
+    def test_new_session_or_category_bypasses_304(self):
+        self.client.force_login(self.user)
+        first = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        # توکن CSRF فرم خروج با ورود دوباره عوض می‌شود
+        self.client.logout()
+        self.client.force_login(self.user)
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+
+        Category.objects.create(name='نانوایی', slug='bakery')
+        third = self.client.get(self.url, HTTP_IF_NONE_MATCH=second['ETag'])
+        self.assertContains(third, 'نانوایی')
+
+
+class BusinessDetailFreshnessTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_ASYNC=False)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        owner = get_user_model().objects.create_user('owner', password='x')
+        category = Category.objects.create(name='کافه', slug='cafe')
+        self.business, self.neighbour = [
+            Business.objects.create(
+                owner=owner, name=name, category=category, description='-', address='-', city='تهران',
+                phone='0', is_approved=True,
+            )
+            for name in ('کافه اول', 'کافه دوم')
+        ]
+        self.url = self.business.get_absolute_url()
+
+    def get(self, response=None):
+        headers = {}
+        if response is not None:
+            headers = {'HTTP_IF_NONE_MATCH': response['ETag'], 'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}
+        return self.client.get(self.url, **headers)
+
+    def test_neighbour_changes_bypass_304(self):
+        first = self.get()
+        self.assertContains(first, 'کافه دوم')
+        self.assertEqual(self.get(first).status_code, 304)
+
+        self.neighbour.name = 'کافه سوم'
+        self.neighbour.save()
+        self.assertEqual(self.get(first).status_code, 200)
+
+        second = self.get()
+        self.neighbour.delete()
+        self.assertEqual(self.get(second).status_code, 200)
+
+    def test_finished_derivatives_bypass_304(self):
+        image = BusinessImage.objects.create(
+            business=self.neighbour, image=SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif')
+        )
+        first = self.get()
+        self.assertEqual(self.get(first).status_code, 304)
+        thumbnails.generate(image)
+        self.assertEqual(self.get(first).status_code, 200)
+
+    def test_cached_page_follows_neighbours(self):
+        self.assertContains(self.get(), 'کافه دوم')
+        self.neighbour.name = 'کافه سوم'
+        self.neighbour.save()
+        detail_cache.reset_stats()
+        self.assertContains(self.get(), 'کافه سوم')
+        # تغییر همسایه ورودی کش این صفحه را باطل نمی‌کند
+        self.assertEqual(detail_cache.stats()['hits'], 1)
+
+        image = BusinessImage.objects.create(
+            business=self.neighbour, image=SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif')
+        )
+        self.assertNotContains(self.get(), 'derivatives/')
+        thumbnails.generate(image)
+        self.assertContains(self.get(), 'derivatives/')
+
+        self.neighbour.delete()
+        self.assertNotContains(self.get(), 'کافه سوم')
+
+    def test_unapproved_review_leaves_page_untouched(self):
+        first = self.get()
+        updated_at = Business.objects.get(pk=self.business.pk).updated_at
+        review = BusinessRating.objects.create(
+            business=self.business, user=get_user_model().objects.create_user('reviewer'), rating=4,
+        )
+        review.comment = 'ویرایش'
+        review.save()
+        self.assertEqual(Business.objects.get(pk=self.business.pk).updated_at, updated_at)
+        self.assertEqual(self.get(first).status_code, 304)
+
+        review.is_approved = True
+        review.save()
+        self.assertEqual(self.get(first).status_code, 200)
+
+
+class ImageSrcsetTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_ASYNC=False)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.business = Business.objects.create(
+            owner=get_user_model().objects.create_user('owner'), name='کافه', description='-', address='-',
+            city='تهران', phone='0',
+        )
+
+    def image(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'red').save(buffer, 'PNG')
+        image = BusinessImage.objects.create(
+            business=self.business, image=SimpleUploadedFile('a.png', buffer.getvalue(), 'image/png')
+        )
+        thumbnails.generate(image)
+        image.refresh_from_db()
+        return image
+
+    def widths(self, srcset):
+        return [candidate.rsplit(' ', 1)[1] for candidate in srcset.split(', ')]
+
+    def test_purposes_use_generated_widths(self):
+        image = self.image(1000, 500)
+        self.assertEqual(self.widths(image_srcset(image, 'card')), ['400w', '800w'])
+        self.assertIn('_card_2x.webp 800w', image_srcset(image, 'card:webp'))
+        # full بزرگ‌نمایی نمی‌شود، پس عرضش همان عرض منبع است
+        self.assertEqual(self.widths(image_srcset(image, 'gallery')), ['800w', '1000w'])
+        self.assertNotIn('_card', image_srcset(image, 'gallery'))
+
+    def test_small_source_is_not_upscaled(self):
+        image = self.image(300, 150)
+        self.assertEqual(self.widths(image_srcset(image, 'card')), ['400w'])
+        self.assertEqual(self.widths(image_srcset(image, 'gallery')), ['300w'])
+        name = thumbnails.derivative_name(image.image.name, 'card_2x', 'jpeg')
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, name)))
+
+    def test_no_srcset_without_recorded_widths(self):
+        image = self.image(1000, 500)
+        BusinessImage.objects.filter(pk=image.pk).update(derivative_widths={})
+        image.refresh_from_db()
+        self.assertEqual(image_srcset(image, 'gallery'), '')
+        call_command('generate_thumbnails', stdout=StringIO())
+        image.refresh_from_db()
+        self.assertEqual(image.derivative_widths, {'card': 400, 'card_2x': 800, 'gallery': 800, 'full': 1000})
+
+
+class BusinessUserStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.reviewer, self.other = User.objects.create_user('reviewer'), User.objects.create_user('other')
+        self.business = Business.objects.create(
+            owner=User.objects.create_user('owner'), name='کافه', description='-', address='-', city='تهران',
+            phone='0', is_approved=True,
+        )
+        BusinessRating.objects.create(business=self.business, user=self.reviewer, rating=4, comment='نظر محرمانه')
+        self.state_url = reverse('send:business_user_state', args=[self.business.slug])
+
+    def test_detail_is_identical_for_everyone(self):
+        bodies = []
+        for user in (self.reviewer, self.other, None):
+            self.client.logout()
+            if user is not None:
+                self.client.force_login(user)
+            response = self.client.get(self.business.get_absolute_url())
+            self.assertNotIn('Cookie', response.get('Vary', ''))
+            self.assertIn('public', response['Cache-Control'])
+            self.assertFalse(response.cookies)
+            bodies.append(response.content)
+        self.assertEqual(bodies[0], bodies[1])
+        self.assertEqual(bodies[0], bodies[2])
+        self.assertNotIn('نظر محرمانه'.encode(), bodies[0])
+
+    def test_state_belongs_to_the_logged_in_user(self):
+        self.client.force_login(self.reviewer)
+        response = self.client.get(self.state_url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('نظر محرمانه', response.json()['review'])
+
+        self.client.force_login(self.other)
+        review = self.client.get(self.state_url).json()['review']
+        self.assertNotIn('نظر محرمانه', review)
+        self.assertIn(reverse('send:add_review', args=[self.business.slug]), review)
+
+        self.client.logout()
+        review = self.client.get(self.state_url).json()['review']
+        self.assertNotIn('نظر محرمانه', review)
+        self.assertNotIn(reverse('send:add_review', args=[self.business.slug]), review)
+        self.assertIn(reverse('accounts:login'), review)
+
+
+@override_settings(SITEMAP_SECTION_SIZE=2, SITEMAP_DOMAIN='example.com', SITEMAP_PROTOCOL='https')
+class SitemapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = get_user_model().objects.create_user('owner', password='x')
+        self.businesses = [
+            Business.objects.create(
+                owner=owner, name=f'کافه {i}', description='-', address='-', city='تهران', phone='0',
+                is_approved=True,
+            )
+            for i in range(3)
+        ]
+
+    def section_url(self, business):
+        return reverse('sitemap_section', args=[f'businesses-{(business.pk - 1) // 2}'])
+
+    def test_index_lists_sections_and_answers_304(self):
+        response = self.client.get('/sitemap.xml')
+        for business in self.businesses:
+            self.assertContains(response, 'https://example.com' + self.section_url(business))
+        self.assertContains(response, reverse('sitemap_section', args=['static']))
+        self.assertEqual(self.client.get('/sitemap.xml', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.businesses[0].delete()
+        self.assertEqual(self.client.get('/sitemap.xml', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(reverse('sitemap_section', args=['nope'])).status_code, 404)
+
+    def test_section_follows_business_changes(self):
+        business = self.businesses[-1]
+        url = self.section_url(business)
+        response = self.client.get(url)
+        self.assertContains(response, business.get_absolute_url())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        business.slug = 'new-slug'
+        business.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/new-slug/')
+
+        business.is_approved = False
+        business.save()
+        self.assertNotContains(self.client.get(url), '/new-slug/')
+
+
+class RegisterBusinessTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root, THUMBNAIL_ASYNC=False)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        self.form = BusinessRegisterForm({
+            'name': 'کافه', 'category': Category.objects.create(name='کافه', slug='cafe').pk,
+            'phone': '0', 'description': '-', 'address': '-', 'city': 'تهران',
+        })
+        self.assertTrue(self.form.is_valid())
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media_root) for name in names]
+
+    def test_children_and_cover_are_created(self):
+        business = register_business(
+            self.form, self.owner,
+            services=[('پارکینگ', 'fa-parking')],
+            hours=[('جمعه', None, None, True)],
+            files=[SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif')],
+        )
+        business.refresh_from_db()
+        self.assertEqual(business.services.count(), 1)
+        self.assertEqual(business.hours.count(), 1)
+        self.assertEqual(business.cover_image, business.images.get())
+        self.assertEqual(business.amenities, amenities.BITS['پارکینگ'])
+
+        business.services.create(name='پذیرش کارت')
+        business.refresh_from_db()
+        self.assertEqual(business.amenities, amenities.mask_for_keys(['پارکینگ', 'پذیرش_کارت']))
+
+    def test_failure_rolls_back_rows_and_files(self):
+        with self.assertRaises(IntegrityError):
+            register_business(
+                self.form, self.owner,
+                services=[(None, 'fa-parking')],
+                files=[SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif')],
+            )
+        self.assertFalse(Business.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+class ImportBusinessesTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.owner = get_user_model().objects.create_user('owner', password='x')
+        Business.objects.create(owner=self.owner, name='کافه', description='-', address='-', city='تهران', phone='0')
+        self.images_dir = os.path.join(self.media_root, 'incoming')
+        os.makedirs(self.images_dir)
+        with open(os.path.join(self.images_dir, 'a.gif'), 'wb') as handle:
+            handle.write(TINY_GIF)
+
+    def run_import(self, rows, **options):
+        path = os.path.join(self.media_root, 'rows.jsonl')
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write('\n'.join(row if isinstance(row, str) else json.dumps(row) for row in rows))
+        stderr = StringIO()
+        call_command('import_businesses', path, owner='owner', stdout=StringIO(), stderr=stderr, **options)
+        return stderr.getvalue()
+
+    def test_bad_rows_and_missing_images_are_reported(self):
+        errors = self.run_import([
+            {'name': 'کافه', 'city': 'تهران', 'images': ['a.gif']},
+            {'name': 'کافه', 'city': 'تهران', 'images': ['a.gif']},
+            {'name': 'بی‌شهر'},
+            '{not json',
+            {'name': 'کافه گمشده', 'city': 'تهران', 'images': ['missing.gif']},
+            {'name': 'دور', 'city': 'تهران', 'latitude': 95, 'longitude': 0},
+        ], images_dir=self.images_dir)
+        for line_number in (3, 4, 5, 6):
+            self.assertIn(f'سطر {line_number}:', errors)
+        self.assertIn('missing.gif', errors)
+        self.assertEqual(
+            sorted(Business.objects.values_list('slug', flat=True)), ['کافه', 'کافه-1', 'کافه-2'],
+        )
+        image = BusinessImage.objects.first()
+        self.assertEqual(BusinessImage.objects.filter(image=image.image.name).count(), 2)
+        self.assertEqual(Blob.objects.get().refs, 2)
+
+    def test_storage_names_and_retried_batches_keep_blob_refs(self):
+        name = content_storage.save('business_images/a.gif', SimpleUploadedFile('a.gif', TINY_GIF))
+        load = SlugAllocator._load
+        calls = []
+
+        def stale_first_load(allocator, bases):
+            # بار اول slug موجود دیده نمی‌شود و دسته با IntegrityError دوباره اجرا می‌شود
+            calls.append(bases)
+            if len(calls) > 1:
+                load(allocator, bases)
+            else:
+                for base in bases:
+                    allocator.counters[base] = -1
+
+        with mock.patch.object(SlugAllocator, '_load', stale_first_load):
+            self.run_import([{'name': 'کافه', 'city': 'تهران', 'images': [name]}])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(BusinessImage.objects.get().image.name, name)
+        self.assertEqual(Blob.objects.get(name=name).refs, 2)
+
+
+class OpeningHoursTests(TestCase):
+    def test_persian_labels_and_digits(self):
+        self.assertEqual(hours.parse_days('شنبه - چهارشنبه'), [5, 6, 0, 1, 2])
+        self.assertEqual(hours.parse_days('پنج\u200cشنبه'), [3])
+        self.assertEqual(hours.intervals_for('جمعه', '۱۰:۳۰', '۱۲:۰۰', False), [(4 * hours.DAY + 630, 4 * hours.DAY + 720)])
+        self.assertEqual(hours.intervals_for('جمعه', '۱۰:۰۰', '۱۲:۰۰', True), [])
+
+    def test_overnight_interval_wraps_the_week(self):
+        self.assertEqual(
+            hours.intervals_for('یکشنبه', '22:00', '02:00', False),
+            [(6 * hours.DAY + 1320, hours.WEEK), (0, 120)],
+        )
+
+    def test_open_at_filter(self):
+        owner = get_user_model().objects.create_user('owner', password='x')
+        business = Business.objects.create(
+            owner=owner, name='کافه', description='-', address='-', city='تهران', phone='0', is_approved=True,
+        )
+        BusinessHours.objects.create(business=business, days='دوشنبه', start_time='۹:۰۰', end_time='۱۸:۰۰')
+        queryset = Business.objects.all()
+        self.assertTrue(hours.open_at(queryset, 9 * 60).exists())
+        self.assertFalse(hours.open_at(queryset, 18 * 60).exists())
+        self.assertFalse(hours.open_at(queryset, hours.DAY + 10 * 60).exists())
+
+
+class NearbyTests(TestCase):
+    def test_nearby_matches_haversine_across_cell_boundaries(self):
+        owner = get_user_model().objects.create_user('owner')
+        # دور نقطه‌ی (0, 0) که مرز چهار خانه‌ی سطح اول geohash است
+        center = (0.01, -0.01)
+        points = [(lat / 100, lon / 100) for lat in range(-6, 7, 2) for lon in range(-6, 7, 2)]
+        for lat, lon in points:
+            Business.objects.create(
+                owner=owner, name='کافه', description='-', address='-', city='-', phone='0', is_approved=True,
+                latitude=lat, longitude=lon,
+            )
+        radius = 5
+        expected = sorted(
+            (geo.haversine(*center, business.latitude, business.longitude), business.pk)
+            for business in Business.objects.all()
+        )
+        expected = [(distance, pk) for distance, pk in expected if distance <= radius]
+        found = geo.nearby(Business.objects.all(), *center, radius).order_by('distance', 'id')
+
+        self.assertEqual([business.pk for business in found], [pk for _distance, pk in expected])
+        for business, (distance, _pk) in zip(found, expected):
+            self.assertAlmostEqual(business.distance, distance, places=6)
+        self.assertGreater(len({business.geohash[0] for business in found}), 1)
+        self.assertLess(len(expected), len(points))
+
+
+class CoordinateRangeTests(TestCase):
+    def test_out_of_range_coordinates_are_rejected(self):
+        form = BusinessRegisterForm({
+            'name': 'کافه', 'phone': '0', 'description': '-', 'address': '-', 'city': 'تهران',
+            'latitude': -500, 'longitude': 0,
+        })
+        self.assertIn('latitude', form.errors)
+        with self.assertRaises(ValueError):
+            geo.encode(-500, 0)
+
+        url = reverse('send:business_list')
+        self.assertEqual(self.client.get(url, {'lat': '91', 'lng': '51'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'lat': '35.7', 'lng': 'nan'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'lat': '35.7', 'lng': '51.4'}).status_code, 200)
+
+
+class ChatSocketTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user, self.owner = User.objects.create_user('customer'), User.objects.create_user('owner')
+        business = Business.objects.create(
+            owner=self.owner, name='کافه', phone='0', description='-', address='-', city='تهران', is_approved=True,
+        )
+        self.conversation = Conversation.objects.create(business=business, user=self.user)
+        self.other = Conversation.objects.create(business=business, user=User.objects.create_user('other'))
+
+    def scope(self, user=None, path=None, origin=None):
+        headers = [(b'host', b'testserver')]
+        if user is not None:
+            self.client.force_login(user)
+            session = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+            headers.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={session}'.encode()))
+        if origin is not None:
+            headers.append((b'origin', origin.encode()))
+        return {'type': 'websocket', 'path': path or f'/ws/chat/{self.conversation.pk}/', 'headers': headers}
+
+    def connect(self, scope):
+        async def run():
+            communicator = ApplicationCommunicator(realtime.websocket_application, scope)
+            await communicator.send_input({'type': 'websocket.connect'})
+            event = await communicator.receive_output(timeout=5)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(timeout=5)
+            return event
+
+        return async_to_sync(run)()
+
+    def test_only_participants_may_connect(self):
+        for user in (self.user, self.owner):
+            self.assertEqual(self.connect(self.scope(user)), {'type': 'websocket.accept'})
+        stranger = get_user_model().objects.create_user('stranger')
+        for scope in (self.scope(stranger), self.scope(), self.scope(self.user, origin='https://evil.example')):
+            self.assertEqual(self.connect(scope), {'type': 'websocket.close', 'code': 4403})
+        self.assertEqual(self.connect(self.scope(self.user, path='/ws/other/')), {'type': 'websocket.close', 'code': 4404})
+
+    def test_saved_message_is_pushed_to_its_conversation(self):
+        scope = self.scope(self.owner)
+
+        def send_messages():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.other.messages.create(sender=self.other.user, content='گفتگوی دیگر')
+                self.conversation.messages.create(sender=self.user, content='سلام')
+
+        async def run():
+            communicator = ApplicationCommunicator(realtime.websocket_application, scope)
+            await communicator.send_input({'type': 'websocket.connect'})
+            accepted = await communicator.receive_output(timeout=5)
+            await sync_to_async(send_messages)()
+            pushed = await communicator.receive_output(timeout=5)
+            nothing_else = await communicator.receive_nothing()
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(timeout=5)
+            return accepted, pushed, nothing_else
+
+        accepted, pushed, nothing_else = async_to_sync(run)()
+        self.assertEqual(accepted['type'], 'websocket.accept')
+        payload = json.loads(pushed['text'])
+        self.assertEqual((payload['content'], payload['sender']), ('سلام', 'customer'))
+        self.assertTrue(nothing_else)
+
+
+@override_settings(CHAT_MESSAGES_PAGE_SIZE=2)
+class ChatMessagesTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user('customer', password='x')
+        owner = User.objects.create_user('owner', password='x')
+        business = Business.objects.create(
+            owner=owner, name='کافه', phone='0', description='-', address='-', city='تهران', is_approved=True,
+        )
+        self.owner = owner
+        self.conversation = Conversation.objects.create(business=business, user=self.user)
+        self.ids = [
+            self.conversation.messages.create(sender=self.user, content=str(i)).pk for i in range(5)
+        ]
+        self.url = reverse('send:get_messages', args=[self.conversation.pk])
+        self.client.force_login(self.user)
+
+    def fetch(self, **params):
+        data = self.client.get(self.url, params).json()
+        return [message['id'] for message in data['messages']], data['has_more']
+
+    def test_cursors(self):
+        self.assertEqual(self.fetch(), (self.ids[3:], True))
+        self.assertEqual(self.fetch(before_id=self.ids[1]), (self.ids[:1], False))
+        self.assertEqual(self.fetch(after_id=self.ids[1]), (self.ids[2:4], True))
+        self.assertEqual(self.fetch(after_id=self.ids[4], wait=0), ([], False))
+
+    def test_chat_view_renders_latest_window(self):
+        url = reverse('send:chat', args=[self.conversation.business.slug])
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        self.assertEqual([message.pk for message in response.context['messages']], self.ids[3:])
+        self.assertTrue(response.context['has_more_messages'])
+
+        for i in range(20):
+            self.conversation.messages.create(sender=self.user, content=str(i))
+        with CaptureQueriesContext(connection) as second:
+            self.client.get(url)
+        self.assertEqual(len(first), len(second))
+
+    def test_inbox_counters(self):
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.owner_unread, self.conversation.user_unread), (5, 0))
+        self.assertEqual(self.conversation.last_message, '4')
+
+        self.conversation.messages.create(sender=self.owner, content='پاسخ')
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('send:owner_chat'), {'conversation_id': self.conversation.pk})
+        self.assertEqual([conversation.unread_count for conversation in response.context['conversations']], [0])
+        self.conversation.refresh_from_db()
+        self.assertEqual((self.conversation.owner_unread, self.conversation.user_unread), (0, 1))
+
+    def test_search_is_scoped_and_highlighted(self):
+        self.conversation.messages.create(sender=self.user, content='قیمت <b>کیك</b> تولد')
+        other = Conversation.objects.create(
+            business=self.conversation.business, user=get_user_model().objects.create_user('other'),
+        )
+        other.messages.create(sender=other.user, content='قیمت کیک')
+
+        results, has_more = chat_search.search_messages(self.user, 'کیک')
+        self.assertEqual(len(results), 1)
+        self.assertFalse(has_more)
+        self.assertIn('<mark>کیک</mark>', results[0].snippet)
+        self.assertIn('&lt;b&gt;', results[0].snippet)
+        # مالک کسب‌وکار پیام هر دو گفتگو را می‌بیند
+        self.assertEqual(len(chat_search.search_messages(self.owner, 'قیمت')[0]), 2)
+
+    def test_archived_history_pages_through_before_id(self):
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        old = timezone.now() - timedelta(days=400)
+        self.conversation.messages.filter(pk__in=self.ids[:3]).update(created_at=old)
+        with override_settings(CHAT_ARCHIVE_DIR=archive_dir):
+            self.assertEqual(archive.archive_due(), 3)
+            self.assertEqual(list(self.conversation.messages.values_list('pk', flat=True)), self.ids[3:])
+            self.assertEqual(chat_search.search_messages(self.user, '0')[0], [])
+
+            self.assertEqual(self.fetch(), (self.ids[3:], True))
+            self.assertEqual(self.fetch(before_id=self.ids[3]), (self.ids[1:3], True))
+            self.assertEqual(self.fetch(before_id=self.ids[1]), (self.ids[:1], False))
+            data = self.client.get(self.url, {'before_id': self.ids[1]}).json()
+            self.assertEqual((data['messages'][0]['content'], data['messages'][0]['sender']), ('0', 'customer'))
+
+    def test_deleting_conversation_releases_archive(self):
+        archive_dir, media_root = tempfile.mkdtemp(), tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(CHAT_ARCHIVE_DIR=archive_dir, MEDIA_ROOT=media_root):
+            with self.captureOnCommitCallbacks(execute=True):
+                message = self.conversation.messages.create(
+                    sender=self.user, file=SimpleUploadedFile('a.gif', TINY_GIF, 'image/gif'),
+                )
+            self.conversation.messages.update(created_at=timezone.now() - timedelta(days=400))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(archive.archive_due(), 6)
+            # پیوست بایگانی‌شده هنوز ارجاع دارد
+            self.assertEqual(Blob.objects.get(name=message.file.name).refs, 1)
+            self.assertEqual(len(os.listdir(archive_dir)), 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.conversation.delete()
+            self.assertFalse(Blob.objects.exists())
+            self.assertFalse(content_storage.exists(message.file.name))
+            self.assertEqual(os.listdir(archive_dir), [])
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def test_duplicates_share_one_blob_until_last_delete(self):
+        first = content_storage.save('chat_files/a.GIF', SimpleUploadedFile('a.GIF', TINY_GIF))
+        second = content_storage.save('business_images/b.gif', SimpleUploadedFile('b.gif', TINY_GIF))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.gif'))
+        self.assertEqual(Blob.objects.get(name=first).refs, 2)
+
+        content_storage.delete(first)
+        self.assertTrue(content_storage.exists(first))
+        content_storage.delete(first)
+        self.assertFalse(content_storage.exists(first))
+        self.assertFalse(Blob.objects.exists())
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(
+            MEDIA_ROOT=self.media_root, CHAT_UPLOAD_DIR=os.path.join(self.media_root, 'uploads'),
+        )
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        User = get_user_model()
+        self.user = User.objects.create_user('customer', password='x')
+        business = Business.objects.create(
+            owner=User.objects.create_user('owner', password='x'),
+            name='کافه', phone='0', description='-', address='-', city='تهران', is_approved=True,
+        )
+        self.conversation = Conversation.objects.create(business=business, user=self.user)
+        self.client.force_login(self.user)
+
+    def put(self, url, offset, data):
+        return self.client.put(url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resume_and_finish(self):
+        response = self.client.post(
+            reverse('send:upload_start', args=[self.conversation.pk]),
+            {'filename': 'a.gif', 'content_type': 'image/gif', 'size': len(TINY_GIF)},
+        )
+        url = reverse('send:upload_chunk', args=[response.json()['upload_id']])
+
+        self.assertEqual(self.put(url, 0, TINY_GIF[:10]).json()['offset'], 10)
+        # تکه‌ی تکراری بعد از قطع اتصال: سرور offset درست را برمی‌گرداند
+        response = self.put(url, 0, TINY_GIF[:10])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 10))
+        self.assertEqual(self.put(url, 10, TINY_GIF[10:]).json()['offset'], len(TINY_GIF))
+
+        response = self.client.post(url + 'finish/', {'content': 'فاکتور'})
+        message = self.conversation.messages.get()
+        self.assertEqual(response.json()['message']['id'], message.pk)
+        self.assertEqual((message.content, message.file_type), ('فاکتور', 'image'))
+        with message.file.open('rb') as handle:
+            self.assertEqual(handle.read(), TINY_GIF)
+        self.assertFalse(ChatUpload.objects.exists())
+
+    def test_expire_removes_stale_uploads(self):
+        upload = uploads.start(self.conversation, self.user, 'a.gif', 'image/gif', 100)
+        self.assertEqual(uploads.expire(uploads.DEFAULT_MAX_AGE), 0)
+        self.assertEqual(uploads.expire(-uploads.DEFAULT_MAX_AGE), 1)
+        self.assertFalse(os.path.exists(uploads.temp_path(upload)))
@@ -0,0 +1,141 @@
+"""
+ساخت نسخه‌های کوچک‌شده‌ی تصاویر کسب‌وکار (WebP و JPEG) در اندازه‌های ثابت.
+
+نسخه‌ها کنار فایل اصلی در پوشه‌ی derivatives ذخیره می‌شوند (با default_storage، چون
+نامشان از نام فایل اصلی ساخته می‌شود نه از محتوایشان) و بعد از commit در
+یک thread پس‌زمینه ساخته می‌شوند تا درخواست ثبت کسب‌وکار منتظر encode نماند.
+تا وقتی derivatives_ready نشده، تمپلیت‌ها همان فایل اصلی را نشان می‌دهند. عرض واقعی
+هر نسخه (بعد از thumbnail که بزرگ‌نمایی نمی‌کند) در derivative_widths ثبت می‌شود تا
+توصیف‌گرهای srcset با فایل‌ها بخوانند.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# نام: (عرض، ارتفاع، برش برای پر کردن کادر)
+SIZES = {
+    'card': (400, 200, True),
+    'card_2x': (800, 400, True),
+    'gallery': (800, 600, False),
+    'full': (1600, 1600, False),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# هر کاربرد srcset جدای خودش را دارد: کارت برش‌خورده با گالری هم‌نسبت نیست
+PURPOSES = {
+    'card': ('card', 'card_2x'),
+    'gallery': ('gallery', 'full'),
+}
+# نسخه‌ی پایه‌ی هر کاربرد همیشه ساخته می‌شود چون src تمپلیت است
+_BASE_SIZES = {sizes[0] for sizes in PURPOSES.values()}
+
+_executor = None
+
+
+def derivative_name(name, size, fmt):
+    directory, filename = os.path.split(name)
+    # پسوند اصلی هم در نام می‌ماند تا a.jpg و a.png نسخه‌های هم را بازنویسی نکنند
+    stem = filename.replace('.', '_')
+    return os.path.join(directory, 'derivatives', f'{stem}_{size}.{fmt}').replace(os.sep, '/')
+
+
+def _render(source, size, fmt):
+    width, height, crop = SIZES[size]
+    if crop:
+        image = ImageOps.fit(source, (width, height), Image.LANCZOS)
+    else:
+        image = source.copy()
+        image.thumbnail((width, height), Image.LANCZOS)
+    pil_format, options = FORMATS[fmt]
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return ContentFile(buffer.getvalue()), image.width
+
+
+def _upscales(source, size):
+    width, height, crop = SIZES[size]
+    return crop and (source.width < width or source.height < height)
+
+
+def _stored_width(name):
+    with default_storage.open(name, 'rb') as handle:
+        return Image.open(handle).width
+
+
+def generate(business_image, force=False):
+    """همه‌ی نسخه‌ها را برای یک BusinessImage می‌سازد و آن را آماده علامت می‌زند."""
+    from . import cache, conditional
+    from .models import BusinessImage
+
+    storage = default_storage
+    name = business_image.image.name
+    with business_image.image.open('rb') as handle:
+        source = ImageOps.exif_transpose(Image.open(handle))
+        source = source.convert('RGB')
+    widths = {}
+    for size in SIZES:
+        # برش بزرگ‌نمایی‌شده فقط حجم اضافه است و در srcset جایی ندارد
+        if size not in _BASE_SIZES and _upscales(source, size):
+            continue
+        for fmt in FORMATS:
+            target = derivative_name(name, size, fmt)
+            if storage.exists(target):
+                if not force:
+                    widths[size] = _stored_width(target)
+                    continue
+                storage.delete(target)
+            content, widths[size] = _render(source, size, fmt)
+            storage.save(target, content)
+    BusinessImage.objects.filter(pk=business_image.pk).update(derivatives_ready=True, derivative_widths=widths)
+    # صفحه‌هایی که این تصویر را نشان می‌دهند حالا آدرس نسخه‌ی کوچک را دارند
+    conditional.touch([business_image.business_id])
+    cache.invalidate_businesses([business_image.business_id])
+
+
+def delete(business_image):
+    storage = default_storage
+    for size in SIZES:
+        for fmt in FORMATS:
+            storage.delete(derivative_name(business_image.image.name, size, fmt))
+
+
+def _generate_ids(image_ids):
+    from .models import BusinessImage
+
+    try:
+        for business_image in BusinessImage.objects.filter(pk__in=image_ids):
+            try:
+                generate(business_image)
+            except Exception:
+                logger.exception('ساخت نسخه‌های تصویر %s ناموفق بود', business_image.pk)
+    finally:
+        close_old_connections()
+
+
+def schedule(image_ids):
+    """بعد از commit تراکنش فعلی، ساخت نسخه‌ها را به thread پس‌زمینه می‌سپارد."""
+    global _executor
+    image_ids = list(image_ids)
+    if not image_ids:
+        return
+    if not getattr(settings, 'THUMBNAIL_ASYNC', True):
+        transaction.on_commit(lambda: _generate_ids(image_ids))
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='thumbnails',
+        )
+    transaction.on_commit(lambda: _executor.submit(_generate_ids, image_ids))
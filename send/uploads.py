@@ -0,0 +1,137 @@
+"""
+آپلود تکه‌ای و قابل ادامه‌ی پیوست‌های چت.
+
+کلاینت اول یک ChatUpload می‌سازد (نام، نوع و حجم کل)، بعد فایل را در تکه‌های حداکثر
+CHUNK_SIZE بایتی با offset هر تکه می‌فرستد. هر تکه در فایل موقت همان آپلود در
+CHAT_UPLOAD_DIR نوشته می‌شود و offset فقط وقتی جلو می‌رود که تکه از همان جایی
+شروع شده باشد که سرور انتظار دارد؛ پس بعد از قطع شدن اتصال، کلاینت offset را
+می‌پرسد و از همان‌جا ادامه می‌دهد. هر درخواست حداکثر یک تکه را می‌خواند.
+وقتی همه‌ی بایت‌ها رسید، finish فایل را در یک تراکنش به Message تبدیل می‌کند.
+آپلودهای نیمه‌کاره را دستور cleanup_uploads پاک می‌کند.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChatUpload, Message
+
+CHUNK_SIZE = 1024 * 1024
+MAX_SIZE = 10 * 1024 * 1024
+ALLOWED_TYPES = ('image', 'video', 'application')
+DEFAULT_MAX_AGE = timedelta(hours=24)
+
+
+class UploadError(ValueError):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, offset):
+        super().__init__(f'expected offset {offset}')
+        self.offset = offset
+
+
+def upload_dir():
+    return str(getattr(settings, 'CHAT_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'g-job-uploads')))
+
+
+def temp_path(upload):
+    return os.path.join(upload_dir(), upload.pk.hex)
+
+
+def file_type(content_type):
+    """همان دسته‌بندی chat_view برای Message.file_type؛ None برای نوع غیرمجاز."""
+    major = (content_type or '').split('/')[0]
+    return major if major in ALLOWED_TYPES else None
+
+
+def start(conversation, user, filename, content_type, size):
+    if file_type(content_type) is None:
+        raise UploadError('فقط تصاویر، ویدئوها و فایل‌های PDF/DOC/DOCX مجاز هستند.')
+    if not 0 < size <= MAX_SIZE:
+        raise UploadError('حجم فایل نباید بیشتر از ۱۰ مگابایت باشد.')
+    upload = ChatUpload.objects.create(
+        conversation=conversation,
+        user=user,
+        filename=os.path.basename(filename)[:255] or 'file',
+        content_type=content_type,
+        size=size,
+    )
+    os.makedirs(upload_dir(), exist_ok=True)
+    open(temp_path(upload), 'wb').close()
+    return upload
+
+
+def append(upload, offset, data):
+    """یک تکه را در offset می‌نویسد و offset جدید را برمی‌گرداند."""
+    if offset != upload.offset:
+        raise OffsetMismatch(upload.offset)
+    if not data or len(data) > CHUNK_SIZE or offset + len(data) > upload.size:
+        raise UploadError('invalid chunk')
+    with open(temp_path(upload), 'r+b') as handle:
+        handle.seek(offset)
+        handle.write(data)
+    # اگر درخواست هم‌زمانی زودتر همین offset را ثبت کرده باشد این تکه پذیرفته نمی‌شود
+    new_offset = offset + len(data)
+    if not ChatUpload.objects.filter(pk=upload.pk, offset=offset).update(offset=new_offset, updated_at=timezone.now()):
+        upload.refresh_from_db(fields=['offset'])
+        raise OffsetMismatch(upload.offset)
+    upload.offset = new_offset
+    return new_offset
+
+
+def finish(upload, content=''):
+    """فایل کامل‌شده را به یک Message تازه می‌چسباند و آپلود را حذف می‌کند."""
+    if upload.offset != upload.size:
+        raise OffsetMismatch(upload.offset)
+    path = temp_path(upload)
+    with transaction.atomic():
+        # قفل ردیف تا دو درخواست finish هم‌زمان دو پیام نسازند
+        if not ChatUpload.objects.select_for_update().filter(pk=upload.pk).exists():
+            raise UploadError('upload already finished')
+        message = Message(
+            conversation=upload.conversation,
+            sender=upload.user,
+            content=content,
+            file_type=file_type(upload.content_type),
+        )
+        with open(path, 'rb') as handle:
+            message.file.save(upload.filename, File(handle), save=False)
+        message.save()
+        upload.delete()
+        transaction.on_commit(lambda: _remove(path))
+    return message
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def expire(max_age):
+    """آپلودهایی که max_age است تکه‌ی تازه‌ای نگرفته‌اند و فایل‌های موقت بی‌صاحب را پاک می‌کند."""
+    stale = ChatUpload.objects.filter(updated_at__lt=timezone.now() - max_age)
+    removed = 0
+    for upload in stale.iterator():
+        _remove(temp_path(upload))
+        removed += 1
+    stale.delete()
+
+    directory = upload_dir()
+    if os.path.isdir(directory):
+        known = {upload_id.hex for upload_id in ChatUpload.objects.values_list('id', flat=True)}
+        cutoff = (timezone.now() - max_age).timestamp()
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name not in known and os.path.getmtime(path) < cutoff:
+                _remove(path)
+                removed += 1
+    return removed
+
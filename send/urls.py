@@ -7,10 +7,15 @@ urlpatterns = [
     path('', views.business_list_view, name='business_list'),
     path('send/register/', views.business_register_view, name='business_register'),
     path('send/business/<str:slug>/', views.business_detail_view, name='business_detail'),
+    path('send/business/<str:slug>/state/', views.business_user_state_view, name='business_user_state'),
     path('send/business/<str:slug>/review/', views.add_review_view, name='add_review'),
     path('send/business/<str:slug>/review/edit/', views.edit_review_view, name='edit_review'),
     path('send/business/<str:slug>/review/delete/', views.delete_review_view, name='delete_review'),
     path('send/business/<str:slug>/chat/', views.chat_view, name='chat'),
     path('send/chat/', views.chat_view, name='owner_chat'),
     path('send/messages/<int:conversation_id>/', views.get_messages, name='get_messages'),
+    path('send/messages/search/', views.search_messages_view, name='search_messages'),
+    path('send/messages/<int:conversation_id>/uploads/', views.upload_start, name='upload_start'),
+    path('send/uploads/<uuid:upload_id>/', views.upload_chunk, name='upload_chunk'),
+    path('send/uploads/<uuid:upload_id>/finish/', views.upload_finish, name='upload_finish'),
 ]
\ No newline at end of file
@@ -2,18 +2,30 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Q, Count, Avg
-from django.utils.text import slugify
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.http import JsonResponse, Http404, HttpResponseBadRequest
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control, never_cache
+from django.template.loader import render_to_string
+from django.middleware.csrf import get_token
 from django.utils import timezone
+from django.urls import reverse
+from django.conf import settings
 from .forms import (
     BusinessRegisterForm,
     BusinessImageForm,
     BusinessRatingForm,
     MessageForm,
 )
-from .models import Business, BusinessImage, Service, BusinessHours, Category, BusinessRating, Conversation, Message
+from .models import Business, Category, BusinessRating, ChatUpload, Conversation
+from . import amenities, chat, chat_search, geo, hours as opening_hours, similarity, uploads
+from .realtime import can_access
+from .amenities import SERVICE_CHOICES
+from .registration import register_business
+from .search import RANK_ORDERING, search_businesses
+from .facets import Facets
+from .cache import get_detail_context
+from .conditional import business_list_etag, business_detail_etag, business_detail_last_modified
+from .pagination import KeysetPaginator, InvalidCursor, cursor_querystring
 
 @login_required
 def business_register_view(request):
@@ -23,35 +35,30 @@ def business_register_view(request):
         files = request.FILES.getlist('image')
 
         if form.is_valid():
-            business = form.save(commit=False)
-            business.owner = request.user
-            business.save()
-
-            services = request.POST.getlist('services')
-            icons = request.POST.getlist('icons')
-            for service_name, icon in zip(services, icons):
-                if service_name:
-                    Service.objects.create(business=business, name=service_name, icon=icon)
+            # چک‌باکس‌های فرم کلیدهای SERVICE_CHOICES را می‌فرستند
+            services = [
+                (str(label), icon)
+                for label, icon in filter(None, map(amenities.choice, request.POST.getlist('services')))
+            ]
 
             days_list = [
                 ('شنبه - چهارشنبه', 'weekday'),
                 ('پنجشنبه', 'thursday'),
                 ('جمعه', 'friday'),
             ]
+            hours = []
             for days, prefix in days_list:
                 start_time = request.POST.get(f'{prefix}_start')
                 end_time = request.POST.get(f'{prefix}_end')
                 is_closed = request.POST.get(f'{prefix}_closed') == 'on'
-                BusinessHours.objects.create(
-                    business=business,
-                    days=days,
-                    start_time=start_time if not is_closed else None,
-                    end_time=end_time if not is_closed else None,
-                    is_closed=is_closed
-                )
+                hours.append((
+                    days,
+                    start_time if not is_closed else None,
+                    end_time if not is_closed else None,
+                    is_closed,
+                ))
 
-            for file in files:
-                BusinessImage.objects.create(business=business, image=file)
+            register_business(form, request.user, services=services, hours=hours, files=files)
 
             messages.success(request, _('شغل با موفقیت ثبت شد! پس از تأیید نهایی نمایش داده خواهد شد.'))
             return redirect('accounts:profile')
@@ -61,15 +68,6 @@ def business_register_view(request):
         form = BusinessRegisterForm()
         image_form = BusinessImageForm()
 
-    service_choices = [
-        ('تحویل_در_محل', _('تحویل در محل'), 'fa-truck'),
-        ('رزرو_آنلاین', _('رزرو آنلاین'), 'fa-calendar-check'),
-        ('پارکینگ', _('پارکینگ'), 'fa-parking'),
-        ('وای_فای_رایگان', _('وای‌فای رایگان'), 'fa-wifi'),
-        ('فضای_خانوادگی', _('فضای خانوادگی'), 'fa-users'),
-        ('پذیرش_کارت', _('پذیرش کارت'), 'fa-credit-card'),
-    ]
-
     hours_choices = {
         'weekday': {'start': ['۸:۰۰', '۹:۰۰', '۱۰:۰۰'], 'end': ['۱۷:۰۰', '۱۸:۰۰', '۱۹:۰۰']},
         'thursday': {'start': ['۸:۰۰', '۹:۰۰'], 'end': ['۱۴:۰۰', '۱۵:۰۰']},
@@ -78,16 +76,24 @@ def business_register_view(request):
     return render(request, 'send/SEND.html', {
         'form': form,
         'image_form': image_form,
-        'service_choices': service_choices,
+        'service_choices': SERVICE_CHOICES,
         'hours_choices': hours_choices,
     })
 
+@condition(etag_func=business_list_etag)
 def business_list_view(request):
     categories = request.GET.getlist('category[]')
     cities = request.GET.getlist('city[]')
     search = request.GET.get('search')
+    try:
+        point = geo.parse_point(request.GET)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid lat/lng')
+    open_minute = opening_hours.requested_minute(request.GET)
+    selected_amenities = request.GET.getlist('amenity[]')
+    amenity_mask = amenities.mask_for_keys(selected_amenities)
 
-    businesses = Business.objects.filter(is_approved=True).exclude(slug='')
+    businesses = Business.objects.filter(is_approved=True).exclude(slug='').select_related('cover_image')
 
     if categories and 'all' not in categories:
         businesses = businesses.filter(category__slug__in=categories)
@@ -95,59 +101,106 @@ def business_list_view(request):
     if cities and 'all' not in cities:
         businesses = businesses.filter(city__in=cities)
 
+    businesses = amenities.filter_queryset(businesses, amenity_mask)
+
     if search:
-        businesses = businesses.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search) |
-            Q(category__name__icontains=search)
-        )
+        businesses = search_businesses(businesses, search, rank=True)
 
-    all_categories = Category.objects.annotate(
-        count=Count('businesses', filter=Q(businesses__is_approved=True))
-    )
-    all_cities = Business.objects.filter(is_approved=True).values('city').annotate(
-        count=Count('city')
-    ).order_by('city')
+    if open_minute is not None:
+        businesses = opening_hours.open_at(businesses, open_minute)
+
+    ordering = ('-created_at', '-id')
+    if 'search_rank' in businesses.query.annotations:
+        ordering = RANK_ORDERING
+    if point:
+        businesses = geo.nearby(businesses, *point)
+        ordering = ('distance', 'id')
+
+    facet_counts = Facets()
+    all_categories = list(Category.objects.all())
+    for category in all_categories:
+        category.count = facet_counts.by_category.get(category.id, 0)
+    all_cities = facet_counts.cities()
 
+    category_ids = None
+    if categories and 'all' not in categories:
+        category_ids = {category.id for category in all_categories if category.slug in categories}
+    city_filter = set(cities) if cities and 'all' not in cities else None
+
+    amenity_counts = facet_counts.by_amenity(category_ids=category_ids, cities=city_filter, amenities=amenity_mask)
     service_choices = [
-        ('تحویل_در_محل', _('تحویل در محل'), 'fa-truck'),
-        ('رزرو_آنلاین', _('رزرو آنلاین'), 'fa-calendar-check'),
-        ('پارکینگ', _('پارکینگ'), 'fa-parking'),
-        ('وای_فای_رایگان', _('وای‌فای رایگان'), 'fa-wifi'),
-        ('فضای_خانوادگی', _('فضای خانوادگی'), 'fa-users'),
-        ('پذیرش_کارت', _('پذیرش کارت'), 'fa-credit-card'),
+        {'key': key, 'label': label, 'icon': icon, 'count': amenity_counts.get(amenities.BITS[key], 0)}
+        for key, label, icon in SERVICE_CHOICES
     ]
 
+    if search or point or open_minute is not None:
+        result_count = businesses.count()
+    else:
+        result_count = facet_counts.total(category_ids=category_ids, cities=city_filter, amenities=amenity_mask)
+
+    paginator = KeysetPaginator(
+        businesses,
+        ordering=ordering,
+        per_page=getattr(settings, 'BUSINESS_LIST_PAGE_SIZE', 12),
+    )
+    try:
+        page = paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page = paginator.page()
+
     return render(request, 'send/LIST.html', {
-        'businesses': businesses,
+        'businesses': page,
+        'result_count': result_count,
+        'next_query': cursor_querystring(request, page.next_cursor) if page.has_next() else '',
+        'previous_query': cursor_querystring(request, page.previous_cursor) if page.has_previous() else '',
         'categories': all_categories,
         'cities': all_cities,
         'service_choices': service_choices,
         'current_categories': categories if categories else ['all'],
         'current_cities': cities if cities else ['all'],
+        'current_amenities': selected_amenities,
         'current_search': search or '',
+        'current_point': point,
+        'current_open': request.GET.get('open', ''),
+        'current_open_at': request.GET.get('open_at', ''),
     })
 
-def business_detail_view(request, slug):
-    business = get_object_or_404(Business, slug=slug, is_approved=True)
-    
-    ratings = business.ratings.filter(is_approved=True)
-    avg_rating = ratings.aggregate(Avg('rating'))['rating__avg'] or 0.0
-    rating_count = ratings.count()
+def _business_detail_context(slug):
+    business = Business.objects.filter(slug=slug, is_approved=True).select_related('category').first()
+    if business is None:
+        return None
 
-    rating_percentages = {}
-    for i in range(1, 6):
-        count = ratings.filter(rating__gte=i - 0.5, rating__lt=i + 0.5).count()
-        percentage = (count / rating_count * 100) if rating_count > 0 else 0
-        rating_percentages[str(i)] = round(percentage, 1)
+    ratings = business.ratings.filter(is_approved=True).select_related('user').order_by('-created_at')
 
-    similar_businesses = Business.objects.filter(
-        category=business.category,
-        is_approved=True
-    ).exclude(slug=slug)[:3]
+    return {
+        'business': business,
+        'images': list(business.images.all()),
+        'services': list(business.services.all()),
+        'hours': list(business.hours.all()),
+        'avg_rating': business.rating_avg,
+        'rating_count': business.rating_count,
+        'ratings': list(ratings),
+        'rating_percentages': business.rating_percentages(),
+        # کارت‌ها در هر درخواست خوانده می‌شوند تا تغییر همسایه‌ها این ورودی را باطل نکند
+        'similar_ids': similarity.linked_ids(business),
+    }
 
-    for similar in similar_businesses:
-        similar.avg_rating = similar.ratings.filter(is_approved=True).aggregate(avg=Avg('rating'))['avg'] or 0
+@cache_control(public=True, max_age=getattr(settings, 'BUSINESS_DETAIL_MAX_AGE', 60))
+@condition(etag_func=business_detail_etag, last_modified_func=business_detail_last_modified)
+def business_detail_view(request, slug):
+    # این صفحه برای همه‌ی کاربران یکسان است و نباید به request.user، session،
+    # پیام‌ها یا csrf_token دست بزند؛ بخش‌های شخصی در business_user_state_view است
+    context = get_detail_context(slug, lambda: _business_detail_context(slug))
+    if context is None:
+        raise Http404
+    similar_businesses = similarity.for_business(
+        context['business'], Business.objects.select_related('cover_image'), linked=context['similar_ids'],
+    )
+    return render(request, 'send/DETAIL.html', {**context, 'similar_businesses': similar_businesses})
+
+@never_cache
+def business_user_state_view(request, slug):
+    business = get_object_or_404(Business, slug=slug, is_approved=True)
 
     user_has_reviewed = False
     user_review = None
@@ -155,18 +208,16 @@ def business_detail_view(request, slug):
         user_review = BusinessRating.objects.filter(business=business, user=request.user).first()
         user_has_reviewed = user_review is not None
 
-    return render(request, 'send/DETAIL.html', {
+    context = {
         'business': business,
-        'images': business.images.all(),
-        'services': business.services.all(),
-        'hours': business.hours.all(),
-        'avg_rating': avg_rating,
-        'rating_count': rating_count,
-        'ratings': ratings.order_by('-created_at'),
-        'rating_percentages': rating_percentages,
-        'similar_businesses': similar_businesses,
         'user_has_reviewed': user_has_reviewed,
         'user_review': user_review,
+    }
+    return JsonResponse({
+        'user_menu': render_to_string('partials/USER_MENU.html', request=request),
+        'messages': render_to_string('partials/MESSAGES.html', request=request),
+        'review': render_to_string('send/REVIEW_STATE.html', context, request=request),
+        'csrf_token': get_token(request),
     })
 
 @login_required
@@ -241,19 +292,18 @@ def chat_view(request, slug=None):
             business=business,
             user=request.user
         )
+        conversation.business = business
         selected_conversation = conversation
-        messages = conversation.messages.all().select_related('sender')
     else:
         owned_businesses = Business.objects.filter(owner=request.user, is_approved=True)
         if owned_businesses.exists():
             is_owner = True
             if request.GET.get('conversation_id'):
                 selected_conversation = get_object_or_404(
-                    Conversation, 
+                    Conversation.objects.select_related('business', 'user'),
                     id=request.GET.get('conversation_id'), 
                     business__owner=request.user
                 )
-                messages = selected_conversation.messages.all().select_related('sender')
 
     if request.method == 'POST':
         conversation_id = request.POST.get('conversation_id')
@@ -292,43 +342,145 @@ def chat_view(request, slug=None):
                 'errors': form.errors
             }, status=400)
 
-    if is_owner:
-        conversations = Conversation.objects.filter(business__in=owned_businesses).select_related('business', 'user')
-    else:
-        conversations = Conversation.objects.filter(user=request.user).select_related('business')
+    # فقط آخرین پیام‌ها؛ قدیمی‌ترها با اسکرول از get_messages?before_id= می‌آیند
+    has_more_messages = False
+    if selected_conversation:
+        messages, has_more_messages = chat.latest(selected_conversation)
+        chat.mark_read(selected_conversation, request.user)
+
+    try:
+        conversations = chat.inbox(request.user, is_owner, request.GET.get('inbox'))
+    except InvalidCursor:
+        conversations = chat.inbox(request.user, is_owner)
 
     return render(request, 'send/CHAT.html', {
         'business': business,
         'is_owner': is_owner,
         'selected_conversation': selected_conversation,
         'messages': messages,
+        'has_more_messages': has_more_messages,
         'form': MessageForm(),
-        'conversations': conversations
+        'conversations': conversations,
+        'inbox_next_query': cursor_querystring(request, conversations.next_cursor, 'inbox') if conversations.has_next() else '',
+        'inbox_previous_query': cursor_querystring(request, conversations.previous_cursor, 'inbox') if conversations.has_previous() else '',
     })
 
 @login_required
 def get_messages(request, conversation_id):
-    conversation = get_object_or_404(Conversation, id=conversation_id)
-    if conversation.user != request.user and conversation.business.owner != request.user:
+    """
+    پیام‌های گفتگو به صورت تکه‌ای:
+    - بدون پارامتر: آخرین پیام‌ها؛ before_id=X: پیام‌های قدیمی‌تر از X
+    - after_id=X: پیام‌های تازه‌تر از X؛ با wait=N تا N ثانیه منتظر پیام تازه می‌ماند
+    """
+    conversation = get_object_or_404(Conversation.objects.select_related('business'), id=conversation_id)
+    if conversation.user_id != request.user.pk and conversation.business.owner_id != request.user.pk:
         return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
-    
-    messages = conversation.messages.all().select_related('sender')
-    
-    messages_data = [
-        {
-            'content': msg.content,
-            'file_url': msg.file.url if msg.file else None,
-            'file_type': msg.file_type,
-            'sender': msg.sender.username,
-            'business_name': msg.conversation.business.name,
-            'business_slug': msg.conversation.business.slug,
-            'created_at': msg.created_at.strftime('%H:%M'),
-            'is_sent': msg.sender == request.user
-        }
-        for msg in messages
-    ]
-    
+
+    try:
+        limit = min(max(int(request.GET.get('limit') or chat.page_size()), 1), chat.page_size())
+        after_id = int(request.GET['after_id']) if request.GET.get('after_id') else None
+        before_id = int(request.GET['before_id']) if request.GET.get('before_id') else None
+        wait = float(request.GET.get('wait') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+
+    if after_id is not None:
+        messages, has_more = chat.wait_after(conversation, after_id, wait, limit)
+    else:
+        messages, has_more = chat.latest(conversation, limit, before_id)
+    chat.mark_read(conversation, request.user)
+
     return JsonResponse({
         'status': 'success',
-        'messages': messages_data
-    })
\ No newline at end of file
+        'messages': [chat.serialize(message, request.user) for message in messages],
+        'has_more': has_more,
+    })
+
+
+@login_required
+def search_messages_view(request):
+    """جستجو در پیام‌های گفتگوهای کاربر؛ صفحه‌ی بعد با before_id=next_before_id."""
+    try:
+        before_id = int(request.GET['before_id']) if request.GET.get('before_id') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid cursor'}, status=400)
+    messages, has_more = chat_search.search_messages(request.user, request.GET.get('q', ''), before_id)
+
+    results = []
+    for message in messages:
+        conversation = message.conversation
+        if conversation.user_id == request.user.pk:
+            url = reverse('send:chat', args=[conversation.business.slug])
+        else:
+            url = f"{reverse('send:owner_chat')}?conversation_id={conversation.pk}"
+        results.append({
+            'id': message.pk,
+            'conversation_id': conversation.pk,
+            'business_name': conversation.business.name,
+            'user': conversation.user.username,
+            'sender': message.sender.username,
+            'created_at': timezone.localtime(message.created_at).strftime('%Y-%m-%d %H:%M'),
+            'snippet': message.snippet,
+            'url': url,
+        })
+    return JsonResponse({
+        'status': 'success',
+        'results': results,
+        'has_more': has_more,
+        'next_before_id': results[-1]['id'] if has_more else None,
+    })
+
+
+@login_required
+@require_POST
+def upload_start(request, conversation_id):
+    """شروع آپلود تکه‌ای: filename، content_type و size (بایت) فایل."""
+    conversation = get_object_or_404(Conversation.objects.select_related('business'), id=conversation_id)
+    if not can_access(request.user, conversation):
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+    try:
+        upload = uploads.start(
+            conversation, request.user,
+            request.POST.get('filename', ''),
+            request.POST.get('content_type', ''),
+            int(request.POST.get('size') or 0),
+        )
+    except (uploads.UploadError, ValueError) as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return JsonResponse({
+        'status': 'success', 'upload_id': str(upload.pk), 'offset': 0, 'chunk_size': uploads.CHUNK_SIZE,
+    })
+
+
+@login_required
+def upload_chunk(request, upload_id):
+    """
+    GET: offset فعلی برای ادامه‌ی آپلود. PUT: بدنه‌ی درخواست تکه‌ای است که از
+    هدر Upload-Offset شروع می‌شود؛ اگر offset با سرور نخواند 409 با offset درست.
+    """
+    upload = get_object_or_404(ChatUpload, pk=upload_id, user=request.user)
+    if request.method == 'PUT':
+        try:
+            uploads.append(upload, int(request.headers.get('Upload-Offset', '')), request.body)
+        except uploads.OffsetMismatch as exc:
+            return JsonResponse({'status': 'error', 'offset': exc.offset}, status=409)
+        except (uploads.UploadError, ValueError) as exc:
+            return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    elif request.method != 'GET':
+        return JsonResponse({'status': 'error'}, status=405)
+    return JsonResponse({'status': 'success', 'offset': upload.offset, 'size': upload.size})
+
+
+@login_required
+@require_POST
+def upload_finish(request, upload_id):
+    upload = get_object_or_404(ChatUpload.objects.select_related('conversation__business'), pk=upload_id, user=request.user)
+    if not can_access(request.user, upload.conversation):
+        return JsonResponse({'status': 'error', 'message': 'Access denied'}, status=403)
+    try:
+        message = uploads.finish(upload, request.POST.get('content', ''))
+    except uploads.OffsetMismatch as exc:
+        return JsonResponse({'status': 'error', 'offset': exc.offset}, status=409)
+    except uploads.UploadError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+    return JsonResponse({'status': 'success', 'message': chat.serialize(message, request.user)})